@@ -1,9 +1,20 @@
 import streamlit as st
 from managers.user_manager import UserManager  # Gerenciador de usuários
-from managers.game_manager import GameManager  # Gerenciador de partidas
-from managers.room_manager import RoomManager  # Gerenciador de salas
+from managers.game_manager import GAME_TTL, GameManager  # Gerenciador de partidas
+from managers.room_manager import (  # Gerenciador de salas
+    BOT_PLAYERS, LOBBY_PAGE_SIZE, MAX_RESIDENT_ROOMS, ROOM_TTL, SEAT_TTL, RoomManager, WAITING_PLAYER,
+)
 from managers.ranking_manager import RankingManager  # Gerenciador de rankings
+from managers.github_sync import GitHubSync  # Sincronização com o GitHub em segundo plano
+from managers.registry import cache_stats, shared_manager  # Instâncias compartilhadas entre reruns
+from managers import metrics  # Histogramas de tempo das leituras, gravações e páginas
+from managers import sweeper  # Limpeza periódica por inatividade
+from managers import matchmaking  # Fila da partida rápida
+from managers.storage import batch, record_version  # Gravações agrupadas e versão das salas
+from game import ai  # Jogo resolvido usado pelo robô
+from game.board import PRESETS  # Configurações de tabuleiro (3×3, 4×4, gomoku)
 from style import CSS_STYLE
+import functools
 import time
 
 # Aplica o CSS personalizado
@@ -14,11 +25,74 @@ REPO_NAME = "ValfridoNovais/mmpg_jogos"
 BRANCH = "main"
 TOKEN = st.secrets["GITHUB_TOKEN"]
 
-# Inicializa os gerenciadores
-user_manager = UserManager(file_path='pages/js/users.json')
-game_manager = GameManager(file_path='pages/js/games.json', repo_name=REPO_NAME, branch=BRANCH, token=TOKEN)
-ranking_manager = RankingManager(file_path='pages/js/ranking.json', repo_name=REPO_NAME, branch=BRANCH, token=TOKEN)
-room_manager = RoomManager(file_path='pages/js/rooms.json')  # Gerenciador de salas
+# Modo de armazenamento: "json" (arquivo inteiro a cada gravação), "journal" (diário append-only, só com
+# este processo usando os arquivos: sem server.py nem manage.py ao mesmo tempo),
+# "sqlite" (uma linha por registro, compartilhável entre processos) ou "sharded" (um arquivo por sala/partida)
+STORAGE_MODE = st.secrets.get("STORAGE_MODE", "json")
+# Usuários: no mesmo modo das demais coleções, ou "buckets" (opcional: arquivos divididos por hash do nome,
+# cada login lê só um). O server.py deve usar o mesmo modo (--user-storage)
+USER_STORAGE = st.secrets.get("USER_STORAGE", STORAGE_MODE)
+# Chave dos tokens de sessão (sem ela, uma chave aleatória por processo)
+SESSION_SECRET = st.secrets.get("SESSION_SECRET")
+
+# Quantidade de jogadores exibidos na página de ranking
+RANKING_TOP = 10
+# Nota Elo no ranking, além dos pontos (recalculável com "python manage.py rebuild-ranking --elo")
+RANKING_ELO = st.secrets.get("RANKING_ELO", False)
+
+# Lobby: salas por página e rótulos dos filtros e das situações das salas
+LOBBY_PAGE_SIZE = st.secrets.get("LOBBY_PAGE_SIZE", LOBBY_PAGE_SIZE)
+LOBBY_FILTERS = {
+    "all": "Todas",
+    "open": "Com lugar livre",
+    "in_progress": "Em andamento",
+    "finished": "Encerradas",
+}
+ROOM_STATUS = {"new": "Aguardando início", "in_progress": "Em andamento", "finished": "Encerrada"}
+
+# Métricas de tempo (desligadas por padrão), opcionalmente expostas em /metrics ou gravadas num arquivo
+if st.secrets.get("METRICS_ENABLED", False):
+    metrics.enable()
+    if st.secrets.get("METRICS_PORT"):
+        metrics.serve(int(st.secrets["METRICS_PORT"]))
+METRICS_FILE = st.secrets.get("METRICS_FILE")
+
+# Limpeza por inatividade (tempos em segundos): lugares de usuários inativos são liberados, salas sem
+# acesso saem da memória (no máximo MAX_RESIDENT_ROOMS ficam carregadas) e partidas abandonadas vão
+# para o arquivo morto
+SWEEP_INTERVAL = st.secrets.get("SWEEP_INTERVAL", 60)
+SEAT_TTL = st.secrets.get("SEAT_TTL", SEAT_TTL)
+ROOM_TTL = st.secrets.get("ROOM_TTL", ROOM_TTL)
+GAME_TTL = st.secrets.get("GAME_TTL", GAME_TTL)
+MAX_RESIDENT_ROOMS = st.secrets.get("MAX_RESIDENT_ROOMS", MAX_RESIDENT_ROOMS)
+
+# Usuários com acesso à página de administração
+ADMIN_USERS = st.secrets.get("ADMIN_USERS", [])
+
+# Um único cliente do GitHub para todos os arquivos, com commits agrupados
+github_sync = GitHubSync.shared(REPO_NAME, BRANCH, TOKEN) if TOKEN else None
+
+# Tabela do robô: lida do arquivo binário uma vez por processo
+ai.load_table()
+
+# Inicializa os gerenciadores (compartilhados pelo processo; só relê o que mudou no disco)
+user_manager = shared_manager(UserManager, 'pages/js/users.json', sync=github_sync, storage=USER_STORAGE,
+                              secret=SESSION_SECRET)
+game_manager = shared_manager(GameManager, 'pages/js/games.json', sync=github_sync, storage=STORAGE_MODE)
+ranking_manager = shared_manager(RankingManager, 'pages/js/ranking.json', sync=github_sync, storage=STORAGE_MODE,
+                                 elo=RANKING_ELO)
+room_manager = shared_manager(RoomManager, 'pages/js/rooms.json', sync=github_sync, storage=STORAGE_MODE,
+                              max_resident=MAX_RESIDENT_ROOMS)  # Gerenciador de salas
+
+# Fila da partida rápida (uma por processo): pares por pontos no ranking
+matchmaker = matchmaking.shared(room_manager, ranking_manager)
+
+# Thread de limpeza (uma por processo), fora do caminho das requisições
+sweeper.start([
+    functools.partial(room_manager.sweep, room_ttl=ROOM_TTL, seat_ttl=SEAT_TTL),
+    functools.partial(game_manager.sweep, game_ttl=GAME_TTL),
+    matchmaker.match_waiting,
+], interval=SWEEP_INTERVAL)
 
 # Função para exibir a tela de login/cadastro
 def show_auth():
@@ -36,6 +110,7 @@ def show_auth():
                 st.success(f"Bem-vindo de volta, {username}!")
                 st.session_state["logged_in"] = True
                 st.session_state["username"] = username
+                st.session_state["session_token"] = user_manager.issue_token(username)
                 st.rerun()
             else:
                 st.error("Usuário ou senha inválidos.")
@@ -56,17 +131,25 @@ def show_auth():
 # Menu principal
 def main():
     st.sidebar.header("Menu")
-    menu = st.sidebar.radio("Navegação", ["Início", "Salas", "Ranking"])
+    pages = ["Início", "Salas", "Ranking"]
+    if st.session_state["username"] in ADMIN_USERS:
+        pages.append("Admin")
+    menu = st.sidebar.radio("Navegação", pages)
 
-    if menu == "Início":
-        show_home()
-    elif menu == "Salas":
-        if "current_room" in st.session_state and st.session_state["current_room"] is not None:
-            handle_room()
-        else:
-            show_rooms()
-    elif menu == "Ranking":
-        show_ranking()
+    with metrics.timer("render_seconds", page=menu):
+        if menu == "Início":
+            show_home()
+        elif menu == "Salas":
+            if "current_room" in st.session_state and st.session_state["current_room"] is not None:
+                handle_room()
+            else:
+                show_rooms()
+        elif menu == "Ranking":
+            show_ranking()
+        elif menu == "Admin":
+            show_admin()
+    if METRICS_FILE and metrics.is_enabled():
+        metrics.write_text_file(METRICS_FILE)
 
 # Página inicial
 def show_home():
@@ -77,14 +160,69 @@ def show_home():
         Use o menu na barra lateral para navegar entre as opções.
     """)
 
+# Partida rápida: entra na fila e é levado à sala assim que surgir um adversário
+def show_matchmaking():
+    username = st.session_state["username"]
+    room_id = matchmaker.poll(username)  # Par formado enquanto o jogador estava em outra página
+    if room_id is not None:
+        st.session_state["current_room"] = room_id
+        st.rerun()
+    if not matchmaker.is_waiting(username):
+        if st.button("Partida rápida", key="quick_match"):
+            room_id = matchmaker.enqueue(username)
+            if room_id is not None:
+                st.session_state["current_room"] = room_id
+            st.rerun()
+        return
+    show_matchmaking_status()
+
+# Consulta a fila a cada 2 segundos sem recarregar a página inteira
+@st.fragment(run_every=2)
+def show_matchmaking_status():
+    username = st.session_state["username"]
+    room_id = matchmaker.poll(username)
+    if room_id is not None:
+        st.session_state["current_room"] = room_id
+        st.rerun(scope="app")
+    st.info(f"Procurando adversário com pontuação parecida ({len(matchmaker)} na fila)...")
+    if st.button("Cancelar busca", key="cancel_match"):
+        matchmaker.cancel(username)
+        st.rerun(scope="app")
+
 # Página de salas
 def show_rooms():
     st.title("Salas de Jogo")
-    for room in room_manager.rooms:
-        st.subheader(room["name"])
+    show_matchmaking()
+    with st.expander("Criar sala"):
+        name = st.text_input("Nome da sala:")
+        preset = st.selectbox("Tabuleiro:", list(PRESETS))
+        if st.button("Criar") and name:
+            size, k = PRESETS[preset]
+            room_manager.create_room(name, size, k)
+            st.rerun()
+    view = st.radio("Mostrar:", list(LOBBY_FILTERS), format_func=LOBBY_FILTERS.get, horizontal=True,
+                    key="lobby_view")
+    if st.session_state.get("lobby_page_view") != view:  # Filtro novo volta para a primeira página
+        st.session_state["lobby_page_view"] = view
+        st.session_state["lobby_page"] = 0
+    page = st.session_state.get("lobby_page", 0)
+    # Só os resumos da página: o tabuleiro é lido ao abrir a sala
+    rooms, total = room_manager.lobby_page(page, LOBBY_PAGE_SIZE, view)
+    if not rooms and page > 0:  # A página ficou vazia (ex: salas mudaram de situação)
+        st.session_state["lobby_page"] = page = 0
+        rooms, total = room_manager.lobby_page(page, LOBBY_PAGE_SIZE, view)
+    if not rooms:
+        st.write("Nenhuma sala encontrada.")
+    for room in rooms:
+        size, k = room.get("size") or 3, room.get("k") or 3
+        st.subheader(room["name"] if (size, k) == (3, 3) else f"{room['name']} ({size}×{size}, {k} em linha)")
+        seated = sum(player != WAITING_PLAYER for player in room["players"] or [])
+        st.caption(f"{ROOM_STATUS.get(room.get('status'), ROOM_STATUS['new'])} · "
+                   f"Jogadores: {seated}/{len(room['players'] or [])} · "
+                   f"Visualizadores: {room.get('viewer_count') or 0}")
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("Jogar", key=f"join_{room['room_id']}", disabled="Aguardando jogador..." not in room["players"]):
+            if st.button("Jogar", key=f"join_{room['room_id']}", disabled=WAITING_PLAYER not in room["players"]):
                 if room_manager.join_room(room["room_id"], st.session_state["username"]):
                     st.session_state["current_room"] = room["room_id"]
                     st.rerun()
@@ -93,14 +231,28 @@ def show_rooms():
                 room_manager.log_access(room["room_id"], st.session_state["username"], "Visualizador")
                 st.session_state["current_room"] = room["room_id"]
                 st.rerun()
+    pages = max(1, -(-total // LOBBY_PAGE_SIZE))
+    if pages > 1:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Anterior", key="lobby_previous", disabled=page == 0):
+                st.session_state["lobby_page"] = page - 1
+                st.rerun()
+        with col2:
+            st.write(f"Página {page + 1} de {pages}")
+        with col3:
+            if st.button("Próxima", key="lobby_next", disabled=page + 1 >= pages):
+                st.session_state["lobby_page"] = page + 1
+                st.rerun()
 
 # Gerenciar uma sala
 def handle_room():
     room_id = st.session_state["current_room"]
-    room = next((r for r in room_manager.rooms if r["room_id"] == room_id), None)
+    room = room_manager.get_room(room_id)
 
     if room:
         st.title(f"Jogando na {room['name']}")
+        room_manager.touch(room_id, st.session_state["username"])  # Mantém o lugar enquanto a sala é exibida
 
         # Se o jogador for um dos jogadores da sala
         if st.session_state["username"] in room["players"]:
@@ -117,92 +269,157 @@ def handle_room():
 
 # Página de jogo
 def show_game(room_id):
-    room = next((r for r in room_manager.rooms if r["room_id"] == room_id), None)
+    room = room_manager.get_room(room_id)
     if not room:
         st.error("Sala não encontrada.")
         return
 
+    # Vez do robô: a jogada passa pelo mesmo compare-and-swap das jogadas humanas
+    # (partidas contra o robô não pontuam no ranking; ver ranking_manager.game_results)
+    if room_manager.play_bot_move(room_id):
+        room = room_manager.get_room(room_id)
+
     st.subheader(f"Partida na {room['name']}")
     st.write(f"Jogadores: {room['players'][0]} (X) vs {room['players'][1]} (O)")
+    if "move_warning" in st.session_state:
+        st.warning(st.session_state.pop("move_warning"))
+
+    if WAITING_PLAYER in room["players"] and (room["size"], room["k"]) == (3, 3):
+        difficulty = st.selectbox("Adversário robô:", list(BOT_PLAYERS), format_func=BOT_PLAYERS.get,
+                                  key=f"bot_{room_id}")
+        if st.button("Jogar contra o robô", key=f"add_bot_{room_id}"):
+            room_manager.add_bot(room_id, difficulty)
+            st.rerun()
 
-    cols = st.columns(3)
-    for i in range(3):
-        for j in range(3):
-            index = i * 3 + j
+    size = room["size"]
+    cols = st.columns(size)
+    for i in range(size):
+        for j in range(size):
+            index = i * size + j
             with cols[j]:
                 button_label = room["board"][index] if room["board"][index] != " " else " "
                 if st.button(button_label, key=f"btn_{room_id}_{index}"):
-                    if (
-                        room["board"][index] == " "
-                        and st.session_state["username"] == room["players"][0 if room["current_player"] == "X" else 1]
-                    ):
-                        room["board"][index] = room["current_player"]
-                        room["current_player"] = "O" if room["current_player"] == "X" else "X"
-                        room_manager.save_rooms()
-
-                        winner = check_winner(room["board"])
-                        if winner:
-                            st.success(f"{room['players'][0 if winner == 'X' else 1]} venceu!")
-                            room["winner"] = winner
-                            room_manager.save_rooms()
-                        elif " " not in room["board"]:
+                    # Jogada atômica: só grava se a sala não mudou desde a versão exibida
+                    result = room_manager.apply_move(
+                        room_id, index, st.session_state["username"], record_version(room)
+                    )
+                    if result.ok:
+                        outcome = result.state["winner"]
+                        if outcome:
+                            # Só o processo que fez a jogada final pontua a partida (uma gravação)
+                            ranking_manager.record_result(result.state)
+                        if outcome == "Empate":
                             st.info("Empate!")
-                            room["winner"] = "Empate"
-                            room_manager.save_rooms()
+                        elif outcome:
+                            st.success(f"{room['players'][0 if outcome == 'X' else 1]} venceu!")
+                        st.rerun()
+                    elif result.conflict:
+                        # Outro processo mexeu na sala: mostra o tabuleiro atualizado com o aviso
+                        st.session_state["move_warning"] = result.error
                         st.rerun()
 
+    # Jogo encerrado (já no arquivo morto): a sala pode começar outro com os mesmos jogadores
+    if room["winner"]:
+        if room["winner"] == "Empate":
+            st.info("Empate!")
+        else:
+            st.success(f"{room['players'][0 if room['winner'] == 'X' else 1]} venceu!")
+        if st.button("Nova partida", key=f"new_match_{room_id}"):
+            room_manager.new_match(room_id)
+            st.rerun()
+
 # Exibir tabuleiro apenas para visualizadores
 def show_game_view(room_id):
-    room = next((r for r in room_manager.rooms if r["room_id"] == room_id), None)
+    room = room_manager.get_room(room_id)
     if not room:
         st.error("Sala não encontrada.")
         return
 
     st.subheader(f"Visualizando a {room['name']}")
     st.write(f"Jogadores: {room['players'][0]} (X) vs {room['players'][1]} (O)")
-    cols = st.columns(3)
-    for i in range(3):
-        for j in range(3):
-            index = i * 3 + j
+    size = room["size"]
+    cols = st.columns(size)
+    for i in range(size):
+        for j in range(size):
+            index = i * size + j
             with cols[j]:
                 button_label = room["board"][index] if room["board"][index] != " " else " "
                 st.button(button_label, key=f"view_{room_id}_{index}", disabled=True)
 
-# Verificar vencedor
-def check_winner(board):
-    winning_combinations = [
-        [0, 1, 2], [3, 4, 5], [6, 7, 8],
-        [0, 3, 6], [1, 4, 7], [2, 5, 8],
-        [0, 4, 8], [2, 4, 6]
-    ]
-    for combo in winning_combinations:
-        if board[combo[0]] == board[combo[1]] == board[combo[2]] and board[combo[0]] != " ":
-            return board[combo[0]]
-    return None
+# Linha da tabela de ranking
+def ranking_row(position, player_name, stats):
+    row = {
+        "Posição": position,
+        "Jogador": player_name,
+        "Pontos": stats["points"],
+        "Vitórias": stats["wins"],
+        "Empates": stats["draws"],
+        "Derrotas": stats["losses"],
+    }
+    if RANKING_ELO:
+        row["Elo"] = stats.get("elo", "-")
+    return row
 
 # Página de ranking
 def show_ranking():
     st.title("Ranking")
-    ranking = ranking_manager.get_ranking()
-    if ranking:
-        st.table([
-            {
-                "Posição": idx + 1,
-                "Jogador": player_name,
-                "Pontos": stats["points"],
-                "Vitórias": stats["wins"],
-                "Empates": stats["draws"],
-                "Derrotas": stats["losses"],
-            }
-            for idx, (player_name, stats) in enumerate(ranking)
-        ])
+    top = ranking_manager.top(RANKING_TOP)
+    if top:
+        st.table([ranking_row(idx + 1, player_name, stats) for idx, (player_name, stats) in enumerate(top)])
+
+        # Posição do próprio jogador, se estiver fora do topo
+        username = st.session_state["username"]
+        position = ranking_manager.rank_of(username)
+        if position and position > RANKING_TOP:
+            st.write("Sua posição:")
+            st.table([ranking_row(position, username, ranking_manager.ranking[username])])
     else:
         st.info("Nenhum jogador registrado no ranking ainda.")
 
+# Página de administração: métricas do processo
+def show_admin():
+    st.title("Métricas")
+    if not metrics.is_enabled():
+        st.info("Métricas desligadas. Defina METRICS_ENABLED = true nos secrets para coletá-las.")
+    histograms, counters = metrics.snapshot()
+    rows = []
+    for (family, labels), histogram in sorted(histograms.items()):
+        rows.append({
+            "Métrica": family,
+            "Rótulos": ", ".join(f"{key}={value}" for key, value in labels),
+            "Chamadas": histogram.count,
+            "Total (ms)": round(histogram.sum * 1000, 2),
+            "Média (ms)": round(histogram.sum / histogram.count * 1000, 3),
+            "p50 (ms)": round(histogram.quantile(0.5) * 1000, 3),
+            "p99 (ms)": round(histogram.quantile(0.99) * 1000, 3),
+        })
+    if rows:
+        st.dataframe(rows, use_container_width=True)
+    if counters:
+        st.table([{"Contador": family, "Rótulos": ", ".join(f"{key}={value}" for key, value in labels),
+                   "Valor": value} for (family, labels), value in sorted(counters.items())])
+    st.subheader("Sincronização com o GitHub")
+    st.json(github_sync.metrics() if github_sync else {})
+    st.subheader("Cache de gerenciadores")
+    st.json(cache_stats())
+    st.subheader("Limpeza por inatividade")
+    st.json(sweeper.current().stats if sweeper.current() else {})
+    text = metrics.render()
+    st.download_button("Baixar no formato Prometheus", text, file_name="metrics.prom", mime="text/plain")
+    with st.expander("Texto do Prometheus"):
+        st.code(text, language="text")
+
 if "logged_in" not in st.session_state:
     st.session_state["logged_in"] = False
 
-if not st.session_state["logged_in"]:
-    show_auth()
-else:
-    main()
+# Confere a sessão pelo token assinado, sem ler o arquivo de usuários
+if st.session_state["logged_in"] and (
+        user_manager.verify_token(st.session_state.get("session_token")) != st.session_state.get("username")):
+    st.session_state["logged_in"] = False
+
+# Todas as gravações de um rerun saem juntas: cada arquivo é regravado uma vez, no fim
+with batch():
+    if not st.session_state["logged_in"]:
+        show_auth()
+    else:
+        main()
@@ -0,0 +1,320 @@
+"""
+Benchmark de carga da camada de gerenciadores (sem Streamlit e sem rede).
+
+Simula jogadores entrando nas salas, jogando partidas completas pelo mesmo
+caminho de ``app.py:show_game`` (``RoomManager.apply_move`` com a versão da
+sala), espelhando cada jogada numa partida nova do ``GameManager`` (arquivada
+ao terminar), atualizando o
+ranking no fim e saindo da sala. O GitHub é substituído por um
+``FakeRepository`` local.
+
+Uso (a partir da raiz do repositório):
+    python -m benchmarks.load
+    python -m benchmarks.load --storage sqlite --rooms 100 --users 500 --matches 2000
+    python -m benchmarks.load --baseline benchmarks/results/anterior.json
+
+Os resultados (jogadas por segundo, latências p50/p99 por operação, bytes
+gravados por jogada e pico de memória) são impressos e gravados em JSON
+para comparação entre versões.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from game import engine
+from managers.game_manager import GameManager
+from managers.github_fake import FakeRepository
+from managers.github_sync import GitHubSync
+from managers.ranking_manager import RankingManager
+from managers.room_manager import RoomManager, WAITING_PLAYER
+from managers.storage import record_version
+from managers.user_manager import UserManager
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+PASSWORD = "senha"
+
+# Métricas comparadas com --baseline e se valores maiores são melhores
+COMPARED = {"moves_per_second": True, "bytes_per_move": False, "peak_memory_kb": False}
+
+
+def write_fixtures(directory, args):
+    """Cria os arquivos iniciais de salas, partidas e ranking (os usuários são cadastrados pelo UserManager)."""
+    rooms = [{
+        "room_id": room_id,
+        "name": f"Sala {room_id}",
+        "players": [WAITING_PLAYER, WAITING_PLAYER],
+        "viewers": [],
+        "board": [" "] * 9,
+        "current_player": "X",
+        "winner": None,
+    } for room_id in range(1, args.rooms + 1)]
+    games = {f"partida-{n}": {
+        "board": [" "] * 9,
+        "current_player": "X",
+        "players": [f"jogador{2 * n % args.users}", f"jogador{(2 * n + 1) % args.users}"],
+        "winner": None,
+    } for n in range(args.games)}
+    for name, data in (("rooms.json", {"rooms": rooms}), ("games.json", {"games": games}),
+                       ("users.json", {"users": {}}), ("ranking.json", {})):
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=4, ensure_ascii=False)
+
+
+def written_bytes():
+    """Bytes gravados pelo processo até agora (None fora do Linux)."""
+    try:
+        with open('/proc/self/io', 'r') as file:
+            for line in file:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(samples, fraction):
+    """Percentil pelo método do posto mais próximo (amostras já ordenadas)."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class LoadRunner:
+    """Executa as partidas simuladas e coleta as latências de cada operação."""
+
+    def __init__(self, directory, args, sync):
+        self.args = args
+        options = dict(sync=sync, storage=args.storage, db_path=os.path.join(directory, 'state.db'))
+        self.users = UserManager(os.path.join(directory, 'users.json'),
+                                 **dict(options, storage=args.user_storage))
+        self.games = GameManager(os.path.join(directory, 'games.json'), **options)
+        self.ranking = RankingManager(os.path.join(directory, 'ranking.json'), **options)
+        self.rooms = RoomManager(os.path.join(directory, 'rooms.json'), **options)
+        self.users.register_users(
+            (f"jogador{n}", f"Jogador {n}", PASSWORD, f"jogador{n}@exemplo.com") for n in range(args.users)
+        )
+        self.latencies = {}
+        self.moves = 0
+        self.conflicts = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def timed(self, operation, function, *args):
+        """Executa ``function`` e registra a latência (em segundos) da operação."""
+        start = time.perf_counter()
+        value = function(*args)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(elapsed)
+        return value
+
+    def play_match(self, rng, room_id):
+        """Dois jogadores entram na sala, jogam até o fim, pontuam e saem."""
+        players = rng.sample(range(self.args.users), 2)
+        players = [f"jogador{n}" for n in players]
+        for username in players:
+            self.timed("authenticate", self.users.authenticate_user, username, PASSWORD)
+            self.timed("join", self.rooms.join_room, room_id, username)
+        self.timed("new_match", self.rooms.new_match, room_id)
+        game_id = self.timed("new_game", self.games.initialize_game, *players)
+        moves = conflicts = 0
+        while True:
+            room = self.rooms.get_room(room_id)
+            if room["winner"]:
+                break
+            username = room["players"][0 if room["current_player"] == "X" else 1]
+            index = rng.choice(engine.legal_moves(*engine.to_masks(room["board"])))
+            # Mesmo caminho de show_game: compare-and-swap sobre a versão exibida
+            result = self.timed("move", self.rooms.apply_move, room_id, index, username, record_version(room))
+            if result.conflict:
+                conflicts += 1
+                continue
+            if not result.ok:
+                with self._lock:
+                    self.errors.append(result.error)
+                break  # Estado inesperado (ex: arquivo lido no meio de uma gravação): encerra o jogo
+            moves += 1
+            state = result.state
+            self.timed("update_game", self.games.update_game, game_id, list(state["board"]),
+                       state["current_player"], state["winner"])
+        if room["winner"]:
+            self.timed("ranking", self.ranking.record_result, room)
+        for username in players:
+            self.timed("leave", self.rooms.leave_room, room_id, username)
+        with self._lock:
+            self.moves += moves
+            self.conflicts += conflicts
+
+    def worker(self, worker_id, matches):
+        # Cada worker fica com as suas salas, como jogadores diferentes em processos do servidor
+        rng = random.Random(self.args.seed + worker_id)
+        room_ids = list(range(worker_id + 1, self.args.rooms + 1, self.args.workers))
+        for n in range(matches):
+            self.play_match(rng, room_ids[n % len(room_ids)])
+
+    def run(self):
+        per_worker = [self.args.matches // self.args.workers] * self.args.workers
+        for n in range(self.args.matches % self.args.workers):
+            per_worker[n] += 1
+        threads = [threading.Thread(target=self.worker, args=(n, count)) for n, count in enumerate(per_worker)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def git_revision():
+    """Commit atual do repositório (ou None fora de um checkout do git)."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(args):
+    """Prepara os arquivos, executa a carga e retorna o dicionário de resultados."""
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        write_fixtures(directory, args)
+        repo = FakeRepository(latency=args.sync_latency)
+        sync = GitHubSync(repo=repo, interval=args.sync_interval)
+        runner = LoadRunner(directory, args, sync)
+        if args.tracemalloc:
+            tracemalloc.start()
+        bytes_before = written_bytes()
+        start = time.perf_counter()
+        runner.run()
+        elapsed = time.perf_counter() - start
+        bytes_after = written_bytes()
+        traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        if args.tracemalloc:
+            tracemalloc.stop()
+        sync.flush(timeout=30)
+        sync.stop()
+        sync_metrics = sync.metrics()
+        for manager in (runner.users, runner.games, runner.ranking, runner.rooms):
+            manager.store.close()
+        runner.rooms.access_log.close()
+        runner.rooms.archive.close()
+        runner.games.archive.close()
+
+    operations = {}
+    for operation, samples in sorted(runner.latencies.items()):
+        samples.sort()
+        operations[operation] = {
+            "count": len(samples),
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+    moves = runner.moves
+    bytes_written = None if bytes_before is None else bytes_after - bytes_before
+    return {
+        "benchmark": "load",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": {
+            "elapsed_seconds": elapsed,
+            "matches": args.matches,
+            "moves": moves,
+            "conflicts": runner.conflicts,
+            "errors": len(runner.errors),
+            "moves_per_second": moves / elapsed if elapsed else None,
+            "bytes_written": bytes_written,
+            "bytes_per_move": bytes_written / moves if bytes_written is not None and moves else None,
+            # ru_maxrss é o pico de memória residente do processo (em KB no Linux)
+            "peak_memory_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "traced_peak_kb": traced_peak / 1024 if traced_peak is not None else None,
+            "operations": operations,
+            "sync": sync_metrics,
+            "sync_api_calls": repo.calls,
+        },
+    }
+
+
+def print_report(report, baseline=None):
+    """Imprime o resumo dos resultados e, se houver, a variação em relação à referência."""
+    results = report["results"]
+    config = report["config"]
+    print(f"Armazenamento {config['storage']}: {config['rooms']} salas, {config['users']} usuários, "
+          f"{config['games']} partidas, {config['matches']} jogos simulados, {config['workers']} worker(s)")
+    print(f"{results['moves']} jogadas em {results['elapsed_seconds']:.2f}s "
+          f"({results['moves_per_second']:.1f} jogadas/s, {results['conflicts']} conflitos, "
+          f"{results['errors']} erros)")
+    if results["bytes_per_move"] is not None:
+        print(f"{results['bytes_per_move']:.0f} bytes gravados por jogada")
+    print(f"Pico de memória: {results['peak_memory_kb']} KB"
+          + (f" (tracemalloc: {results['traced_peak_kb']:.0f} KB)" if results["traced_peak_kb"] else ""))
+    print(f"{'operação':<14}{'n':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'máx (ms)':>12}")
+    for operation, stats in results["operations"].items():
+        print(f"{operation:<14}{stats['count']:>8}{stats['p50_ms']:>12.3f}{stats['p99_ms']:>12.3f}"
+              f"{stats['max_ms']:>12.3f}")
+    print(f"GitHub (falso): {results['sync']['commits']} commits, {results['sync_api_calls']} chamadas")
+    if baseline:
+        print(f"Comparação com {baseline.get('revision') or 'a referência'}:")
+        for metric, higher_is_better in COMPARED.items():
+            old, new = baseline["results"].get(metric), results.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = change < 0 if higher_is_better else change > 0
+            print(f"  {metric}: {old:.1f} -> {new:.1f} ({change:+.1f}%{', pior' if worse else ''})")
+        for operation, stats in results["operations"].items():
+            old = baseline["results"]["operations"].get(operation)
+            if old and old["p99_ms"]:
+                change = (stats["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100
+                print(f"  p99 {operation}: {old['p99_ms']:.3f} -> {stats['p99_ms']:.3f} ms ({change:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga dos gerenciadores.")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite", "sharded"],
+                        help="Modo de armazenamento.")
+    parser.add_argument("--user-storage", default="buckets",
+                        choices=["json", "journal", "sqlite", "sharded", "buckets"],
+                        help="Modo de armazenamento dos usuários.")
+    parser.add_argument("--rooms", type=int, default=20, help="Número de salas.")
+    parser.add_argument("--users", type=int, default=100, help="Número de usuários cadastrados.")
+    parser.add_argument("--games", type=int, default=50, help="Número de partidas no games.json.")
+    parser.add_argument("--matches", type=int, default=200, help="Número de jogos simulados.")
+    parser.add_argument("--workers", type=int, default=1, help="Threads simulando jogadores.")
+    parser.add_argument("--seed", type=int, default=42, help="Semente das escolhas aleatórias.")
+    parser.add_argument("--sync-interval", type=float, default=0.5, help="Janela de agrupamento do GitHubSync.")
+    parser.add_argument("--sync-latency", type=float, default=0.0, help="Atraso de cada chamada ao GitHub falso.")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mede o pico de alocações com tracemalloc.")
+    parser.add_argument("--output", help="Arquivo JSON de resultados (padrão: benchmarks/results/...).")
+    parser.add_argument("--baseline", help="Resultados anteriores para comparação.")
+    args = parser.parse_args(argv)
+    if args.users < 2 or args.rooms < args.workers or args.games < 1:
+        parser.error("são necessários 2 usuários, 1 partida e ao menos uma sala por worker")
+
+    report = run_benchmark(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_report(report, baseline)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"load-{args.storage}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4, ensure_ascii=False)
+    print(f"Resultados gravados em {output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Jogador automático com o Jogo da Velha resolvido.
+
+Todas as posições alcançáveis são resolvidas uma única vez por minimax e
+gravadas em ``game/solved.bin``, guardando só uma posição de cada classe de
+simetria (rotações e reflexões do tabuleiro). Na carga, a tabela é
+expandida para as 8 simetrias num vetor indexado pela posição em base 3,
+de modo que escolher a jogada do robô é uma única consulta.
+
+Formato do arquivo (little-endian): ``b"TTT\\x01"``, número de registros
+(uint16) e, para cada posição canônica não terminal, o índice em base 3
+(uint16) e um uint16 com as casas ótimas nos bits 0-8 e o valor da posição
+para quem joga (+1 vitória, 0 empate, -1 derrota) somado de 1 nos bits 9-10.
+
+Uso:
+    python -m game.ai               # Regrava game/solved.bin
+"""
+import os
+import random
+import struct
+from array import array
+
+from game import engine
+
+TABLE_PATH = os.path.join(os.path.dirname(__file__), 'solved.bin')
+MAGIC = b"TTT\x01"
+POSITIONS = 3 ** 9
+
+# Probabilidade de o robô ignorar a tabela e jogar numa casa livre qualquer
+DIFFICULTIES = {
+    "random": 1.0,  # Fácil: joga ao acaso
+    "mistakes": 0.3,  # Médio: erra de vez em quando
+    "perfect": 0.0,  # Difícil: nunca perde
+}
+
+# Simetrias do tabuleiro: SYMMETRIES[s][i] é a casa para onde a casa i vai
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+
+def _symmetries():
+    result = []
+    perm = tuple(range(9))
+    for _ in range(4):
+        result.append(perm)
+        result.append(tuple(_MIRROR[perm[i]] for i in range(9)))
+        perm = tuple(_ROTATE[perm[i]] for i in range(9))
+    return tuple(result)
+
+
+SYMMETRIES = _symmetries()
+POWERS = tuple(3 ** i for i in range(9))
+
+_table = None
+
+
+def position_index(x, o):
+    """Índice em base 3 da posição (0 vazio, 1 X e 2 O em cada casa)."""
+    return sum(POWERS[i] * (1 if x >> i & 1 else 2 if o >> i & 1 else 0) for i in range(9))
+
+
+def _transform(x, o, perm):
+    tx = to = 0
+    for i in range(9):
+        if x >> i & 1:
+            tx |= 1 << perm[i]
+        elif o >> i & 1:
+            to |= 1 << perm[i]
+    return tx, to
+
+
+def _transform_mask(mask, perm):
+    return sum(1 << perm[i] for i in range(9) if mask >> i & 1)
+
+
+def solve():
+    """
+    Resolve todas as posições alcançáveis.
+    :return: Dicionário (x, o) -> (valor para quem joga, máscara das jogadas ótimas),
+        apenas para posições não terminais.
+    """
+    solved = {}
+
+    def value(x, o):
+        # Valor da posição para quem vai jogar
+        if engine.WINS[x] or engine.WINS[o]:
+            return -1  # Quem jogou por último venceu
+        if x | o == engine.FULL:
+            return 0
+        if (x, o) in solved:
+            return solved[(x, o)][0]
+        x_to_move = engine.BIT_COUNT[x] == engine.BIT_COUNT[o]
+        best, best_mask = -2, 0
+        for index in engine.MOVES[x | o]:
+            bit = 1 << index
+            score = -(value(x | bit, o) if x_to_move else value(x, o | bit))
+            if score > best:
+                best, best_mask = score, bit
+            elif score == best:
+                best_mask |= bit
+        solved[(x, o)] = (best, best_mask)
+        return best
+
+    value(0, 0)
+    return solved
+
+
+def canonical(solved):
+    """Mantém uma posição por classe de simetria (a de menor índice)."""
+    records = {}
+    for (x, o), (score, mask) in solved.items():
+        index = min(position_index(*_transform(x, o, perm)) for perm in SYMMETRIES)
+        if index == position_index(x, o):
+            records[index] = (score, mask)
+    return records
+
+
+def write_table(path=TABLE_PATH):
+    """
+    Resolve o jogo e grava a tabela compacta.
+    :return: Número de posições canônicas gravadas.
+    """
+    records = canonical(solve())
+    with open(path, 'wb') as file:
+        file.write(MAGIC + struct.pack("<H", len(records)))
+        for index in sorted(records):
+            score, mask = records[index]
+            file.write(struct.pack("<HH", index, mask | (score + 1) << 9))
+    return len(records)
+
+
+def load_table(path=TABLE_PATH):
+    """
+    Carrega a tabela (uma vez por processo), expandindo as simetrias.
+    Se o arquivo não existir ou estiver corrompido, o jogo é resolvido em memória.
+    :return: array de uint16 indexado pela posição em base 3 (0 para posições sem jogada).
+    """
+    global _table
+    if _table is not None:
+        return _table
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        if data[:4] != MAGIC:
+            raise ValueError("Cabeçalho inválido")
+        (count,) = struct.unpack_from("<H", data, 4)
+        records = {index: packed for index, packed in struct.iter_unpack("<HH", data[6:6 + 4 * count])}
+        if len(records) != count:
+            raise ValueError("Arquivo truncado")
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Tabela do robô indisponível ({e}); resolvendo o jogo em memória.")
+        records = {index: mask | (score + 1) << 9 for index, (score, mask) in canonical(solve()).items()}
+
+    table = array('H', bytes(2 * POSITIONS))
+    for index, packed in records.items():
+        x, o = _from_index(index)
+        mask = packed & 0x1FF
+        for perm in SYMMETRIES:
+            table[position_index(*_transform(x, o, perm))] = _transform_mask(mask, perm) | packed & ~0x1FF
+    _table = table
+    return table
+
+
+def _from_index(index):
+    x = o = 0
+    for i in range(9):
+        index, cell = divmod(index, 3)
+        if cell == 1:
+            x |= 1 << i
+        elif cell == 2:
+            o |= 1 << i
+    return x, o
+
+
+def best_moves(board):
+    """
+    Consulta a tabela para um tabuleiro em lista.
+    :return: Tupla (casas ótimas, valor para quem joga) ou ((), None) se a partida terminou.
+    """
+    x, o = engine.to_masks(board)
+    packed = load_table()[position_index(x, o)]
+    if not packed:
+        return (), None
+    mask = packed & 0x1FF
+    return tuple(i for i in range(9) if mask >> i & 1), (packed >> 9) - 1
+
+
+def choose_move(board, difficulty="perfect", rng=random):
+    """
+    Escolhe a jogada do robô.
+    :param board: Tabuleiro em lista.
+    :param difficulty: "random", "mistakes" ou "perfect" (ver DIFFICULTIES).
+    :param rng: Gerador de números aleatórios (permite partidas reproduzíveis).
+    :return: Casa escolhida ou None se não houver jogada.
+    """
+    legal = engine.legal_moves(*engine.to_masks(board))
+    if not legal:
+        return None
+    if rng.random() < DIFFICULTIES[difficulty]:
+        return rng.choice(legal)
+    moves, _ = best_moves(board)
+    return rng.choice(moves) if moves else rng.choice(legal)
+
+
+if __name__ == "__main__":
+    print(f"{write_table()} posições canônicas gravadas em {TABLE_PATH}.")
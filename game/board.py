@@ -0,0 +1,163 @@
+"""
+Tabuleiros N×N com vitória por k peças em linha (3×3/3, 4×4/4, 15×15/5...).
+
+O Jogo da Velha clássico continua no motor de bitboards (``game.engine``);
+aqui ficam os tabuleiros de outros tamanhos. A vitória é verificada só nas
+quatro linhas que passam pela última peça colocada, em O(k) por jogada.
+Tabuleiros grandes são esparsos: guardam apenas as casas ocupadas, de modo
+que memória e tamanho gravado acompanham o número de jogadas, e não a área.
+"""
+from collections.abc import Sequence
+
+EMPTY = " "
+
+# Configurações oferecidas ao criar uma sala: rótulo -> (lado, peças em linha)
+PRESETS = {
+    "3×3 (3 em linha)": (3, 3),
+    "4×4 (4 em linha)": (4, 4),
+    "15×15 (gomoku, 5 em linha)": (15, 5),
+}
+
+# Maior lado guardado como lista comum; acima disso o tabuleiro é esparso
+DENSE_MAX_SIZE = 4
+
+# Maior lado aceito: cada jogada do histórico ocupa um byte (no máximo 256 casas)
+MAX_SIZE = 16
+
+# Direções das linhas que passam por uma casa: horizontal, vertical e as duas diagonais
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class SparseBoard(Sequence):
+    """
+    Tabuleiro que guarda só as casas ocupadas (índice -> "X"/"O").
+    Comporta-se como a lista de casas: ``board[i]`` devolve " " nas casas livres.
+    """
+
+    __slots__ = ("size", "cells")
+
+    def __init__(self, size, cells=None):
+        self.size = size
+        self.cells = dict(cells or {})
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return self.cells.get(index % len(self), EMPTY)
+
+    def __setitem__(self, index, mark):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if mark == EMPTY:
+            self.cells.pop(index, None)
+        else:
+            self.cells[index] = mark
+
+    def __len__(self):
+        return self.size * self.size
+
+    def count(self, mark):
+        if mark == EMPTY:
+            return len(self) - len(self.cells)
+        return sum(1 for value in self.cells.values() if value == mark)
+
+    def copy(self):
+        return SparseBoard(self.size, self.cells)
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __eq__(self, other):
+        if isinstance(other, SparseBoard):
+            return self.size == other.size and self.cells == other.cells
+        return list(self) == other
+
+    def __repr__(self):
+        return f"SparseBoard({self.size}, {self.cells!r})"
+
+    def to_json(self):
+        """Formato gravado: índices ocupados por cada jogador."""
+        marks = {"X": [], "O": []}
+        for index in sorted(self.cells):
+            marks[self.cells[index]].append(index)
+        return marks
+
+    @classmethod
+    def from_json(cls, size, data):
+        """Cria o tabuleiro a partir do formato gravado por ``to_json``."""
+        return cls(size, {index: mark for mark, indexes in data.items() for index in indexes})
+
+
+def new_board(size=3):
+    """Tabuleiro vazio: lista comum nos tamanhos pequenos, esparso nos grandes."""
+    if size <= DENSE_MAX_SIZE:
+        return [EMPTY] * (size * size)
+    return SparseBoard(size)
+
+
+def stones(board):
+    """Número de casas ocupadas."""
+    if isinstance(board, SparseBoard):
+        return len(board.cells)
+    return sum(1 for cell in board if cell != EMPTY)
+
+
+def wins_at(board, size, k, index):
+    """
+    Indica se a peça na casa ``index`` completa ``k`` em linha.
+    Percorre só as quatro linhas que passam pela casa.
+    """
+    mark = board[index]
+    if mark == EMPTY:
+        return False
+    row, col = divmod(index, size)
+    for dr, dc in DIRECTIONS:
+        count = 1
+        for sign in (1, -1):
+            r, c = row + dr * sign, col + dc * sign
+            while 0 <= r < size and 0 <= c < size and board[r * size + c] == mark:
+                count += 1
+                r, c = r + dr * sign, c + dc * sign
+        if count >= k:
+            return True
+    return False
+
+
+def outcome_after(board, size, k, index):
+    """
+    Resultado depois da jogada na casa ``index``.
+    :return: "X", "O", "Empate" ou None se a partida continua.
+    """
+    if wins_at(board, size, k, index):
+        return board[index]
+    return "Empate" if stones(board) == size * size else None
+
+
+def scan_winner(board, size, k):
+    """
+    Avalia um tabuleiro inteiro (usado na validação, não nas jogadas).
+    :return: "X", "O", "Empate" ou None.
+    """
+    occupied = board.cells if isinstance(board, SparseBoard) else {
+        index: cell for index, cell in enumerate(board) if cell != EMPTY
+    }
+    for index in occupied:
+        if wins_at(board, size, k, index):
+            return occupied[index]
+    return "Empate" if len(occupied) == size * size else None
+
+
+def replay(moves, size=3):
+    """
+    Reconstrói uma partida a partir do histórico (um byte por jogada; X começa).
+    :param moves: bytes com o índice de cada casa jogada, em ordem.
+    :param size: Lado do tabuleiro.
+    :return: Gerador de tuplas (casa, peça, tabuleiro após a jogada); o tabuleiro é o mesmo objeto a cada passo.
+    """
+    board = new_board(size)
+    for turn, index in enumerate(moves):
+        mark = "X" if turn % 2 == 0 else "O"
+        board[index] = mark
+        yield index, mark, board
@@ -0,0 +1,185 @@
+"""
+Motor do Jogo da Velha baseado em bitboards.
+
+O tabuleiro é representado por duas máscaras de 9 bits (uma para X e outra
+para O), onde o bit ``i`` corresponde à casa ``i`` da lista ``board``.
+Vitória, empate e jogadas válidas são consultas a tabelas de 512 posições
+calculadas uma única vez na importação do módulo.
+"""
+import copy
+
+from game import board as boards
+
+EMPTY = " "
+FULL = 0b111111111  # Todas as 9 casas ocupadas
+
+# Linhas vencedoras como máscaras de bits
+WIN_LINES = tuple(
+    sum(1 << index for index in line)
+    for line in (
+        (0, 1, 2), (3, 4, 5), (6, 7, 8),
+        (0, 3, 6), (1, 4, 7), (2, 5, 8),
+        (0, 4, 8), (2, 4, 6),
+    )
+)
+
+# WINS[mask] indica se as casas de ``mask`` contêm alguma linha completa
+WINS = bytes(any(mask & line == line for line in WIN_LINES) for mask in range(512))
+
+# MOVES[ocupadas] lista as casas livres para a máscara de casas ocupadas
+MOVES = tuple(
+    tuple(index for index in range(9) if not occupied >> index & 1)
+    for occupied in range(512)
+)
+
+# BIT_COUNT[mask] é o número de peças na máscara
+BIT_COUNT = bytes(bin(mask).count("1") for mask in range(512))
+
+# Códigos de resultado usados pela API vetorizada
+ONGOING, X_WINS, O_WINS, DRAW, INVALID = range(5)
+RESULT_LABELS = {ONGOING: None, X_WINS: "X", O_WINS: "O", DRAW: "Empate"}
+
+
+def to_masks(board):
+    """
+    Converte uma lista de 9 casas em máscaras de bits.
+    :param board: Lista com "X", "O" ou " " em cada casa.
+    :return: Tupla (máscara de X, máscara de O).
+    """
+    x = o = 0
+    for index, cell in enumerate(board):
+        if cell == "X":
+            x |= 1 << index
+        elif cell == "O":
+            o |= 1 << index
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Converte as máscaras de bits de volta para a lista de 9 casas.
+    :return: Lista com "X", "O" ou " " em cada casa.
+    """
+    return ["X" if x >> i & 1 else "O" if o >> i & 1 else EMPTY for i in range(9)]
+
+
+def winner(x, o):
+    """Retorna "X", "O" ou None conforme as máscaras."""
+    if WINS[x]:
+        return "X"
+    if WINS[o]:
+        return "O"
+    return None
+
+
+def is_draw(x, o):
+    """Indica se o tabuleiro está cheio e sem vencedor."""
+    return x | o == FULL and not WINS[x] and not WINS[o]
+
+
+def legal_moves(x, o):
+    """Retorna as casas livres (vazio se a partida terminou)."""
+    if WINS[x] or WINS[o]:
+        return ()
+    return MOVES[x | o]
+
+
+def is_legal(x, o, index):
+    """Indica se a casa ``index`` pode receber uma jogada."""
+    return not (WINS[x] or WINS[o]) and not (x | o) >> index & 1
+
+
+def result(board):
+    """
+    Avalia um tabuleiro em formato de lista.
+    :return: "X", "O", "Empate" ou None se a partida continua.
+    """
+    x, o = to_masks(board)
+    return winner(x, o) or ("Empate" if x | o == FULL else None)
+
+
+def check_winner(board):
+    """Retorna o vencedor ("X" ou "O") de um tabuleiro em lista, ou None."""
+    return winner(*to_masks(board))
+
+
+def play(state, index, username):
+    """
+    Aplica uma jogada numa cópia do estado de uma sala ou partida.
+    :param state: Dicionário com board, current_player, players e winner
+        (e size/k nos tabuleiros diferentes de 3×3).
+    :param index: Casa escolhida (0 a size² - 1).
+    :param username: Jogador que fez a jogada.
+    :return: Tupla (novo estado, None) ou (None, mensagem de erro).
+    """
+    if state.get("winner"):
+        return None, "A partida já terminou."
+    if username != state["players"][0 if state["current_player"] == "X" else 1]:
+        return None, "Não é a sua vez."
+    size, k = state.get("size", 3), state.get("k", 3)
+    if size == 3 and k == 3:
+        x, o = to_masks(state["board"])
+        if not 0 <= index < 9 or not is_legal(x, o, index):
+            return None, "Jogada inválida."
+    elif not 0 <= index < size * size or state["board"][index] != EMPTY:
+        return None, "Jogada inválida."
+    new_state = copy.deepcopy(state)
+    new_state["board"][index] = state["current_player"]
+    new_state["current_player"] = "O" if state["current_player"] == "X" else "X"
+    new_state["moves"] = bytes(state.get("moves") or b"") + bytes((index,))  # Um byte por jogada
+    if size == 3 and k == 3:
+        new_state["winner"] = result(new_state["board"])
+    else:
+        # Tabuleiros N×N: só as linhas que passam pela casa jogada
+        new_state["winner"] = boards.outcome_after(new_state["board"], size, k, index)
+    return new_state, None
+
+
+def evaluate_many(boards):
+    """
+    Avalia vários tabuleiros de uma vez com NumPy.
+    :param boards: Array (N, 9) com "X"/"O"/" " ou com códigos 0 (vazio), 1 (X) e 2 (O).
+    :return: Array (N,) com ONGOING, X_WINS, O_WINS, DRAW ou INVALID.
+        INVALID marca posições impossíveis (contagem de peças incoerente,
+        dois vencedores ou vitória de quem não jogou por último).
+    """
+    import numpy as np  # Dependência usada apenas na API vetorizada
+
+    x, o = masks_many(boards)
+    wins = np.frombuffer(WINS, dtype=np.uint8).astype(bool)
+    x_wins, o_wins = wins[x], wins[o]
+    bit_count = np.frombuffer(BIT_COUNT, dtype=np.uint8).astype(np.int8)
+    x_count, o_count = bit_count[x], bit_count[o]
+
+    results = np.full(len(x), ONGOING, dtype=np.uint8)
+    results[(x | o) == FULL] = DRAW
+    results[x_wins] = X_WINS
+    results[o_wins] = O_WINS
+    invalid = (
+        ((x & o) != 0)
+        | ((x_count - o_count) < 0) | ((x_count - o_count) > 1)
+        | (x_wins & o_wins)
+        | (x_wins & (x_count == o_count))
+        | (o_wins & (x_count != o_count))
+    )
+    results[invalid] = INVALID
+    return results
+
+
+def masks_many(boards):
+    """
+    Converte vários tabuleiros em máscaras com NumPy.
+    :param boards: Array (N, 9) com "X"/"O"/" " ou com códigos 0, 1 e 2.
+    :return: Tupla de arrays (máscaras de X, máscaras de O).
+    """
+    import numpy as np
+
+    boards = np.asarray(boards)
+    if boards.ndim != 2 or boards.shape[1] != 9:
+        raise ValueError("Esperado um array com formato (N, 9).")
+    if boards.dtype.kind in "UO":
+        is_x, is_o = boards == "X", boards == "O"
+    else:
+        is_x, is_o = boards == 1, boards == 2
+    weights = 1 << np.arange(9, dtype=np.int64)
+    return is_x.astype(np.int64) @ weights, is_o.astype(np.int64) @ weights
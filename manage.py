@@ -0,0 +1,240 @@
+"""
+Comandos de manutenção do Jogo da Velha Multiplayer.
+
+Uso:
+    python manage.py export             # Regrava games.json/rooms.json a partir do diário
+    python manage.py --storage sqlite export   # ... ou a partir do banco SQLite
+    python manage.py compact            # Força a compactação dos diários em um novo snapshot
+    python manage.py validate           # Verifica se os tabuleiros salvos são posições possíveis
+    python manage.py migrate-sqlite     # Importa os arquivos pages/js/*.json para o SQLite
+    python manage.py shard              # Divide games.json/rooms.json em um arquivo por partida/sala
+    python manage.py unshard            # Junta os arquivos por partida/sala de volta nos JSON
+    python manage.py migrate-schema     # Regrava partidas e salas no schema v2 compacto
+    python manage.py solve              # Regera a tabela do robô (game/solved.bin)
+    python manage.py archive            # Move as partidas encerradas para o arquivo morto
+    python manage.py replay <id>        # Mostra jogada a jogada uma partida arquivada
+    python manage.py archive-stats      # Resultados das partidas arquivadas (lidas em fluxo)
+    python manage.py rebuild-ranking [--elo]   # Recalcula o ranking a partir de todo o histórico
+
+Os comandos que só leem as salas (validate, replay, archive-stats e rebuild-ranking) abrem o
+RoomManager com ``migrate=False``: os logs de acesso antigos não saem do rooms.json e nem o
+rooms.json nem o access_log.json são regravados. A migração acontece ao abrir as salas no
+app, no servidor ou nos comandos shard e migrate-schema.
+"""
+import argparse
+import heapq
+
+from game import ai, board, engine
+from managers.game_manager import GameManager
+from managers.ranking_manager import RankingManager
+from managers.room_manager import RoomManager
+from managers.storage import DEFAULT_DB, migrate_json_to_sqlite, migrate_schema, shard_json, unshard_json
+
+GAMES_FILE = 'pages/js/games.json'
+ROOMS_FILE = 'pages/js/rooms.json'
+USERS_FILE = 'pages/js/users.json'
+RANKING_FILE = 'pages/js/ranking.json'
+
+
+def export(args):
+    """Exporta o estado do diário (ou do SQLite) para os arquivos JSON tradicionais."""
+    storage = args.storage if args.storage != 'json' else 'journal'
+    game_manager = GameManager(file_path=args.games, storage=storage, db_path=args.db)
+    room_manager = RoomManager(file_path=args.rooms, storage=storage, db_path=args.db)
+    game_manager.export_games()
+    room_manager.export_rooms()
+    print(f"{len(game_manager.games)} partidas e {len(room_manager.rooms)} salas exportadas.")
+
+
+def compact(args):
+    """Compacta os diários de partidas e salas em novos snapshots."""
+    for manager in (GameManager(file_path=args.games, storage='journal'),
+                    RoomManager(file_path=args.rooms, storage='journal')):
+        manager.store.journal.compact(wait=True)
+        manager.store.close()
+    print("Diários compactados.")
+
+
+def migrate_sqlite(args):
+    """Importa os quatro arquivos JSON para o banco SQLite."""
+    for name, file_path in (("games", args.games), ("rooms", args.rooms),
+                            ("users", args.users), ("ranking", args.ranking)):
+        count = migrate_json_to_sqlite(name, file_path, args.db)
+        print(f"{name}: {count} registros importados de {file_path}.")
+
+
+def shard(args):
+    """Divide os arquivos de partidas e salas em um arquivo por registro mais o manifesto."""
+    # Carregar as salas no modo JSON tira os logs de acesso antigos de dentro do rooms.json
+    RoomManager(file_path=args.rooms)
+    for name, file_path in (("games", args.games), ("rooms", args.rooms)):
+        count = shard_json(name, file_path)
+        print(f"{name}: {count} registros divididos a partir de {file_path}.")
+
+
+def unshard(args):
+    """Junta os arquivos por registro de volta nos arquivos JSON monolíticos."""
+    for name, file_path in (("games", args.games), ("rooms", args.rooms)):
+        count = unshard_json(name, file_path)
+        print(f"{name}: {count} registros gravados em {file_path}.")
+
+
+def migrate_schema_command(args):
+    """Regrava partidas e salas no schema v2 (chaves curtas, tabuleiro empacotado, sem indentação)."""
+    # As salas passam antes pelo RoomManager para tirar os logs de acesso antigos de dentro delas
+    RoomManager(file_path=args.rooms, storage=args.storage, db_path=args.db)
+    for name, file_path in (("games", args.games), ("rooms", args.rooms)):
+        count = migrate_schema(name, file_path, args.storage, args.db)
+        print(f"{name}: {count} registros regravados no schema v2.")
+
+
+def solve(args):
+    """Resolve o jogo e regrava a tabela binária usada pelo robô."""
+    count = ai.write_table()
+    print(f"{count} posições canônicas gravadas em {ai.TABLE_PATH}.")
+
+
+def archive(args):
+    """Move para o arquivo morto as partidas encerradas que ainda estão na coleção."""
+    game_manager = GameManager(file_path=args.games, storage=args.storage, db_path=args.db)
+    count = game_manager.archive_finished()
+    game_manager.archive.close()
+    print(f"{count} partidas arquivadas; {len(game_manager.games)} continuam ativas.")
+
+
+def replay(args):
+    """Imprime o tabuleiro após cada jogada de uma partida arquivada (partida ou jogo de sala)."""
+    game_manager = GameManager(file_path=args.games, storage=args.storage, db_path=args.db)
+    room_manager = RoomManager(file_path=args.rooms, storage=args.storage, db_path=args.db, migrate=False)
+    record = game_manager.get_archived_game(args.game_id)
+    archive = game_manager.archive
+    if record is None:
+        record, archive = room_manager.archive.get(args.game_id), room_manager.archive
+    if record is None:
+        print(f"Partida {args.game_id} não encontrada no arquivo morto.")
+        return
+    print(f"{' vs '.join(record['players'])} ({record['size']}×{record['size']}, {record['k']} em linha), "
+          f"resultado: {record['winner']}")
+    size = record["size"]
+    for turn, (index, mark, position) in enumerate(archive.replay(args.game_id), 1):
+        if index is not None:
+            print(f"{turn}. {mark} em {index}")
+        for row in range(size):
+            print(" " + "|".join(position[row * size:(row + 1) * size]))
+
+
+def archive_stats(args):
+    """Resume as partidas arquivadas percorrendo os segmentos em fluxo."""
+    game_manager = GameManager(file_path=args.games, storage=args.storage, db_path=args.db)
+    room_manager = RoomManager(file_path=args.rooms, storage=args.storage, db_path=args.db, migrate=False)
+    for label, games in (("partidas", game_manager.iter_archived_games()),
+                         ("jogos de sala", room_manager.iter_archived_games())):
+        count = moves = 0
+        results = {}
+        for game in games:
+            count += 1
+            moves += len(game["moves"])
+            results[game["winner"]] = results.get(game["winner"], 0) + 1
+        summary = ", ".join(f"{winner}: {total}" for winner, total in sorted(results.items(), key=str))
+        average = moves / count if count else 0
+        print(f"{label}: {count} no arquivo morto, {average:.1f} jogadas em média"
+              + (f" ({summary})" if summary else ""))
+
+
+def finished_games(game_manager, room_manager):
+    """
+    Percorre em fluxo todas as partidas encerradas: as ainda fora do arquivo morto (anteriores a ele)
+    e as dos dois arquivos mortos, intercaladas pela data de término.
+    """
+    for game in game_manager.games.values():
+        if game.get("winner"):
+            yield game
+    for summary in room_manager.list_rooms():
+        if summary["winner"]:
+            room = room_manager.get_room(summary["room_id"])
+            # Jogos com histórico de jogadas já foram para o arquivo morto ao terminar
+            if room is not None and not room.get("moves"):
+                yield room
+    yield from heapq.merge(game_manager.iter_archived_games(), room_manager.iter_archived_games(),
+                           key=lambda game: game["finished_at"])
+
+
+def rebuild_ranking(args):
+    """Recalcula o ranking do zero a partir das partidas e salas gravadas."""
+    game_manager = GameManager(file_path=args.games, storage=args.storage, db_path=args.db)
+    room_manager = RoomManager(file_path=args.rooms, storage=args.storage, db_path=args.db, migrate=False)
+    ranking_manager = RankingManager(file_path=args.ranking, storage=args.storage, db_path=args.db, elo=args.elo)
+    count = ranking_manager.rebuild(finished_games(game_manager, room_manager))
+    print(f"Ranking recalculado: {count} jogadores.")
+    for position, (player, stats) in enumerate(ranking_manager.top(5), 1):
+        elo = f", Elo {stats['elo']}" if "elo" in stats else ""
+        print(f"{position}. {player}: {stats['points']} pontos{elo}")
+
+
+def validate(args):
+    """Avalia todos os tabuleiros salvos de uma vez e aponta os inconsistentes."""
+    game_manager = GameManager(file_path=args.games, storage=args.storage, db_path=args.db)
+    room_manager = RoomManager(file_path=args.rooms, storage=args.storage, db_path=args.db, migrate=False)
+    entries = [(f"partida {game_id}", game) for game_id, game in game_manager.games.items()]
+    entries += [(f"sala {room['room_id']}", room) for room in room_manager.rooms]
+    if not entries:
+        print("Nenhum tabuleiro para validar.")
+        return
+    # Tabuleiros N×N são avaliados um a um; os 3×3 vão de uma vez para o NumPy
+    problems = 0
+    classic = []
+    for label, entry in entries:
+        size, k = entry.get("size", 3), entry.get("k", 3)
+        if (size, k) == (3, 3):
+            classic.append((label, entry))
+            continue
+        expected = board.scan_winner(entry["board"], size, k)
+        if entry.get("winner") != expected:
+            print(f"{label}: vencedor salvo {entry.get('winner')!r}, esperado {expected!r}")
+            problems += 1
+    results = engine.evaluate_many([entry["board"] for _, entry in classic]) if classic else []
+    for (label, entry), code in zip(classic, results):
+        expected = engine.RESULT_LABELS.get(int(code))
+        if code == engine.INVALID:
+            print(f"{label}: posição impossível")
+        elif entry.get("winner") != expected:
+            print(f"{label}: vencedor salvo {entry.get('winner')!r}, esperado {expected!r}")
+        else:
+            continue
+        problems += 1
+    print(f"{len(entries)} tabuleiros verificados, {problems} com problemas.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do jogo.")
+    parser.add_argument("--games", default=GAMES_FILE, help="Arquivo de partidas.")
+    parser.add_argument("--rooms", default=ROOMS_FILE, help="Arquivo de salas.")
+    parser.add_argument("--users", default=USERS_FILE, help="Arquivo de usuários.")
+    parser.add_argument("--ranking", default=RANKING_FILE, help="Arquivo de ranking.")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite", "sharded"],
+                        help="Modo de armazenamento a ler.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Banco SQLite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("export", help="Exporta o diário para os arquivos JSON.").set_defaults(func=export)
+    commands.add_parser("compact", help="Compacta os diários em snapshots.").set_defaults(func=compact)
+    commands.add_parser("validate", help="Valida os tabuleiros salvos.").set_defaults(func=validate)
+    commands.add_parser("migrate-sqlite", help="Importa os JSON para o SQLite.").set_defaults(func=migrate_sqlite)
+    commands.add_parser("shard", help="Divide os JSON em um arquivo por registro.").set_defaults(func=shard)
+    commands.add_parser("unshard", help="Junta os arquivos por registro nos JSON.").set_defaults(func=unshard)
+    commands.add_parser("migrate-schema", help="Regrava partidas e salas no schema v2.").set_defaults(
+        func=migrate_schema_command)
+    commands.add_parser("solve", help="Regera a tabela do robô.").set_defaults(func=solve)
+    commands.add_parser("archive", help="Arquiva as partidas encerradas.").set_defaults(func=archive)
+    replay_parser = commands.add_parser("replay", help="Mostra uma partida arquivada jogada a jogada.")
+    replay_parser.add_argument("game_id", help="ID da partida no arquivo morto.")
+    replay_parser.set_defaults(func=replay)
+    commands.add_parser("archive-stats", help="Resume o arquivo morto.").set_defaults(func=archive_stats)
+    rebuild_parser = commands.add_parser("rebuild-ranking", help="Recalcula o ranking a partir do histórico.")
+    rebuild_parser.add_argument("--elo", action="store_true", help="Calcula também a nota Elo.")
+    rebuild_parser.set_defaults(func=rebuild_ranking)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
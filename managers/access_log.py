@@ -0,0 +1,250 @@
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from managers.storage import file_lock  # Lock entre processos
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class AccessLog:
+    """
+    Log de acessos às salas em arquivo append-only com rotação.
+
+    Cada entrada ou saída vira uma linha JSON anexada ao segmento ativo
+    (``access_log.json``). Quando o segmento passa de ``max_bytes`` ou de
+    ``max_age`` segundos, ele é renomeado para ``access_log.json.<data>`` e
+    as sessões ainda abertas são copiadas para o novo segmento. As sessões
+    abertas ficam num índice em memória por (room_id, username), de modo que
+    fechar uma sessão não exige percorrer o histórico.
+
+    Vários processos podem anexar ao mesmo log: cada gravação e a rotação
+    acontecem sob ``file_lock`` em ``<arquivo>.lock``, e o índice é relido do
+    segmento ativo quando um par não está nele (sessão aberta por outro
+    processo) ou quando outro processo rotacionou o segmento.
+    """
+
+    def __init__(self, file_path='pages/js/access_log.json', max_bytes=1024 * 1024, max_age=24 * 60 * 60):
+        """
+        Inicializa o log de acessos.
+        :param file_path: Caminho do segmento ativo.
+        :param max_bytes: Tamanho que dispara a rotação do segmento.
+        :param max_age: Idade (em segundos) que dispara a rotação do segmento.
+        """
+        self.file_path = file_path
+        self.lock_path = f"{file_path}.lock"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._file = None
+        self._open_sessions = {}  # (room_id, username) -> registro de entrada
+        self._segment_started = None
+        self._carried_bytes = 0  # Bytes das sessões copiadas na rotação, fora do limite
+        with file_lock(self.lock_path):
+            self._load_open_sessions()
+
+    def enter(self, room_id, username, status):
+        """
+        Registra a entrada de um usuário numa sala.
+        Uma sessão anterior ainda aberta para o mesmo par é encerrada antes.
+        :param status: "Jogador" ou "Visualizador".
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._follow_rotation()
+            now = datetime.now().strftime(TIME_FORMAT)
+            if (room_id, username) in self._open_sessions:
+                self._write({"event": "exit", "room_id": room_id, "username": username, "time": now})
+            record = {"event": "enter", "room_id": room_id, "username": username, "status": status, "time": now}
+            self._open_sessions[(room_id, username)] = record
+            self._write(record)
+
+    def exit(self, room_id, username):
+        """
+        Registra a saída de um usuário de uma sala.
+        :return: True se havia uma sessão aberta para o par.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._follow_rotation()
+            if (room_id, username) not in self._open_sessions:
+                # A sessão pode ter sido aberta por outro processo: relê o segmento ativo
+                self._reopen()
+            if self._open_sessions.pop((room_id, username), None) is None:
+                return False
+            now = datetime.now().strftime(TIME_FORMAT)
+            self._write({"event": "exit", "room_id": room_id, "username": username, "time": now})
+            return True
+
+    def open_sessions(self, room_id=None):
+        """
+        Retorna as sessões abertas, opcionalmente só as de uma sala.
+        :return: Lista de registros de entrada.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._reopen()
+            return [
+                dict(record) for (room, _), record in self._open_sessions.items()
+                if room_id is None or room == room_id
+            ]
+
+    def import_entries(self, room_id, entries):
+        """
+        Importa entradas no formato antigo (``room["access_log"]`` do rooms.json).
+        :param entries: Lista com username, status, access_time e exit_time.
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._follow_rotation()
+            for entry in entries:
+                key = (room_id, entry["username"])
+                record = {"event": "enter", "room_id": room_id, "username": entry["username"],
+                          "status": entry["status"], "time": entry["access_time"]}
+                self._write(record)
+                if entry.get("exit_time"):
+                    self._write({"event": "exit", "room_id": room_id, "username": entry["username"],
+                                 "time": entry["exit_time"]})
+                    self._open_sessions.pop(key, None)
+                else:
+                    self._open_sessions[key] = record
+
+    def segments(self):
+        """Retorna os segmentos do mais antigo ao mais recente (o ativo por último)."""
+        rotated = sorted(path for path in glob.glob(f"{glob.escape(self.file_path)}.*") if path != self.lock_path)
+        return rotated + [self.file_path]
+
+    def iter_sessions(self, room_id=None, username=None):
+        """
+        Percorre o histórico de sessões segmento a segmento, sem carregar tudo em memória.
+        :param room_id: Filtra por sala (opcional).
+        :param username: Filtra por usuário (opcional).
+        :return: Gerador de dicionários no formato antigo (username, status, access_time, exit_time),
+            com o room_id incluído. Sessões ainda abertas vêm por último, com exit_time None.
+        """
+        pending = {}
+        for record in self._iter_records(self.segments()):
+            key = (record["room_id"], record["username"])
+            if room_id is not None and key[0] != room_id:
+                continue
+            if username is not None and key[1] != username:
+                continue
+            if record["event"] == "enter":
+                # Sessões copiadas na rotação reaparecem no segmento seguinte
+                if record.get("carried") and key in pending:
+                    continue
+                pending[key] = record
+            elif key in pending:
+                yield self._session(pending.pop(key), record["time"])
+        for record in pending.values():
+            yield self._session(record, None)
+
+    def close(self):
+        """Fecha o segmento ativo."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _load_open_sessions(self):
+        # O segmento ativo contém as sessões abertas copiadas na última rotação
+        # e tudo o que qualquer processo anexou depois dela
+        self._open_sessions = {}
+        self._segment_started = None
+        self._carried_bytes = 0
+        carrying = True
+        for line, record in self._iter_lines(self.file_path):
+            if self._segment_started is None:
+                # Registros copiados na rotação trazem o horário da rotação
+                self._segment_started = self._timestamp(record.get("carried") or record["time"])
+            carrying = carrying and bool(record.get("carried"))
+            if carrying:
+                self._carried_bytes += len(line.encode('utf-8'))
+            key = (record["room_id"], record["username"])
+            if record["event"] == "enter":
+                self._open_sessions[key] = record
+            else:
+                self._open_sessions.pop(key, None)
+
+    def _reopen(self):
+        """Relê o segmento ativo, largando o arquivo aberto se outro processo o rotacionou. Chamado sob o lock."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._load_open_sessions()
+
+    def _follow_rotation(self):
+        """Relê o segmento ativo se o arquivo aberto foi rotacionado por outro processo. Chamado sob o lock."""
+        if self._file is None:
+            return
+        try:
+            rotated = not os.path.samestat(os.fstat(self._file.fileno()), os.stat(self.file_path))
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self._reopen()
+
+    def _write(self, record):
+        # Chamado sob file_lock: nenhum outro processo anexa ou rotaciona ao mesmo tempo
+        if self._file is None:
+            self._file = open(self.file_path, 'a', encoding='utf-8')
+        if self._segment_started is None:
+            self._segment_started = time.time()
+        self._file.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + "\n")
+        self._file.flush()
+        size = self._file.tell() - self._carried_bytes
+        if size >= self.max_bytes or time.time() - self._segment_started >= self.max_age:
+            self._rotate()
+
+    def _rotate(self):
+        # Relê o segmento para copiar também as sessões abertas por outros processos
+        self._reopen()
+        now = datetime.now()
+        os.replace(self.file_path, f"{self.file_path}.{now.strftime('%Y%m%d%H%M%S%f')}")
+        self._segment_started = time.time()
+        self._carried_bytes = 0
+        if self._open_sessions:
+            self._file = open(self.file_path, 'a', encoding='utf-8')
+            for record in self._open_sessions.values():
+                carried = dict(record, carried=now.strftime(TIME_FORMAT))
+                self._file.write(json.dumps(carried, separators=(',', ':'), ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._carried_bytes = self._file.tell()
+
+    @classmethod
+    def _iter_records(cls, paths):
+        for path in paths:
+            for _, record in cls._iter_lines(path):
+                yield record
+
+    @staticmethod
+    def _iter_lines(path):
+        """Gera tuplas (linha, registro) de um segmento."""
+        try:
+            file = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    yield line, json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Linha incompleta de uma gravação interrompida
+
+    @staticmethod
+    def _session(record, exit_time):
+        return {
+            "room_id": record["room_id"],
+            "username": record["username"],
+            "status": record["status"],
+            "access_time": record["time"],
+            "exit_time": exit_time,
+        }
+
+    @staticmethod
+    def _timestamp(text):
+        try:
+            return datetime.strptime(text, TIME_FORMAT).timestamp()
+        except ValueError:
+            return time.time()
@@ -0,0 +1,232 @@
+import base64
+import glob
+import itertools
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+from game.board import SparseBoard, replay
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Numeração dos segmentos abertos no processo (dois arquivos no mesmo microssegundo não colidem)
+_segment_numbers = itertools.count()
+
+
+class GameArchive:
+    """
+    Arquivo morto de partidas encerradas em segmentos comprimidos append-only.
+
+    Cada partida vira uma linha JSON (jogadores, vencedor, configuração do
+    tabuleiro e o histórico de jogadas, um byte por jogada) anexada a um
+    fluxo zlib. Depois de cada partida o fluxo é descarregado com
+    ``Z_SYNC_FLUSH``, de modo que o segmento pode ser lido enquanto é
+    escrito e uma gravação interrompida perde só a última linha. Cada
+    processo escreve no seu próprio segmento (``<prefixo>-<data>-<pid>-<n>.z``)
+    e troca de segmento ao passar de ``max_bytes``; nada é reescrito.
+
+    O índice ``<prefixo>.index`` (uma linha ``id<TAB>segmento`` por partida)
+    permite achar uma partida abrindo só o segmento dela. Segmentos que não
+    aparecem no índice (gravados antes dele ou com o arquivo do índice
+    perdido) são indexados uma única vez, na primeira busca que não achar o ID.
+    """
+
+    def __init__(self, directory='pages/js/archive', prefix='games', max_bytes=4 * 1024 * 1024):
+        """
+        Inicializa o arquivo morto.
+        :param directory: Pasta dos segmentos.
+        :param prefix: Prefixo dos arquivos ("games" para partidas, "rooms" para jogos das salas).
+        :param max_bytes: Tamanho comprimido que encerra o segmento atual.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, f"{prefix}.index")
+        self._lock = threading.Lock()
+        self._file = None
+        self._compressor = None
+        self._segment = None
+        self._index = {}  # id -> nome do segmento
+        self._indexed = set()  # Segmentos presentes no índice
+        self._index_offset = 0  # Bytes do índice já lidos
+
+    def append(self, game_id, game, **fields):
+        """
+        Anexa uma partida encerrada ao segmento atual.
+        :param game_id: ID da partida no arquivo morto.
+        :param game: Registro da partida (players, winner, size, k, moves e board).
+        :param fields: Campos extras gravados junto (ex: room_id).
+        :return: O registro gravado.
+        """
+        record = {
+            "id": game_id,
+            "players": list(game.get("players") or []),
+            "winner": game.get("winner"),
+            "size": game.get("size", 3),
+            "k": game.get("k", 3),
+            "moves": base64.b64encode(bytes(game.get("moves") or b"")).decode("ascii"),
+            "finished_at": datetime.now().strftime(TIME_FORMAT),
+        }
+        if not record["moves"]:
+            # Partidas anteriores ao histórico de jogadas guardam só a posição final
+            board = game.get("board")
+            record["board"] = board.to_json() if isinstance(board, SparseBoard) else "".join(board or ())
+        record.update(fields)
+        line = json.dumps(record, separators=(',', ':'), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open_segment()
+            self._file.write(self._compressor.compress(line.encode("utf-8")))
+            self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+            self._file.flush()
+            with open(self.index_path, 'a', encoding='utf-8') as index:
+                index.write(f"{game_id}\t{self._segment}\n")
+            self._index[str(game_id)] = self._segment
+            self._indexed.add(self._segment)
+            if self._file.tell() >= self.max_bytes:
+                self._close_segment()
+        return record
+
+    def segments(self):
+        """Retorna os caminhos dos segmentos do mais antigo ao mais recente."""
+        return sorted(glob.glob(os.path.join(glob.escape(self.directory), f"{glob.escape(self.prefix)}-*.z")))
+
+    def iter_games(self, player=None, winner=None, include_idle=False):
+        """
+        Percorre o arquivo morto segmento a segmento, sem carregá-lo em memória.
+        Partidas guardadas por inatividade (``idle``) ficam de fora, salvo com ``include_idle``.
+        :param player: Filtra pelas partidas de um jogador (opcional).
+        :param winner: Filtra pelo resultado: "X", "O" ou "Empate" (opcional).
+        :param include_idle: Inclui as partidas inacabadas guardadas por inatividade.
+        :return: Gerador de dicionários com o histórico em ``moves`` (bytes).
+        """
+        for path in self.segments():
+            for record in self._iter_segment(path):
+                if record.get("idle") and not include_idle:
+                    continue
+                if player is not None and player not in record["players"]:
+                    continue
+                if winner is not None and record["winner"] != winner:
+                    continue
+                yield record
+
+    def get(self, game_id):
+        """
+        Busca uma partida arquivada pelo ID, lendo só o segmento indicado no índice.
+        Se a partida foi gravada mais de uma vez (ex: guardada por inatividade e depois
+        encerrada), vale a gravação mais recente.
+        :return: Dicionário da partida ou None se não estiver arquivada.
+        """
+        game_id = str(game_id)
+        with self._lock:
+            self._read_index()
+            if game_id not in self._index:
+                self._index_segments()
+            segment = self._index.get(game_id)
+        if segment is None:
+            return None
+        found = None
+        for record in self._iter_segment(os.path.join(self.directory, segment)):
+            if str(record["id"]) == game_id:
+                found = record
+        return found
+
+    def replay(self, game_id):
+        """
+        Reconstrói uma partida arquivada jogada a jogada.
+        :return: Lista de tuplas (casa, peça, tabuleiro após a jogada) ou None se a partida não existir.
+            Partidas sem histórico trazem só a posição final, com casa e peça None.
+        """
+        record = self.get(game_id)
+        if record is None:
+            return None
+        if not record["moves"] and "board" in record:
+            board = record["board"]
+            board = SparseBoard.from_json(record["size"], board) if isinstance(board, dict) else list(board)
+            return [(None, None, board)]
+        return [(index, mark, board.copy()) for index, mark, board in replay(record["moves"], record["size"])]
+
+    def close(self):
+        """Encerra o segmento atual (o próximo append abre outro)."""
+        with self._lock:
+            self._close_segment()
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        self._segment = f"{self.prefix}-{stamp}-{os.getpid()}-{next(_segment_numbers)}.z"
+        self._file = open(os.path.join(self.directory, self._segment), 'ab')
+        self._compressor = zlib.compressobj(9)
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.write(self._compressor.flush(zlib.Z_FINISH))
+            self._file.close()
+            self._file = None
+            self._compressor = None
+
+    def _read_index(self):
+        # Lê só o que outros processos anexaram desde a última leitura
+        try:
+            with open(self.index_path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size < self._index_offset:
+                    # Índice apagado e recriado: relê do início
+                    self._index, self._indexed, self._index_offset = {}, set(), 0
+                file.seek(self._index_offset)
+                data = file.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1  # Uma linha incompleta fica para a próxima leitura
+        for line in data[:end].decode("utf-8").splitlines():
+            game_id, _, segment = line.partition("\t")
+            if segment:
+                self._index[game_id] = segment
+                self._indexed.add(segment)
+        self._index_offset += end
+
+    def _index_segments(self):
+        """Anexa ao índice as partidas dos segmentos que ainda não estão nele (só eles são lidos)."""
+        lines = []
+        for path in self.segments():
+            segment = os.path.basename(path)
+            if segment in self._indexed:
+                continue
+            for record in self._iter_segment(path):
+                game_id = str(record["id"])
+                # Os nomes dos segmentos começam pela data: vale a gravação do segmento mais recente
+                if self._index.get(game_id, "") <= segment:
+                    self._index[game_id] = segment
+                    lines.append(f"{game_id}\t{segment}\n")
+            self._indexed.add(segment)
+        if lines:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.index_path, 'a', encoding='utf-8') as index:
+                index.write("".join(lines))
+
+    @staticmethod
+    def _iter_segment(path, chunk_size=64 * 1024):
+        decompressor = zlib.decompressobj()
+        pending = b""
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                try:
+                    pending += decompressor.decompress(chunk)
+                except zlib.error:
+                    break  # Segmento danificado: o que veio antes continua válido
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    record["moves"] = base64.b64decode(record.get("moves") or "")
+                    yield record
@@ -0,0 +1,36 @@
+"""
+Gravação atômica de arquivos.
+
+O conteúdo vai para um temporário no mesmo diretório, recebe ``fsync`` e
+substitui o arquivo com ``os.replace``: um leitor (ou outro processo) vê o
+arquivo antigo ou o novo, nunca um arquivo pela metade, e uma queda no meio
+da gravação deixa o arquivo anterior intacto.
+"""
+import contextlib
+import os
+import threading
+
+# fsync antes da troca; desligar só em testes de carga que não se importam com quedas de energia
+FSYNC = True
+
+
+def write_atomic(path, dump, fsync=None):
+    """
+    Substitui o arquivo ``path`` de uma vez.
+    :param path: Arquivo de destino.
+    :param dump: Função que recebe o arquivo temporário (texto, UTF-8) e escreve o conteúdo.
+    :param fsync: Força o fsync do temporário antes da troca (padrão: FSYNC).
+    """
+    # Nome único por processo e thread: gravações simultâneas não usam o mesmo temporário
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            dump(file)
+            file.flush()
+            if FSYNC if fsync is None else fsync:
+                os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
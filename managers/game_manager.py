@@ -1,101 +1,283 @@
-import json  # Para manipular arquivos JSON
+import os
+import time
 import uuid  # Para gerar IDs únicos para os jogos
-from github import Github  # Para sincronizar com o GitHub
+from game.board import EMPTY, MAX_SIZE, SparseBoard, new_board  # Tabuleiros N×N (esparsos nos tamanhos grandes)
+from managers.archive import GameArchive  # Arquivo morto das partidas encerradas
+from managers.github_sync import GitHubSync  # Sincronização com o GitHub em segundo plano
+from managers.moves import apply_versioned_move  # Jogadas com compare-and-swap
+from managers.registry import Stamped  # Detecção de alterações no arquivo
+from managers.schema import GameRecord  # Partida com __slots__ e acesso de dicionário
+from managers.storage import DEFAULT_DB, JsonStore, LAYOUTS, open_store, record_version  # Camada de armazenamento
 
+# Partida inacabada sem atividade por este tempo (em segundos) vai para o arquivo morto
+GAME_TTL = 24 * 60 * 60
 
-class GameManager:
-    def __init__(self, file_path='pages/js/games.json', repo_name='', branch='main', token=''):
+
+class GameManager(Stamped):
+    def __init__(self, file_path='pages/js/games.json', repo_name='', branch='main', token='', sync=None,
+                 storage='json', db_path=DEFAULT_DB, store=None, archive=None):
         """
         Inicializa o gerenciador de partidas.
         :param file_path: Caminho do arquivo JSON local que armazena as partidas.
         :param repo_name: Nome do repositório no GitHub (ex: 'usuario/repo').
         :param branch: Nome da branch do repositório (ex: 'main').
         :param token: Token de acesso pessoal do GitHub.
+        :param sync: GitHubSync compartilhado; por padrão usa o do repositório informado.
+        :param storage: Modo de armazenamento: "json", "journal" (diário append-only), "sqlite"
+            ou "sharded" (um arquivo por partida).
+        :param db_path: Caminho do banco SQLite (modo "sqlite").
+        :param store: Coleção já construída; substitui ``storage``.
+        :param archive: GameArchive das partidas encerradas (padrão: pasta "archive" ao lado do arquivo).
         """
         self.file_path = file_path
         self.repo_name = repo_name
         self.branch = branch
         self.token = token
+        if sync is None and repo_name and token:
+            sync = GitHubSync.shared(repo_name, branch, token)
+        self.sync = sync
+        self.store = store or open_store("games", file_path, storage, db_path, sync=sync)
+        # Partidas encerradas saem da coleção e vão para o arquivo morto
+        if archive is None:
+            archive = GameArchive(os.path.join(os.path.dirname(file_path), 'archive'), prefix='games')
+        self.archive = archive
         self.games = self.load_games()
+        # Último acesso a cada partida neste processo; as ainda não acessadas contam desde a carga
+        self._last_active = {}
+        self._loaded_at = time.time()
+        self.touch_stamp()
+
+    def reload(self):
+        """Relê as partidas do armazenamento."""
+        self.games = self.store.reload()
+        self.touch_stamp()
 
     def load_games(self):
         """
-        Carrega o estado das partidas do arquivo JSON.
-        :return: Um dicionário contendo as partidas ou vazio, caso o arquivo não exista.
+        Carrega o estado das partidas do armazenamento.
+        :return: Um dicionário contendo as partidas ou vazio, caso não haja nenhuma.
         """
-        try:
-            with open(self.file_path, 'r') as file:
-                return json.load(file).get("games", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return self.store.load_all()
 
     def save_games(self):
         """
-        Salva o estado atualizado das partidas no arquivo JSON e no GitHub.
-        """
-        # Salva no arquivo local
-        with open(self.file_path, 'w') as file:
-            json.dump({"games": self.games}, file, indent=4)
-
-        # Sincroniza com o GitHub
-        if self.repo_name and self.token:
-            try:
-                g = Github(self.token)
-                repo = g.get_repo(self.repo_name)
-                contents = repo.get_contents(self.file_path, ref=self.branch)
-                with open(self.file_path, 'r') as file:
-                    content = file.read()
-                repo.update_file(
-                    path=contents.path,
-                    message="Atualizando games.json via Streamlit",
-                    content=content,
-                    sha=contents.sha,
-                    branch=self.branch,
-                )
-                print("Estado das partidas atualizado no GitHub!")
-            except Exception as e:
-                print(f"Erro ao atualizar o arquivo no GitHub: {e}")
-
-    def initialize_game(self, player1, player2):
+        Grava todas as partidas de uma vez (no modo JSON, agenda também o envio ao GitHub).
+        """
+        self.store.replace_all(self.games)
+        self.touch_stamp()
+
+    def persist_game(self, game_id):
+        """
+        Persiste a alteração de uma única partida.
+        No diário ou no SQLite só o registro da partida é gravado; no JSON o arquivo é reescrito.
+        :param game_id: ID da partida alterada ou removida.
+        """
+        if game_id in self.games:
+            game = self.games[game_id]
+            game["version"] = record_version(game) + 1
+            game["updated_at"] = int(time.time())
+            self._last_active[game_id] = time.time()
+            self.store.put(game_id, game)
+        else:
+            self.store.delete(game_id)
+        self.touch_stamp()
+
+    def export_games(self):
+        """
+        Exporta o estado atual para o arquivo JSON tradicional (e para o GitHub).
+        Útil nos modos diário e SQLite, em que o arquivo não é reescrito a cada jogada.
+        """
+        JsonStore(self.file_path, sync=self.sync, **LAYOUTS["games"]).replace_all(self.games)
+
+    def initialize_game(self, player1, player2, size=3, k=3):
         """
         Cria uma nova partida com os jogadores fornecidos.
         :param player1: Nome do jogador 1.
         :param player2: Nome do jogador 2.
+        :param size: Lado do tabuleiro (3 no Jogo da Velha).
+        :param k: Peças em linha para vencer.
         :return: ID único da partida criada.
         """
+        if size > MAX_SIZE:
+            raise ValueError(f"O lado do tabuleiro deve ser no máximo {MAX_SIZE}.")
         game_id = str(uuid.uuid4())
-        self.games[game_id] = {
-            "board": [" "] * 9,  # Tabuleiro vazio
-            "current_player": "X",  # Jogador inicial
-            "players": [player1, player2],  # Lista de jogadores
-            "winner": None,  # Inicialmente sem vencedor
-        }
-        self.save_games()
+        self.games[game_id] = GameRecord(
+            board=new_board(size),  # Tabuleiro vazio
+            current_player="X",  # Jogador inicial
+            players=[player1, player2],  # Lista de jogadores
+            winner=None,  # Inicialmente sem vencedor
+            size=size,
+            k=k,
+        )
+        self.persist_game(game_id)
         return game_id
 
     def get_game(self, game_id):
         """
         Recupera o estado de uma partida específica.
+        Uma partida guardada por inatividade volta do arquivo morto para a coleção.
         :param game_id: ID da partida.
         :return: Estado da partida ou None se o ID não existir.
         """
-        return self.games.get(game_id)
+        game = self.games.get(game_id)
+        if game is None:
+            game = self.restore_game(game_id)
+        if game is not None:
+            self._last_active[game_id] = time.time()
+        return game
 
     def update_game(self, game_id, board, current_player, winner=None):
         """
         Atualiza o estado de uma partida.
+        As casas ocupadas desde o último estado entram no histórico de jogadas;
+        se houver vencedor, a partida vai para o arquivo morto.
         :param game_id: ID da partida.
         :param board: Estado atualizado do tabuleiro.
         :param current_player: Próximo jogador.
         :param winner: Vencedor da partida (se houver).
         """
-        if game_id in self.games:
-            self.games[game_id].update({
+        game = self.get_game(game_id)
+        if game is not None:
+            played = bytes(
+                index for index, cell in enumerate(board) if cell != EMPTY and game["board"][index] == EMPTY
+            )
+            game.update({
                 "board": board,
                 "current_player": current_player,
                 "winner": winner,
+                "moves": bytes(game.get("moves") or b"") + played,
             })
-            self.save_games()
+            if winner:
+                self.archive_game(game_id)
+            else:
+                self.persist_game(game_id)
+
+    def apply_move(self, game_id, index, player, expected_version=None):
+        """
+        Faz uma jogada na partida com compare-and-swap sobre a versão da partida.
+        A jogada que encerra a partida a manda para o arquivo morto.
+        :param game_id: ID da partida.
+        :param index: Casa escolhida (0 a size² - 1).
+        :param player: Nome do jogador.
+        :param expected_version: Versão vista pelo jogador (padrão: a da cópia local).
+        :return: MoveResult (ok, conflict, state, error).
+        """
+        game = self.get_game(game_id)
+        if expected_version is None:
+            expected_version = record_version(game) if game else 0
+        result = apply_versioned_move(self.store, game_id, index, player, expected_version)
+        if result.state is not None:
+            self.games[game_id] = result.state
+        if result.ok:
+            if result.state["winner"]:
+                self.archive_game(game_id)
+            self.touch_stamp()
+        return result
+
+    def archive_game(self, game_id):
+        """
+        Move uma partida para o arquivo morto e a remove da coleção.
+        :param game_id: ID da partida.
+        :return: True se a partida existia.
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            return False
+        self.archive.append(game_id, game)
+        del self.games[game_id]
+        self._last_active.pop(game_id, None)
+        self.persist_game(game_id)
+        return True
+
+    def evict_game(self, game_id):
+        """
+        Guarda uma partida inacabada no arquivo morto e a remove da coleção.
+        Ela volta sozinha no próximo ``get_game``.
+        :return: True se a partida existia.
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            return False
+        self.archive.append(game_id, game, idle=True)
+        del self.games[game_id]
+        self._last_active.pop(game_id, None)
+        self.persist_game(game_id)
+        return True
+
+    def restore_game(self, game_id):
+        """
+        Traz de volta à coleção uma partida guardada por inatividade.
+        :return: A partida restaurada ou None se ela não estiver guardada.
+        """
+        record = self.archive.get(game_id)
+        if record is None or not record.get("idle") or game_id in self.games:
+            return None
+        size = record["size"]
+        if record["moves"]:
+            board = new_board(size)
+            for turn, index in enumerate(record["moves"]):
+                board[index] = "XO"[turn % 2]
+        else:
+            board = record["board"]
+            board = SparseBoard.from_json(size, board) if isinstance(board, dict) else list(board)
+        self.games[game_id] = GameRecord(
+            board=board,
+            current_player="X" if board.count("X") == board.count("O") else "O",
+            players=record["players"],
+            size=size,
+            k=record["k"],
+            moves=record["moves"],
+        )
+        self.persist_game(game_id)
+        return self.games[game_id]
+
+    def sweep(self, game_ttl=GAME_TTL, now=None):
+        """
+        Guarda no arquivo morto as partidas inacabadas sem atividade há mais de ``game_ttl`` segundos
+        e arquiva as encerradas que ainda estiverem na coleção.
+        A atividade vista neste processo é confirmada pelo ``updated_at`` gravado (outros processos).
+        :return: Número de partidas tiradas da coleção.
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        for game_id in list(self.games):
+            if now - self._last_active.get(game_id, self._loaded_at) <= game_ttl:
+                continue
+            game = self.games.get(game_id)
+            if game is None:
+                continue
+            if game.get("winner"):
+                removed += self.archive_game(game_id)
+            elif now - max(game.get("updated_at") or 0, self._loaded_at) > game_ttl:
+                removed += self.evict_game(game_id)
+            else:
+                self._last_active[game_id] = game["updated_at"]
+        return removed
+
+    def archive_finished(self):
+        """
+        Arquiva as partidas encerradas que ainda estão na coleção (ex: gravadas antes do arquivo morto).
+        :return: Número de partidas arquivadas.
+        """
+        finished = [game_id for game_id, game in self.games.items() if game.get("winner")]
+        for game_id in finished:
+            self.archive_game(game_id)
+        return len(finished)
+
+    def get_archived_game(self, game_id):
+        """Retorna uma partida do arquivo morto (ou None), com o histórico de jogadas em bytes."""
+        return self.archive.get(game_id)
+
+    def replay_game(self, game_id):
+        """
+        Reconstrói jogada a jogada uma partida arquivada.
+        :return: Lista de tuplas (casa, peça, tabuleiro após a jogada) ou None.
+        """
+        return self.archive.replay(game_id)
+
+    def iter_archived_games(self, player=None, winner=None):
+        """Percorre o arquivo morto (gerador) sem carregá-lo em memória; ver GameArchive.iter_games."""
+        return self.archive.iter_games(player, winner)
 
     def delete_game(self, game_id):
         """
@@ -104,4 +286,4 @@ class GameManager:
         """
         if game_id in self.games:
             del self.games[game_id]
-            self.save_games()
+            self.persist_game(game_id)
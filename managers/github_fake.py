@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+
+
+class _Object:
+    """Objeto simples com atributos, no formato das respostas do PyGithub."""
+
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class FakeRef:
+    def __init__(self, repo, name, sha):
+        self._repo = repo
+        self.ref = f"refs/{name}"
+        self.object = _Object(sha=sha, type="commit")
+
+    def edit(self, sha, force=False):
+        """Move a referência para outro commit."""
+        with self._repo.lock:
+            if sha not in self._repo.commits:
+                raise ValueError(f"Commit inexistente: {sha}")
+            self.object.sha = sha
+
+
+class FakeRepository:
+    """
+    Imitação local da API Git Data do PyGithub (refs, commits e árvores).
+
+    Guarda os arquivos de cada commit em memória, permitindo exercitar o
+    GitHubSync sem rede: ``files()`` devolve o conteúdo da branch e
+    ``commits`` registra cada commit criado. Como o GitHub, recusa remover
+    (``sha=None``) um caminho que não está na árvore base.
+    """
+
+    def __init__(self, files=None, branch='main', latency=0.0):
+        """
+        Inicializa o repositório falso.
+        :param files: Dicionário caminho -> conteúdo do commit inicial.
+        :param branch: Nome da branch inicial.
+        :param latency: Atraso artificial (em segundos) de cada chamada, para simular a rede.
+        """
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.calls = 0
+        self.commits = {}
+        self.trees = {}
+        root = self._store_commit("Commit inicial", dict(files or {}), [])
+        self.refs = {f"heads/{branch}": FakeRef(self, f"heads/{branch}", root.sha)}
+
+    def get_git_ref(self, ref):
+        self._call()
+        return self.refs[ref]
+
+    def get_git_commit(self, sha):
+        self._call()
+        return self.commits[sha]
+
+    def get_git_tree(self, sha, recursive=False):
+        """Árvore com um elemento (path, type) por arquivo; ``recursive`` é aceito por compatibilidade."""
+        self._call()
+        files = self.trees[sha].files
+        return _Object(sha=sha, tree=[_Object(path=path, type="blob") for path in sorted(files)])
+
+    def create_git_tree(self, tree, base_tree=None):
+        self._call()
+        files = dict(base_tree.files) if base_tree is not None else {}
+        for element in tree:
+            identity = element._identity
+            if "content" in identity:
+                files[identity["path"]] = identity["content"]
+            elif identity.get("sha") is None:
+                if identity["path"] not in files:
+                    raise ValueError(f"Caminho fora da árvore base: {identity['path']}")
+                del files[identity["path"]]
+        return self._store_tree(files)
+
+    def create_git_commit(self, message, tree, parents):
+        self._call()
+        return self._store_commit(message, tree.files, [parent.sha for parent in parents])
+
+    def files(self, branch='main'):
+        """Retorna o conteúdo dos arquivos na ponta da branch."""
+        return dict(self.commits[self.refs[f"heads/{branch}"].object.sha].tree.files)
+
+    def _store_tree(self, files):
+        tree = _Object(sha=self._sha(sorted(files.items())), files=files)
+        with self.lock:
+            self.trees[tree.sha] = tree
+        return tree
+
+    def _store_commit(self, message, files, parents):
+        tree = self._store_tree(files)
+        commit = _Object(sha=self._sha((message, tree.sha, parents, len(self.commits))),
+                         message=message, tree=tree, parents=parents)
+        with self.lock:
+            self.commits[commit.sha] = commit
+        return commit
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _sha(value):
+        return hashlib.sha1(repr(value).encode()).hexdigest()
@@ -0,0 +1,259 @@
+import atexit
+import collections
+import os
+import threading
+import time
+
+from managers import metrics
+
+try:
+    from github import Github, InputGitTreeElement  # Para sincronizar com o GitHub
+except ImportError:  # Permite usar o FakeRepository sem o PyGithub instalado
+    Github = None
+    InputGitTreeElement = None
+
+
+class _TreeElement:
+    """Substituto mínimo do InputGitTreeElement quando o PyGithub não está disponível."""
+
+    def __init__(self, path, mode, type, content=None, sha=None):
+        self._identity = {"path": path, "mode": mode, "type": type}
+        if content is not None:
+            self._identity["content"] = content
+        else:
+            self._identity["sha"] = sha
+
+
+class GitHubSync:
+    """
+    Sincronização do estado local com o GitHub em segundo plano.
+
+    Os gerenciadores apenas marcam arquivos como "sujos" com ``mark_dirty``.
+    Uma thread agrupa as marcações feitas dentro de ``interval`` segundos e
+    envia todos os arquivos num único commit (uma árvore com vários blobs),
+    reaproveitando o mesmo cliente autenticado. Se a fila passar de
+    ``max_pending`` arquivos, quem marca espera o commit em andamento
+    (contrapressão) por até ``block_timeout`` segundos.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, repo_name='', branch='main', token='', repo=None, interval=5.0,
+                 max_pending=256, block_timeout=2.0, message="Atualizando estado via Streamlit"):
+        """
+        Inicializa o sincronizador.
+        :param repo_name: Nome do repositório no GitHub (ex: 'usuario/repo').
+        :param branch: Nome da branch do repositório (ex: 'main').
+        :param token: Token de acesso pessoal do GitHub.
+        :param repo: Repositório já construído (ex: um FakeRepository); dispensa o token.
+        :param interval: Janela (em segundos) em que as marcações são agrupadas num commit.
+        :param max_pending: Número de arquivos pendentes que ativa a contrapressão.
+        :param block_timeout: Tempo máximo (em segundos) que ``mark_dirty`` espera.
+        :param message: Mensagem dos commits.
+        """
+        self.repo_name = repo_name
+        self.branch = branch
+        self.token = token
+        self.interval = interval
+        self.max_pending = max_pending
+        self.block_timeout = block_timeout
+        self.message = message
+        self._repo = repo
+        self._cond = threading.Condition()
+        self._dirty = {}  # caminho -> instante da primeira marcação ainda não enviada
+        self._in_flight = {}
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = None
+        self._pushed = {}  # caminho -> conteúdo do último envio, para pular arquivos iguais
+        self._commit_times = collections.deque()
+        self.stats = {
+            "marks": 0,
+            "coalesced": 0,
+            "commits": 0,
+            "files_committed": 0,
+            "failures": 0,
+            "backpressure_waits": 0,
+        }
+
+    @classmethod
+    def shared(cls, repo_name, branch='main', token='', **kwargs):
+        """
+        Retorna a instância compartilhada no processo para o repositório e branch.
+        :return: GitHubSync reutilizado por todos os gerenciadores.
+        """
+        key = (repo_name, branch, token)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(repo_name, branch, token, **kwargs)
+            return cls._shared[key]
+
+    def mark_dirty(self, path):
+        """
+        Marca um arquivo local para ser enviado no próximo commit.
+        :param path: Caminho relativo do arquivo (o mesmo usado no repositório).
+        """
+        with self._cond:
+            self._ensure_worker()
+            if len(self._dirty) >= self.max_pending and path not in self._dirty:
+                self.stats["backpressure_waits"] += 1
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: len(self._dirty) < self.max_pending or self._stopping,
+                    timeout=self.block_timeout,
+                )
+            self.stats["marks"] += 1
+            if path in self._dirty:
+                self.stats["coalesced"] += 1
+            else:
+                self._dirty[path] = time.monotonic()
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Envia imediatamente o que estiver pendente e aguarda o commit.
+        :param timeout: Tempo máximo de espera em segundos (None espera indefinidamente).
+        :return: True se não restou nada pendente.
+        """
+        with self._cond:
+            if not self._dirty and not self._in_flight:
+                return True
+            self._ensure_worker()
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._dirty and not self._in_flight, timeout=timeout)
+
+    def stop(self, timeout=10.0):
+        """Envia as pendências e encerra a thread de sincronização."""
+        self.flush(timeout=timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def metrics(self):
+        """
+        Retorna as métricas do sincronizador.
+        :return: Dicionário com profundidade da fila, atraso e commits por minuto.
+        """
+        with self._cond:
+            now = time.monotonic()
+            pending = list(self._dirty.values()) + list(self._in_flight.values())
+            self._trim_commit_times(now)
+            return dict(
+                self.stats,
+                queue_depth=len(self._dirty),
+                in_flight=len(self._in_flight),
+                lag_seconds=now - min(pending) if pending else 0.0,
+                commits_per_minute=len(self._commit_times),
+            )
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            # Na saída do processo, envia o que ainda estiver pendente
+            atexit.register(self.stop)
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="github-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        backoff = 1.0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._stopping)
+                if self._stopping and not self._dirty:
+                    return
+                # Agrupa as marcações que chegarem dentro da janela
+                deadline = min(self._dirty.values()) + self.interval
+                self._cond.wait_for(
+                    lambda: self._flush_requested or self._stopping,
+                    timeout=max(0.0, deadline - time.monotonic()),
+                )
+                self._flush_requested = False
+                self._in_flight, self._dirty = self._dirty, {}
+                self._cond.notify_all()
+            with metrics.timer("sync_commit_seconds"):
+                ok = self._commit(sorted(self._in_flight))
+            with self._cond:
+                if ok:
+                    backoff = 1.0
+                else:
+                    # Devolve os arquivos à fila, preservando o instante mais antigo
+                    for path, marked in self._in_flight.items():
+                        self._dirty[path] = min(marked, self._dirty.get(path, marked))
+                self._in_flight = {}
+                self._cond.notify_all()
+                if not ok:
+                    self._cond.wait_for(lambda: self._stopping, timeout=backoff)
+                    backoff = min(backoff * 2, 60.0)
+                    if self._stopping:
+                        return
+
+    def _commit(self, paths):
+        """Envia os arquivos num único commit. Retorna False em caso de erro."""
+        try:
+            changes = {}
+            for path in paths:
+                try:
+                    with open(path, 'r', encoding='utf-8') as file:
+                        content = file.read()
+                except FileNotFoundError:
+                    content = None  # Arquivo removido localmente
+                if self._pushed.get(path, "") != content:
+                    changes[path] = content
+            if not changes:
+                return True
+
+            repo = self._get_repo()
+            ref = repo.get_git_ref(f"heads/{self.branch}")
+            parent = repo.get_git_commit(ref.object.sha)
+            # O GitHub recusa remover um caminho ausente da árvore base: só vão as remoções de
+            # arquivos que este processo enviou ou que a árvore da branch ainda tem
+            unknown = [path for path, content in changes.items() if content is None and path not in self._pushed]
+            if unknown:
+                existing = {item.path for item in repo.get_git_tree(parent.tree.sha, recursive=True).tree}
+                for path in unknown:
+                    if path.replace(os.sep, '/') not in existing:
+                        del changes[path]
+                        self._pushed[path] = None
+                if not changes:
+                    return True
+            element = InputGitTreeElement or _TreeElement
+            tree = repo.create_git_tree(
+                [
+                    element(path.replace(os.sep, '/'), "100644", "blob", content=content)
+                    if content is not None
+                    else element(path.replace(os.sep, '/'), "100644", "blob", sha=None)
+                    for path, content in changes.items()
+                ],
+                parent.tree,
+            )
+            commit = repo.create_git_commit(self.message, tree, [parent])
+            ref.edit(commit.sha)
+        except Exception as e:
+            self.stats["failures"] += 1
+            metrics.inc("sync_failures_total")
+            print(f"Erro ao sincronizar com o GitHub: {e}")
+            return False
+
+        self._pushed.update(changes)
+        with self._cond:
+            self.stats["commits"] += 1
+            self.stats["files_committed"] += len(changes)
+            self._commit_times.append(time.monotonic())
+        metrics.inc("sync_files_total", len(changes))
+        print(f"{len(changes)} arquivo(s) sincronizado(s) com o GitHub!")
+        return True
+
+    def _get_repo(self):
+        if self._repo is None:
+            self._repo = Github(self.token).get_repo(self.repo_name)
+        return self._repo
+
+    def _trim_commit_times(self, now):
+        while self._commit_times and now - self._commit_times[0] > 60:
+            self._commit_times.popleft()
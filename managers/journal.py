@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl  # Lock de arquivo entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+from managers.atomic import write_atomic
+
+# Separadores compactos: cada registro ocupa uma única linha curta
+COMPACT = (',', ':')
+
+
+class JournalLockedError(RuntimeError):
+    """O diário já está aberto por outra instância, neste ou em outro processo."""
+
+
+class Journal:
+    """
+    Armazenamento em diário (append-only) com compactação periódica.
+
+    Cada alteração vira uma linha JSON anexada ao arquivo ``<base>.journal``.
+    Quando o diário passa de ``compact_threshold`` bytes, ele é rotacionado
+    para ``<base>.journal.old`` e uma thread em segundo plano gera um novo
+    ``<base>.snapshot`` aplicando o diário antigo sobre o snapshot anterior,
+    sem tocar no estado em memória. Na inicialização, o estado é reconstruído
+    a partir do snapshot mais recente e da cauda do diário.
+
+    O número de sequência e o estado vivem na memória da instância, por isso
+    o diário tem um único dono: a instância segura um lock exclusivo em
+    ``<base>.journal.lock`` até ``close()`` e uma segunda instância (de outro
+    processo ou do mesmo) recebe ``JournalLockedError`` em vez de anexar
+    registros que a primeira não enxerga. Para vários processos (ex: o
+    ``server.py`` ao lado da interface), use os modos "sqlite" ou "sharded".
+    """
+
+    def __init__(self, base_path, compact_threshold=256 * 1024, fsync=False):
+        """
+        Inicializa o diário.
+        :param base_path: Caminho base (ex: 'pages/js/games.json').
+        :param compact_threshold: Tamanho do diário (em bytes) que dispara a compactação.
+        :param fsync: Se True, força o fsync a cada registro anexado.
+        """
+        self.base_path = base_path
+        self.journal_path = f"{base_path}.journal"
+        self.old_path = f"{base_path}.journal.old"
+        self.snapshot_path = f"{base_path}.snapshot"
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.seq = 0
+        self._snapshot_seq = 0  # Sequência do snapshot mais recente gravado por esta instância
+        self._lock = threading.Lock()
+        self._compactor = None
+        self._file = None
+        self._owner = self._acquire()
+
+    def _acquire(self):
+        """Abre e trava ``<base>.journal.lock`` (JournalLockedError se outra instância já o travou)."""
+        os.makedirs(os.path.dirname(self.journal_path) or '.', exist_ok=True)
+        owner = open(f"{self.journal_path}.lock", 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                owner.close()
+                raise JournalLockedError(
+                    f"O diário {self.journal_path} já está aberto por outra instância. O modo \"journal\" "
+                    f"é de um único processo; para vários, use \"sqlite\" ou \"sharded\"."
+                ) from None
+        return owner
+
+    def exists(self):
+        """Indica se já existe algum snapshot ou diário em disco."""
+        return any(
+            os.path.exists(path)
+            for path in (self.snapshot_path, self.old_path, self.journal_path)
+        )
+
+    def load(self):
+        """
+        Reconstrói o estado a partir do snapshot e da cauda do diário.
+        :return: Dicionário chave -> valor com o estado atual.
+        """
+        with self._lock:
+            state, self.seq = self._read_snapshot()
+            self._snapshot_seq = self.seq
+            for path in (self.old_path, self.journal_path):
+                self.seq = self._replay(path, state, self.seq)
+            return state
+
+    def set(self, key, value):
+        """
+        Registra o novo valor de uma chave.
+        :param key: Chave do registro (ID da partida ou da sala).
+        :param value: Valor serializável em JSON.
+        """
+        self._append({"op": "set", "k": key, "v": value})
+
+    def delete(self, key):
+        """
+        Registra a remoção de uma chave.
+        :param key: Chave do registro.
+        """
+        self._append({"op": "del", "k": key})
+
+    def write_snapshot(self, state):
+        """
+        Grava um snapshot completo do estado e descarta o diário.
+        Usado na migração inicial a partir dos arquivos JSON.
+        :param state: Dicionário chave -> valor.
+        """
+        # Uma compactação em andamento gravaria por cima um snapshot anterior a este
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._close()
+            self._dump_snapshot(state, self.seq)
+            self._snapshot_seq = self.seq
+            for path in (self.old_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def compact(self, wait=False):
+        """
+        Rotaciona o diário e gera um novo snapshot em segundo plano.
+        :param wait: Se True, aguarda o término da compactação.
+        """
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                # Um .old pendente (compactação interrompida) é reaproveitado
+                if not os.path.exists(self.old_path) and os.path.exists(self.journal_path):
+                    self._close()
+                    os.replace(self.journal_path, self.old_path)
+                self._compactor = threading.Thread(target=self._compact_old, daemon=True)
+                self._compactor.start()
+            compactor = self._compactor
+        if wait:
+            compactor.join()
+
+    def close(self):
+        """Fecha o arquivo do diário, aguardando uma compactação em andamento, e libera o lock de dono."""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._close()
+            if self._owner is not None:
+                self._owner.close()
+                self._owner = None
+
+    def _append(self, record):
+        """Anexa um registro ao diário e dispara a compactação se necessário."""
+        with self._lock:
+            self.seq += 1
+            record["s"] = self.seq
+            if self._file is None:
+                self._file = self._open_journal()
+            self._file.write(json.dumps(record, separators=COMPACT, ensure_ascii=False) + "\n")
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            size = self._file.tell()
+        if size >= self.compact_threshold:
+            self.compact()
+
+    def _open_journal(self):
+        # Isola uma eventual linha incompleta deixada por uma queda
+        broken_tail = False
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0:
+            with open(self.journal_path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                broken_tail = file.read(1) != b"\n"
+        file = open(self.journal_path, 'a', encoding='utf-8')
+        if broken_tail:
+            file.write("\n")
+        return file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _compact_old(self):
+        # Roda fora do lock: só lê o snapshot e o diário antigo, que não
+        # recebem mais escritas depois da rotação.
+        state, seq = self._read_snapshot()
+        seq = self._replay(self.old_path, state, seq)
+        tmp_path = f"{self.snapshot_path}.compact"
+        self._dump_snapshot(state, seq, tmp_path)
+        with self._lock:
+            if seq > self._snapshot_seq:
+                os.replace(tmp_path, self.snapshot_path)
+                self._snapshot_seq = seq
+            else:
+                # O snapshot atual (ex: de um write_snapshot durante a compactação) já cobre o diário antigo
+                os.remove(tmp_path)
+            if os.path.exists(self.old_path):
+                os.remove(self.old_path)
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}, 0
+        return {key: value for key, value in data["items"]}, data["seq"]
+
+    def _dump_snapshot(self, state, seq, path=None):
+        # Grava num temporário e renomeia para nunca deixar um snapshot truncado
+        write_atomic(path or self.snapshot_path, lambda file: json.dump(
+            {"seq": seq, "items": list(state.items())}, file, separators=COMPACT, ensure_ascii=False))
+
+    @staticmethod
+    def _replay(path, state, seq):
+        """Aplica os registros de ``path`` com número de sequência maior que ``seq``."""
+        try:
+            file = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return seq
+        with file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Linha incompleta de uma gravação interrompida
+                    continue
+                if record["s"] <= seq:
+                    continue
+                if record["op"] == "set":
+                    state[record["k"]] = record["v"]
+                else:
+                    state.pop(record["k"], None)
+                seq = record["s"]
+        return seq
@@ -0,0 +1,214 @@
+import random
+
+
+def sort_key(player_name, stats):
+    """
+    Chave de ordenação do ranking: pontos, vitórias e empates (decrescentes)
+    e, por fim, o nome do jogador para desempates determinísticos.
+    """
+    return (-stats["points"], -stats["wins"], -stats["draws"], player_name)
+
+
+class _End:
+    """Sentinela do fim da skip list: maior que qualquer chave."""
+
+    def __lt__(self, other):
+        return False
+
+    def __le__(self, other):
+        return False
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels):
+        self.key = key
+        self.next = [None] * levels
+        self.width = [1] * levels  # Posições percorridas até o próximo nó de cada nível
+
+
+class SkipList:
+    """
+    Lista ordenada indexável (skip list com larguras nos ponteiros).
+
+    Inserção, remoção, posição de uma chave e acesso por posição custam
+    O(log n) esperado; uma fatia de ``k`` itens custa O(log n + k).
+    """
+
+    def __init__(self, keys=(), max_levels=24, rng=None):
+        """
+        Inicializa a lista.
+        :param keys: Chaves iniciais (em qualquer ordem).
+        :param max_levels: Número máximo de níveis (suficiente para ~2 ** max_levels chaves).
+        :param rng: Gerador de números aleatórios que sorteia a altura dos nós.
+        """
+        self.max_levels = max_levels
+        self._random = rng or random.Random()
+        self._end = _Node(_End(), 0)
+        self._head = _Node(None, max_levels)
+        self._head.next = [self._end] * max_levels
+        self._size = 0
+        self._build(sorted(keys))
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        node = self._head.next[0]
+        while node is not self._end:
+            yield node.key
+            node = node.next[0]
+
+    def _path(self, key):
+        """Último nó antes de ``key`` em cada nível e a posição (a partir de 1) de cada um deles."""
+        chain = [None] * self.max_levels
+        positions = [0] * self.max_levels
+        node, position = self._head, 0
+        for level in reversed(range(self.max_levels)):
+            while node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+            positions[level] = position
+        return chain, positions
+
+    def _levels(self):
+        """Sorteia a altura de um nó novo: cada nível a mais com probabilidade 1/2."""
+        levels = 1
+        while levels < self.max_levels and self._random.random() < 0.5:
+            levels += 1
+        return levels
+
+    def _build(self, keys):
+        """Monta a lista vazia a partir de chaves já ordenadas, em O(n)."""
+        last = [self._head] * self.max_levels  # Último nó ligado em cada nível
+        last_position = [0] * self.max_levels
+        position = 0
+        for position, key in enumerate(keys, 1):
+            node = _Node(key, self._levels())
+            for level in range(len(node.next)):
+                last[level].next[level] = node
+                last[level].width[level] = position - last_position[level]
+                last[level], last_position[level] = node, position
+        for level in range(self.max_levels):
+            last[level].next[level] = self._end
+            last[level].width[level] = position + 1 - last_position[level]
+        self._size = position
+
+    def add(self, key):
+        """Insere uma chave."""
+        chain, positions = self._path(key)
+        node = _Node(key, self._levels())
+        levels = len(node.next)
+        position = positions[0] + 1  # Posição do novo nó
+        for level in range(levels):
+            previous = chain[level]
+            node.next[level] = previous.next[level]
+            node.width[level] = previous.width[level] - (position - positions[level]) + 1
+            previous.next[level] = node
+            previous.width[level] = position - positions[level]
+        for level in range(levels, self.max_levels):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key):
+        """Remove uma chave (ValueError se ela não estiver na lista)."""
+        chain, _ = self._path(key)
+        node = chain[0].next[0]
+        if node is self._end or node.key != key:
+            raise ValueError(f"Chave fora da lista: {key!r}")
+        for level in range(len(node.next)):
+            previous = chain[level]
+            previous.width[level] += node.width[level] - 1
+            previous.next[level] = node.next[level]
+        for level in range(len(node.next), self.max_levels):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def index(self, key):
+        """Posição (a partir de 0) de uma chave (ValueError se ela não estiver na lista)."""
+        chain, positions = self._path(key)
+        node = chain[0].next[0]
+        if node is self._end or node.key != key:
+            raise ValueError(f"Chave fora da lista: {key!r}")
+        return positions[0]
+
+    def slice(self, start, stop):
+        """Chaves das posições ``start`` (inclusive) a ``stop`` (exclusive)."""
+        start, stop = max(start, 0), min(stop, self._size)
+        if start >= stop:
+            return []
+        node, position = self._head, 0
+        for level in reversed(range(self.max_levels)):
+            while position + node.width[level] <= start + 1 and node.next[level] is not self._end:
+                position += node.width[level]
+                node = node.next[level]
+        keys = []
+        for _ in range(stop - start):
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    """
+    Ranking mantido sempre ordenado.
+
+    Guarda as chaves de cada jogador numa ``SkipList``: uma atualização
+    remove a chave antiga e insere a nova em O(log n) esperado, em vez de
+    reordenar todos os jogadores a cada consulta; a posição de um jogador
+    e uma página do ranking também saem em O(log n) (mais o tamanho da página).
+    """
+
+    def __init__(self, ranking):
+        """
+        Inicializa o ranking ordenado.
+        :param ranking: Dicionário jogador -> estatísticas (compartilhado, não copiado).
+        """
+        self.ranking = ranking
+        self._key_of = {name: sort_key(name, stats) for name, stats in ranking.items()}
+        self._keys = SkipList(self._key_of.values())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, player_name):
+        """
+        Reposiciona um jogador após a alteração das suas estatísticas.
+        :param player_name: Nome do jogador alterado.
+        """
+        old_key = self._key_of.get(player_name)
+        if old_key is not None:
+            self._keys.remove(old_key)
+        new_key = sort_key(player_name, self.ranking[player_name])
+        self._key_of[player_name] = new_key
+        self._keys.add(new_key)
+
+    def top(self, k):
+        """
+        Retorna os ``k`` primeiros colocados.
+        :return: Lista de tuplas (jogador, estatísticas).
+        """
+        return self.slice(0, k)
+
+    def page(self, page, page_size):
+        """
+        Retorna uma página do ranking (a primeira página é 0).
+        :return: Lista de tuplas (jogador, estatísticas).
+        """
+        return self.slice(page * page_size, (page + 1) * page_size)
+
+    def slice(self, start, stop):
+        """Retorna as posições ``start`` (inclusive) a ``stop`` (exclusive)."""
+        return [(key[-1], self.ranking[key[-1]]) for key in self._keys.slice(start, stop)]
+
+    def rank_of(self, player_name):
+        """
+        Retorna a posição (a partir de 1) de um jogador.
+        :return: Posição no ranking ou None se o jogador não estiver nele.
+        """
+        key = self._key_of.get(player_name)
+        if key is None:
+            return None
+        return self._keys.index(key) + 1
@@ -0,0 +1,191 @@
+import threading
+import time
+
+from managers.leaderboard import SkipList  # Lista ordenada indexável, a mesma do ranking
+
+# Diferença de pontos aceita ao entrar na fila e quanto ela cresce por segundo de espera
+BASE_WINDOW = 3
+WIDEN_PER_SECOND = 0.5
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+class Matchmaker:
+    """
+    Fila da partida rápida: junta jogadores com pontuação parecida no ranking.
+
+    A fila guarda (pontos, entrada na fila, jogador) numa ``SkipList``, como o
+    ``Leaderboard``: entrar e sair da fila custam O(log n) esperado, sem
+    deslocar uma lista inteira. Como o adversário mais próximo em pontos é
+    sempre um dos vizinhos na fila, procurar um par custa uma busca O(log n)
+    e duas comparações. A diferença aceita começa em ``base_window`` pontos e
+    cresce com a espera, até ``max_window``.
+
+    Ao formar um par, o serviço reaproveita uma sala vazia do ``RoomManager``
+    (ou cria uma) e senta os dois jogadores; quem não fez a chamada que formou
+    o par (os dois, quando ela vem de ``match_waiting``) descobre a sala na
+    próxima chamada de ``poll``. A fila fica na memória do processo.
+    """
+
+    def __init__(self, room_manager, ranking_manager, base_window=BASE_WINDOW, widen_per_second=WIDEN_PER_SECOND,
+                 max_window=None, size=3, k=3):
+        """
+        Inicializa a fila.
+        :param room_manager: RoomManager onde as salas são alocadas.
+        :param ranking_manager: RankingManager de onde vêm os pontos dos jogadores.
+        :param base_window: Diferença de pontos aceita ao entrar na fila.
+        :param widen_per_second: Quanto a diferença aceita cresce a cada segundo de espera.
+        :param max_window: Limite da diferença aceita (None: sem limite).
+        :param size: Lado do tabuleiro das partidas formadas.
+        :param k: Peças em linha para vencer nas partidas formadas.
+        """
+        self.room_manager = room_manager
+        self.ranking_manager = ranking_manager
+        self.base_window = base_window
+        self.widen_per_second = widen_per_second
+        self.max_window = max_window
+        self.size = size
+        self.k = k
+        self._lock = threading.Lock()
+        self._queue = SkipList()  # (pontos, entrada na fila, jogador), ordenada
+        self._entries = {}  # jogador -> entrada na fila (na ordem de chegada)
+        self._matched = {}  # jogador -> room_id ainda não visto pelo jogador
+        self.stats = {"enqueued": 0, "matched": 0, "cancelled": 0, "rooms_created": 0}
+
+    def __len__(self):
+        return len(self._queue)
+
+    def points_of(self, username):
+        """Pontos do jogador no ranking (0 para quem ainda não pontuou)."""
+        stats = self.ranking_manager.ranking.get(username)
+        return stats["points"] if stats else 0
+
+    def window(self, entry, now):
+        """Diferença de pontos que a entrada aceita depois de esperar até ``now``."""
+        window = self.base_window + self.widen_per_second * max(0.0, now - entry[1])
+        return window if self.max_window is None else min(window, self.max_window)
+
+    def enqueue(self, username, now=None):
+        """
+        Coloca o jogador na fila e tenta formar um par na hora.
+        :param username: Jogador.
+        :param now: Instante da chamada (padrão: time.time()).
+        :return: room_id da sala se o par foi formado; None se o jogador ficou esperando.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if username in self._matched:
+                return self._matched.pop(username)
+            entry = self._entries.get(username)
+            if entry is None:
+                entry = (self.points_of(username), now, username)
+                self._queue.add(entry)
+                self._entries[username] = entry
+                self.stats["enqueued"] += 1
+            return self._claim(username, self._try_match(entry, now))
+
+    def poll(self, username, now=None):
+        """
+        Consulta a situação do jogador; quem está na fila tenta de novo com a diferença já ampliada.
+        :return: room_id da sala formada ou None se o jogador continua esperando (ou não está na fila).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if username in self._matched:
+                return self._matched.pop(username)
+            entry = self._entries.get(username)
+            return None if entry is None else self._claim(username, self._try_match(entry, now))
+
+    def cancel(self, username):
+        """
+        Tira o jogador da fila.
+        :return: True se ele estava esperando.
+        """
+        with self._lock:
+            entry = self._entries.pop(username, None)
+            if entry is None:
+                return False
+            self._queue.remove(entry)
+            self.stats["cancelled"] += 1
+            return True
+
+    def is_waiting(self, username):
+        """Indica se o jogador está na fila."""
+        return username in self._entries
+
+    def match_waiting(self, now=None):
+        """
+        Tenta formar pares para toda a fila, dos que esperam há mais tempo aos mais recentes.
+        Pode ser chamada periodicamente (ex: pelo Sweeper) para quem não está consultando.
+        :return: Número de pares formados.
+        """
+        now = time.time() if now is None else now
+        matched = 0
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry[2] in self._entries and self._try_match(entry, now) is not None:
+                    matched += 1
+        return matched
+
+    def _try_match(self, entry, now):
+        # O mais próximo em pontos é um dos vizinhos; no empate, o que espera há mais tempo
+        position = self._queue.index(entry)
+        neighbours = [other for other in self._queue.slice(position - 1, position + 2) if other is not entry]
+        if not neighbours:
+            return None
+        opponent = min(neighbours, key=lambda other: (abs(other[0] - entry[0]), other[1]))
+        # Vale a maior das duas tolerâncias: quem espera há mais tempo aceita mais
+        if abs(opponent[0] - entry[0]) > max(self.window(entry, now), self.window(opponent, now)):
+            return None
+        for matched in (entry, opponent):
+            self._queue.remove(matched)
+            del self._entries[matched[2]]
+        # Quem chegou primeiro joga com X
+        first, second = sorted((entry, opponent), key=lambda item: item[1])
+        room_id = self._allocate_room(first[2], second[2])
+        # Os dois ficam avisados; quem fez a chamada (enqueue ou poll) recebe a sala já no retorno
+        for matched in (entry, opponent):
+            self._matched[matched[2]] = room_id
+        self.stats["matched"] += 1
+        return room_id
+
+    def _claim(self, username, room_id):
+        """Entrega ao jogador a sala formada na sua própria chamada, sem deixá-la pendente para o poll."""
+        if room_id is not None:
+            self._matched.pop(username, None)
+        return room_id
+
+    def _allocate_room(self, first, second):
+        """Senta os dois jogadores numa sala vazia (reaproveitada ou criada)."""
+        room = self.room_manager.find_empty_room(self.size, self.k)
+        if room is None:
+            room = self.room_manager.create_room(f"Partida rápida: {first} x {second}", self.size, self.k)
+            self.stats["rooms_created"] += 1
+        elif room["winner"] or room["moves"]:
+            self.room_manager.new_match(room["room_id"])
+        room_id = room["room_id"]
+        self.room_manager.join_room(room_id, first)
+        self.room_manager.join_room(room_id, second)
+        if self.room_manager.get_room(room_id)["players"] != [first, second]:
+            # Outro processo ocupou a sala no meio do caminho: libera e usa uma sala nova
+            for username in (first, second):
+                self.room_manager.leave_room(room_id, username)
+            room = self.room_manager.create_room(f"Partida rápida: {first} x {second}", self.size, self.k)
+            self.stats["rooms_created"] += 1
+            room_id = room["room_id"]
+            self.room_manager.join_room(room_id, first)
+            self.room_manager.join_room(room_id, second)
+        return room_id
+
+
+def shared(room_manager, ranking_manager, **kwargs):
+    """
+    Retorna a fila compartilhada pelo processo, criando-a na primeira chamada.
+    :param kwargs: Argumentos extras do construtor (usados só na criação).
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Matchmaker(room_manager, ranking_manager, **kwargs)
+        return _shared
@@ -0,0 +1,248 @@
+"""
+Métricas de tempo e contagem do processo, exportadas no formato texto do Prometheus.
+
+Os pontos quentes (leituras e gravações das coleções, commits no GitHub e
+renderização das páginas) registram a duração de cada chamada num
+histograma identificado pelo nome da família e pelos rótulos. Com as
+métricas desligadas (o padrão), cada ponto custa só a checagem de uma flag.
+
+Uso:
+    metrics.enable()
+    with metrics.timer("render_seconds", page="Salas"):
+        ...
+    metrics.render()                     # texto no formato do Prometheus
+    metrics.write_text_file("metrics.prom")
+    metrics.serve(9100)                  # GET /metrics numa thread de fundo
+"""
+import contextlib
+import functools
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from managers.atomic import write_atomic
+
+PREFIX = "mmpg_"
+
+# Limites superiores (em segundos) dos baldes dos histogramas
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Descrição de cada família exportada
+HELP = {
+    "store_seconds": "Duração das operações das coleções (leituras e gravações).",
+    "sync_commit_seconds": "Duração de cada commit agrupado enviado ao GitHub.",
+    "render_seconds": "Duração da renderização de cada página do Streamlit.",
+    "sync_files_total": "Arquivos enviados ao GitHub.",
+    "sync_failures_total": "Commits no GitHub que falharam.",
+}
+
+_enabled = False
+_lock = threading.Lock()
+_histograms = {}  # (família, rótulos) -> Histogram
+_counters = {}  # (família, rótulos) -> valor
+_server = None
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    """Histograma de durações com baldes fixos, soma e contagem."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # O último balde é o +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estima um quantil interpolando dentro do balde, como o histogram_quantile do Prometheus.
+        :param q: Quantil entre 0 e 1 (ex: 0.99).
+        :return: Duração estimada em segundos (None sem observações).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+
+def enable():
+    """Liga a coleta de métricas no processo."""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Desliga a coleta (os pontos instrumentados voltam a custar só a checagem da flag)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def observe(family, seconds, **labels):
+    """Registra uma duração (em segundos) no histograma da família com os rótulos dados."""
+    if not _enabled:
+        return
+    key = (family, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def inc(family, amount=1, **labels):
+    """Incrementa um contador."""
+    if not _enabled:
+        return
+    key = (family, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextlib.contextmanager
+def _timer(family, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(family, time.perf_counter() - start, **labels)
+
+
+def timer(family, **labels):
+    """Context manager que mede o bloco; com as métricas desligadas não faz nada."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _timer(family, labels)
+
+
+def instrument_method(family, operation, method):
+    """
+    Envolve um método de coleção para medir cada chamada.
+    Os rótulos são a operação, a classe da coleção e ``self.collection``.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not _enabled:
+            return method(self, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            observe(family, time.perf_counter() - start, operation=operation,
+                    store=type(self).__name__, collection=getattr(self, "collection", ""))
+    return wrapper
+
+
+def snapshot():
+    """
+    Copia o estado atual das métricas.
+    :return: Tupla (histogramas, contadores), cada um um dicionário (família, rótulos) -> valor.
+    """
+    with _lock:
+        histograms = {}
+        for key, histogram in _histograms.items():
+            copy = Histogram()
+            copy.counts, copy.sum, copy.count = list(histogram.counts), histogram.sum, histogram.count
+            histograms[key] = copy
+        return histograms, dict(_counters)
+
+
+def reset():
+    """Descarta todas as observações (útil em scripts e benchmarks)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def render():
+    """Retorna as métricas no formato texto de exposição do Prometheus."""
+    histograms, counters = snapshot()
+    lines = []
+    for family in sorted({family for family, _ in histograms}):
+        name = PREFIX + family
+        lines.append(f"# HELP {name} {HELP.get(family, family)}")
+        lines.append(f"# TYPE {name} histogram")
+        for (current, labels), histogram in sorted(histograms.items()):
+            if current != family:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+    for family in sorted({family for family, _ in counters}):
+        name = PREFIX + family
+        lines.append(f"# HELP {name} {HELP.get(family, family)}")
+        lines.append(f"# TYPE {name} counter")
+        for (current, labels), value in sorted(counters.items()):
+            if current == family:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_text_file(path):
+    """
+    Grava as métricas num arquivo (ex: para o textfile collector do node_exporter).
+    O arquivo é substituído de uma vez, sem leituras parciais.
+    """
+    text = render()
+    write_atomic(path, lambda file: file.write(text), fsync=False)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha no console a cada coleta
+
+
+def serve(port, host="127.0.0.1"):
+    """
+    Expõe ``/metrics`` por HTTP numa thread de fundo (uma vez por processo).
+    :return: Servidor HTTP em execução.
+    """
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
+
+
+def _labels(labels, **extra):
+    items = list(labels) + [(key, value) for key, value in extra.items()]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
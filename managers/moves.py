@@ -0,0 +1,38 @@
+import time
+from collections import namedtuple
+
+from game import engine
+from managers.storage import record_version
+
+# Resultado de uma jogada: ok (gravou), conflict (versão desatualizada),
+# state (estado atual do registro) e error (mensagem, quando não gravou)
+MoveResult = namedtuple("MoveResult", ["ok", "conflict", "state", "error"])
+
+CONFLICT_MESSAGE = "A partida foi atualizada por outro jogador. Confira o tabuleiro e jogue novamente."
+
+
+def apply_versioned_move(store, key, index, username, expected_version):
+    """
+    Aplica uma jogada com compare-and-swap sobre um registro versionado.
+    A jogada é validada contra o estado mais recente do armazenamento e só é
+    gravada se ninguém tiver alterado o registro desde ``expected_version``.
+    :param store: Coleção (Store) que guarda salas ou partidas.
+    :param key: ID da sala ou partida.
+    :param index: Casa escolhida (0 a size² - 1).
+    :param username: Jogador que fez a jogada.
+    :param expected_version: Versão do registro que o jogador viu.
+    :return: MoveResult.
+    """
+    latest = store.get_latest(key)
+    if latest is None:
+        return MoveResult(False, False, None, "Partida não encontrada.")
+    if record_version(latest) != expected_version:
+        return MoveResult(False, True, latest, CONFLICT_MESSAGE)
+    new_state, error = engine.play(latest, index, username)
+    if error:
+        return MoveResult(False, False, latest, error)
+    new_state["updated_at"] = int(time.time())
+    swapped, current = store.compare_and_swap(key, expected_version, new_state)
+    if not swapped:
+        return MoveResult(False, True, current, CONFLICT_MESSAGE)
+    return MoveResult(True, False, new_state, None)
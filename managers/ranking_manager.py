@@ -1,59 +1,154 @@
-import json  # Para manipular arquivos JSON
-from github import Github  # Para sincronizar com o GitHub
+from array import array
 
+from managers.github_sync import GitHubSync  # Sincronização com o GitHub em segundo plano
+from managers.leaderboard import Leaderboard  # Ranking mantido ordenado
+from managers.registry import Stamped  # Detecção de alterações no arquivo
+from managers.room_manager import BOT_DIFFICULTY  # Nomes dos robôs, que não entram no ranking
+from managers.storage import DEFAULT_DB, open_store  # Camada de armazenamento
 
-class RankingManager:
-    def __init__(self, file_path='pages/js/ranking.json', repo_name='', branch='main', token=''):
+# Pontos por resultado
+POINTS = {"win": 3, "draw": 1, "loss": 0}
+# Contador de cada resultado nas estatísticas do jogador
+RESULT_FIELDS = {"win": "wins", "draw": "draws", "loss": "losses"}
+# Elo: nota inicial e fator K (variação máxima por partida)
+ELO_START = 1500
+ELO_K = 32
+
+
+def game_results(game):
+    """
+    Resultado de cada jogador numa partida encerrada.
+    Partidas contra o robô não contam: o robô perfeito nunca perde e subiria ao topo do ranking
+    (e da fila da partida rápida), e vencer o robô fácil renderia pontos sem adversário de verdade.
+    :param game: Partida ou sala (players e winner: "X", "O" ou "Empate").
+    :return: Lista de tuplas (jogador, "win"/"draw"/"loss"); vazia se a partida não terminou ou teve um robô.
+    """
+    winner = game.get("winner")
+    players = game.get("players") or []
+    if not winner or len(players) != 2 or any(player in BOT_DIFFICULTY for player in players):
+        return []
+    if winner == "Empate":
+        return [(players[0], "draw"), (players[1], "draw")]
+    return [(player, "win" if winner == mark else "loss") for player, mark in zip(players, "XO")]
+
+
+def new_stats():
+    """Estatísticas de um jogador que ainda não pontuou."""
+    return {"points": 0, "wins": 0, "draws": 0, "losses": 0}
+
+
+def elo_update(rating_x, rating_o, score_x, k=ELO_K):
+    """
+    Novas notas Elo depois de uma partida.
+    :param score_x: Resultado de X: 1 (vitória), 0.5 (empate) ou 0 (derrota).
+    :return: Tupla (nota de X, nota de O).
+    """
+    expected_x = 1 / (1 + 10 ** ((rating_o - rating_x) / 400))
+    delta = k * (score_x - expected_x)
+    return rating_x + delta, rating_o - delta
+
+
+def compute_ranking(games, elo=False):
+    """
+    Calcula o ranking do zero a partir de um histórico de partidas.
+    As partidas são lidas em fluxo e guardadas só como três inteiros cada (X, O e resultado);
+    as contagens saem de uma vez com ``numpy.bincount``. O Elo depende da ordem das
+    partidas e é calculado numa passada sobre esses vetores.
+    :param games: Iterável de partidas encerradas (players e winner), da mais antiga à mais recente.
+    :param elo: Calcula também a nota Elo de cada jogador.
+    :return: Dicionário jogador -> estatísticas.
+    """
+    import numpy as np  # Dependência usada apenas na reconstrução do ranking
+
+    ids = {}  # jogador -> índice nos vetores
+    x, o, outcome = array('l'), array('l'), array('b')  # outcome: 0 vitória de X, 1 de O, 2 empate
+    for game in games:
+        winner = game.get("winner")
+        players = game.get("players") or []
+        if winner not in ("X", "O", "Empate") or len(players) != 2:
+            continue
+        if any(player in BOT_DIFFICULTY for player in players):
+            continue  # Partidas contra o robô não contam (ver game_results)
+        x.append(ids.setdefault(players[0], len(ids)))
+        o.append(ids.setdefault(players[1], len(ids)))
+        outcome.append("XO".find(winner) if winner != "Empate" else 2)
+
+    count = len(ids)
+    x = np.frombuffer(x, dtype=f"i{x.itemsize}")
+    o = np.frombuffer(o, dtype=x.dtype)
+    outcome = np.frombuffer(outcome, dtype=np.int8)
+
+    def tally(players, mask):
+        return np.bincount(players[mask], minlength=count)
+
+    wins = tally(x, outcome == 0) + tally(o, outcome == 1)
+    losses = tally(x, outcome == 1) + tally(o, outcome == 0)
+    draws = tally(x, outcome == 2) + tally(o, outcome == 2)
+    points = POINTS["win"] * wins + POINTS["draw"] * draws + POINTS["loss"] * losses
+
+    ratings = None
+    if elo:
+        ratings = [float(ELO_START)] * count
+        for player_x, player_o, result in zip(x.tolist(), o.tolist(), outcome.tolist()):
+            score_x = (1.0, 0.0, 0.5)[result]
+            ratings[player_x], ratings[player_o] = elo_update(ratings[player_x], ratings[player_o], score_x)
+
+    ranking = {}
+    for player, n in ids.items():
+        stats = {"points": int(points[n]), "wins": int(wins[n]), "draws": int(draws[n]), "losses": int(losses[n])}
+        if ratings is not None:
+            stats["elo"] = round(ratings[n], 1)
+        ranking[player] = stats
+    return ranking
+
+
+class RankingManager(Stamped):
+    def __init__(self, file_path='pages/js/ranking.json', repo_name='', branch='main', token='', sync=None,
+                 storage='json', db_path=DEFAULT_DB, store=None, elo=False):
         """
         Inicializa o gerenciador de ranking.
         :param file_path: Caminho do arquivo JSON local que armazena o ranking.
         :param repo_name: Nome do repositório no GitHub (ex: 'usuario/repo').
         :param branch: Nome da branch do repositório (ex: 'main').
         :param token: Token de acesso pessoal do GitHub.
+        :param sync: GitHubSync compartilhado; por padrão usa o do repositório informado.
+        :param storage: Modo de armazenamento: "json", "journal", "sqlite" ou "sharded".
+        :param db_path: Caminho do banco SQLite (modo "sqlite").
+        :param store: Coleção já construída; substitui ``storage``.
+        :param elo: Mantém também a nota Elo dos jogadores (campo "elo").
         """
         self.file_path = file_path
         self.repo_name = repo_name
         self.branch = branch
         self.token = token
+        if sync is None and repo_name and token:
+            sync = GitHubSync.shared(repo_name, branch, token)
+        self.sync = sync
+        self.elo = elo
+        self.store = store or open_store("ranking", file_path, storage, db_path, sync=sync)
         self.ranking = self.load_ranking()
+        self.leaderboard = Leaderboard(self.ranking)
+        self.touch_stamp()
+
+    def reload(self):
+        """Relê o ranking do armazenamento."""
+        self.ranking = self.store.reload()
+        self.leaderboard = Leaderboard(self.ranking)
+        self.touch_stamp()
 
     def load_ranking(self):
         """
-        Carrega o ranking do arquivo JSON.
-        :return: Um dicionário contendo o ranking ou vazio, caso o arquivo não exista.
+        Carrega o ranking do armazenamento.
+        :return: Um dicionário contendo o ranking ou vazio, caso não exista.
         """
-        try:
-            with open(self.file_path, 'r') as file:
-                return json.load(file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        return self.store.load_all()
 
     def save_ranking(self):
         """
-        Salva o ranking atualizado no arquivo JSON e no GitHub.
-        """
-        # Salva no arquivo local
-        with open(self.file_path, 'w') as file:
-            json.dump(self.ranking, file, indent=4)
-
-        # Sincroniza com o GitHub
-        if self.repo_name and self.token:
-            try:
-                g = Github(self.token)
-                repo = g.get_repo(self.repo_name)
-                contents = repo.get_contents(self.file_path, ref=self.branch)
-                with open(self.file_path, 'r') as file:
-                    content = file.read()
-                repo.update_file(
-                    path=contents.path,
-                    message="Atualizando ranking.json via Streamlit",
-                    content=content,
-                    sha=contents.sha,
-                    branch=self.branch,
-                )
-                print("Ranking atualizado no GitHub!")
-            except Exception as e:
-                print(f"Erro ao atualizar o arquivo no GitHub: {e}")
+        Grava o ranking inteiro (no modo JSON, agenda também o envio ao GitHub).
+        """
+        self.store.replace_all(self.ranking)
+        self.touch_stamp()
 
     def update_player(self, player_name, result):
         """
@@ -61,27 +156,116 @@ class RankingManager:
         :param player_name: Nome do jogador.
         :param result: Resultado do jogo (win, draw, loss).
         """
-        if player_name not in self.ranking:
-            self.ranking[player_name] = {"points": 0, "wins": 0, "draws": 0, "losses": 0}
+        # Só o registro do jogador é gravado (uma linha no SQLite), somado ao que está no armazenamento
+        total = new_stats()
+        if result in POINTS:
+            total["points"] = POINTS[result]
+            total[RESULT_FIELDS[result]] = 1
+        self._record(player_name, total)
+        self.touch_stamp()
 
-        if result == "win":
-            self.ranking[player_name]["points"] += 3
-            self.ranking[player_name]["wins"] += 1
-        elif result == "draw":
-            self.ranking[player_name]["points"] += 1
-            self.ranking[player_name]["draws"] += 1
-        elif result == "loss":
-            self.ranking[player_name]["losses"] += 1
+    def record_result(self, game):
+        """
+        Atualiza os dois jogadores de uma partida encerrada.
+        :param game: Partida ou sala com players e winner ("X", "O" ou "Empate").
+        :return: Lista de tuplas (jogador, resultado) aplicadas; vazia se a partida não terminou ou teve um robô.
+        """
+        return self.record_results([game])
 
+    def record_results(self, games):
+        """
+        Aplica os resultados de várias partidas encerradas.
+        Os resultados são somados por jogador e cada jogador alterado recebe uma única gravação,
+        somada ao registro mais recente do armazenamento com compare-and-swap (``Store.update``):
+        outra instância ou processo pontuando o mesmo jogador não perde pontos.
+        :param games: Iterável de partidas (players e winner), na ordem em que terminaram.
+        :return: Lista de tuplas (jogador, resultado) aplicadas.
+        """
+        applied = []
+        totals = {}  # jogador -> incrementos (pontos, contagens e variação do Elo)
+        ratings = {}  # jogador -> nota Elo atual, partida a partida dentro do lote
+        for game in games:
+            results = game_results(game)
+            if not results:
+                continue
+            if self.elo:
+                for player_name, _ in results:
+                    if player_name not in ratings:
+                        ratings[player_name] = (self.store.get_latest(player_name) or {}).get("elo", ELO_START)
+                (player_x, result_x), (player_o, _) = results
+                rating_x, rating_o = elo_update(ratings[player_x], ratings[player_o],
+                                                {"win": 1.0, "draw": 0.5, "loss": 0.0}[result_x])
+                for player_name, rating in ((player_x, rating_x), (player_o, rating_o)):
+                    total = totals.setdefault(player_name, new_stats())
+                    total["elo"] = total.get("elo", 0.0) + rating - ratings[player_name]
+                    ratings[player_name] = rating
+            for player_name, result in results:
+                total = totals.setdefault(player_name, new_stats())
+                total["points"] += POINTS[result]
+                total[RESULT_FIELDS[result]] += 1
+            applied += results
+        for player_name, total in totals.items():
+            self._record(player_name, total)
+        if applied:
+            self.touch_stamp()
+        return applied
+
+    def rebuild(self, games):
+        """
+        Recalcula o ranking do zero a partir do histórico (ver ``compute_ranking``) e o grava de uma vez.
+        :param games: Iterável de partidas encerradas, da mais antiga à mais recente.
+        :return: Número de jogadores no ranking.
+        """
+        self.ranking = compute_ranking(games, elo=self.elo)
+        self.leaderboard = Leaderboard(self.ranking)
         self.save_ranking()
+        return len(self.ranking)
+
+    def _record(self, player_name, total):
+        """
+        Soma os incrementos ``total`` ao registro mais recente do jogador, com compare-and-swap,
+        e reposiciona o jogador no ranking ordenado.
+        :param total: Pontos, contagens e, opcionalmente, a variação do Elo ("elo").
+        """
+        def add(stats):
+            for field in ("points", "wins", "draws", "losses"):
+                stats[field] += total[field]
+            if "elo" in total:
+                stats["elo"] = round(stats.get("elo", ELO_START) + total["elo"], 1)
+
+        _, stats = self.store.update(player_name, add, create=new_stats)
+        if stats is not None:
+            self.ranking[player_name] = stats
+            self.leaderboard.update(player_name)
 
     def get_ranking(self):
         """
-        Retorna o ranking ordenado por pontos.
+        Retorna o ranking completo ordenado por pontos, vitórias, empates e nome.
         :return: Lista de jogadores ordenados por pontos.
         """
-        return sorted(
-            self.ranking.items(),
-            key=lambda x: x[1]["points"],
-            reverse=True,
-        )
+        return self.leaderboard.slice(0, len(self.leaderboard))
+
+    def top(self, k):
+        """
+        Retorna os ``k`` primeiros colocados.
+        :param k: Quantidade de jogadores.
+        :return: Lista de tuplas (jogador, estatísticas).
+        """
+        return self.leaderboard.top(k)
+
+    def rank_of(self, player_name):
+        """
+        Retorna a posição (a partir de 1) de um jogador no ranking.
+        :param player_name: Nome do jogador.
+        :return: Posição ou None se o jogador ainda não pontuou.
+        """
+        return self.leaderboard.rank_of(player_name)
+
+    def get_page(self, page, page_size=20):
+        """
+        Retorna uma página do ranking.
+        :param page: Número da página (a primeira é 0).
+        :param page_size: Jogadores por página.
+        :return: Lista de tuplas (jogador, estatísticas).
+        """
+        return self.leaderboard.page(page, page_size)
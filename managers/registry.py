@@ -0,0 +1,82 @@
+import os
+import threading
+
+# Instâncias compartilhadas por todo o processo: (classe, arquivo) -> gerenciador
+_managers = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def file_stamp(*paths):
+    """
+    Gera uma assinatura barata dos arquivos (mtime em ns e tamanho).
+    :param paths: Caminhos dos arquivos observados.
+    :return: Tupla comparável; arquivos ausentes entram como None.
+    """
+    stamp = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            stamp.append((info.st_mtime_ns, info.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class Stamped:
+    """
+    Mixin dos gerenciadores que sabem se os dados mudaram desde a última leitura.
+    A classe deve ter uma coleção ``self.store`` e definir ``reload()``.
+    """
+
+    stamp = None
+
+    def current_stamp(self):
+        """Assinatura atual da coleção (mtime/tamanho do arquivo ou versão do banco)."""
+        return self.store.version()
+
+    def touch_stamp(self):
+        """Registra a assinatura atual (após ler ou gravar)."""
+        self.stamp = self.current_stamp()
+
+    def is_stale(self):
+        """Indica se os dados foram alterados por outra instância ou processo."""
+        return self.current_stamp() != self.stamp
+
+
+def shared_manager(cls, file_path, **kwargs):
+    """
+    Retorna o gerenciador compartilhado para ``file_path``, criando-o na primeira vez.
+    Nas chamadas seguintes só recarrega o arquivo se a assinatura mudou.
+    :param cls: Classe do gerenciador (ex: RoomManager).
+    :param file_path: Caminho do arquivo JSON do gerenciador.
+    :param kwargs: Argumentos extras do construtor (usados só na criação).
+    :return: Instância compartilhada do gerenciador.
+    """
+    key = (cls, file_path)
+    with _lock:
+        manager = _managers.get(key)
+        if manager is None:
+            _stats["misses"] += 1
+            manager = _managers[key] = cls(file_path=file_path, **kwargs)
+        elif manager.is_stale():
+            _stats["reloads"] += 1
+            manager.reload()
+        else:
+            _stats["hits"] += 1
+        return manager
+
+
+def cache_stats():
+    """
+    Retorna os contadores do cache de gerenciadores.
+    :return: Dicionário com acertos, faltas e recargas.
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def clear():
+    """Descarta as instâncias compartilhadas (útil em scripts e benchmarks)."""
+    with _lock:
+        _managers.clear()
@@ -1,69 +1,480 @@
-import json
-from datetime import datetime
+import itertools
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from game import ai
+from game.board import MAX_SIZE, new_board
+from managers.access_log import AccessLog
+from managers.archive import GameArchive
+from managers.moves import apply_versioned_move
+from managers.registry import Stamped
+from managers.schema import RoomRecord
+from managers.storage import DEFAULT_DB, JsonStore, LAYOUTS, SUMMARY_FIELDS, open_store, record_version, summarize
 
-class RoomManager:
-    def __init__(self, file_path='rooms.json'):
+# Marcador de assento livre na lista de jogadores
+WAITING_PLAYER = "Aguardando jogador..."
+
+# Nome do robô em cada dificuldade (ver game.ai.DIFFICULTIES)
+BOT_PLAYERS = {
+    "random": "Robô (fácil)",
+    "mistakes": "Robô (médio)",
+    "perfect": "Robô (difícil)",
+}
+BOT_DIFFICULTY = {name: difficulty for difficulty, name in BOT_PLAYERS.items()}
+
+# Salas mantidas em memória; as menos usadas são descartadas e relidas do armazenamento no acesso
+MAX_RESIDENT_ROOMS = 256
+# Sala sem acesso por este tempo (em segundos) sai da memória
+ROOM_TTL = 30 * 60
+# Jogador ou visualizador sem atividade por este tempo (em segundos) perde o lugar na sala
+SEAT_TTL = 15 * 60
+# Salas por página no lobby
+LOBBY_PAGE_SIZE = 20
+# Filtros do lobby: "all" (todas), "open" (com assento livre) e as situações de storage.room_status
+LOBBY_VIEWS = ("all", "open", "new", "in_progress", "finished")
+
+class RoomManager(Stamped):
+    def __init__(self, file_path='rooms.json', sync=None, access_log=None, storage='json', db_path=DEFAULT_DB,
+                 store=None, archive=None, max_resident=MAX_RESIDENT_ROOMS, migrate=True):
         self.file_path = file_path
-        self.rooms = self.load_rooms()
+        self.max_resident = max_resident
+        # Com migrate=False (comandos só de leitura), os logs de acesso antigos ficam dentro das salas
+        self.migrate = migrate
+        self.sync = sync  # GitHubSync opcional
+        # Coleção room_id -> sala em JSON, diário ("journal") ou SQLite
+        self.store = store or open_store("rooms", file_path, storage, db_path, sync=sync)
+        # Log de acessos fica fora do rooms.json, num arquivo append-only ao lado dele
+        if access_log is None:
+            access_log = AccessLog(os.path.join(os.path.dirname(file_path), 'access_log.json'))
+        self.access_log = access_log
+        # Jogos encerrados nas salas vão para o arquivo morto; a sala guarda só o jogo atual
+        if archive is None:
+            archive = GameArchive(os.path.join(os.path.dirname(file_path), 'archive'), prefix='rooms')
+        self.archive = archive
+        # Última atividade de cada usuário em cada sala: (room_id, username) -> time.time()
+        self._seen = {}
+        self._loaded_at = time.time()
+        self._lock = threading.RLock()  # Protege o LRU contra a thread de limpeza
+        self._room_locks = {}  # room_id -> lock das alterações da sala (requisições e limpeza)
+        self.build_index()
+        self.migrate_access_logs()
+        self.touch_stamp()
+
+    @property
+    def rooms(self):
+        """Lista de todas as salas (passa pelo LRU; no modo "sharded", lê os arquivos ainda não abertos)."""
+        return [room for room in map(self._resident_room, list(self._summaries)) if room is not None]
+
+    def reload(self):
+        """Relê as salas do armazenamento."""
+        self.store.reload()
+        self.build_index()
+        self.migrate_access_logs()
+        self.touch_stamp()
+
+    def migrate_access_logs(self):
+        """Move os logs de acesso embutidos nas salas (formato antigo) para o AccessLog."""
+        if self.store.lazy or not self.migrate:
+            return  # Salas lidas sob demanda são migradas em get_room
+        migrated = [room for room in self.rooms if "access_log" in room]
+        for room in migrated:
+            self.access_log.import_entries(room["room_id"], room.pop("access_log"))
+        if migrated:
+            self.store.put_many((room["room_id"], room) for room in migrated)
+
+    def build_index(self):
+        """Reconstrói o LRU de salas em memória, os resumos do lobby e os conjuntos de salas livres e vazias."""
+        # LRU room_id -> sala com as salas usadas recentemente; as demais são lidas do armazenamento
+        self._resident = OrderedDict()
+        self._last_active = {}  # room_id -> último acesso (time.time())
+        self._summaries = self.store.summaries(SUMMARY_FIELDS["rooms"])
+        # dict usado como conjunto ordenado: preserva a ordem das salas
+        self._open_rooms = {
+            room_id: None for room_id, summary in self._summaries.items()
+            if WAITING_PLAYER in (summary["players"] or [])
+        }
+        # Salas sem ninguém sentado, usadas pela partida rápida
+        self._empty_rooms = {
+            room_id: None for room_id, summary in self._summaries.items()
+            if all(player == WAITING_PLAYER for player in summary["players"] or [])
+        }
+        # Salas de cada situação ("new", "in_progress", "finished"), para os filtros do lobby
+        self._rooms_by_status = {status: {} for status in LOBBY_VIEWS[2:]}
+        for room_id, summary in self._summaries.items():
+            self._rooms_by_status[summary["status"] or "new"][room_id] = None
+
+    def _update_seats(self, room):
+        """Mantém o resumo da sala e os conjuntos de salas livres, vazias e por situação após uma mudança."""
+        room_id = room["room_id"]
+        summary = self._summaries[room_id] = summarize(room, SUMMARY_FIELDS["rooms"])
+        if WAITING_PLAYER in room["players"]:
+            self._open_rooms[room_id] = None
+        else:
+            self._open_rooms.pop(room_id, None)
+        if all(player == WAITING_PLAYER for player in room["players"]):
+            self._empty_rooms[room_id] = None
+        else:
+            self._empty_rooms.pop(room_id, None)
+        for status, rooms in self._rooms_by_status.items():
+            if status == summary["status"]:
+                rooms.setdefault(room_id, None)
+            else:
+                rooms.pop(room_id, None)
+
+    def _resident_room(self, room_id):
+        """Sala pelo LRU: acerto em tempo constante; na falta, lê do armazenamento e descarta a menos usada."""
+        with self._lock:
+            room = self._resident.get(room_id)
+            if room is not None:
+                self._resident.move_to_end(room_id)
+                return room
+            if room_id not in self._summaries:
+                return None
+            room = self.store.get(room_id)
+            if room is not None:
+                self._remember(room)
+            return room
+
+    def _remember(self, room):
+        """Coloca a sala no LRU, descartando as menos usadas acima de ``max_resident``."""
+        with self._lock:
+            self._resident[room["room_id"]] = room
+            self._resident.move_to_end(room["room_id"])
+            while len(self._resident) > self.max_resident:
+                room_id, _ = self._resident.popitem(last=False)
+                self.store.evict(room_id)
+
+    def get_room(self, room_id):
+        """Retorna a sala pelo ID (ou None); salas fora da memória são relidas de forma transparente."""
+        room = self._resident_room(room_id)
+        if room is None:
+            return None
+        self._last_active[room_id] = time.time()
+        if "access_log" in room and self.migrate:
+            self.access_log.import_entries(room_id, room.pop("access_log"))
+            self.store.put(room_id, room)
+        return room
+
+    def list_rooms(self):
+        """
+        Retorna os resumos das salas para o lobby (room_id, nome, jogadores e vencedor).
+        No modo "sharded" vem só do manifesto, sem abrir o arquivo de cada sala.
+        """
+        return list(self._summaries.values())
+
+    def lobby_page(self, page=0, page_size=LOBBY_PAGE_SIZE, view="all"):
+        """
+        Retorna uma página do lobby a partir dos resumos mantidos em memória.
+        Cada filtro tem seu próprio conjunto de salas, então o custo depende só da página,
+        não do total de salas nem do histórico delas.
+        :param page: Número da página (a partir de 0).
+        :param page_size: Salas por página.
+        :param view: Filtro (ver LOBBY_VIEWS): "all", "open", "new", "in_progress" ou "finished".
+        :return: Tupla (resumos da página, total de salas no filtro).
+        """
+        if view == "all":
+            rooms = self._summaries
+        elif view == "open":
+            rooms = self._open_rooms
+        elif view in self._rooms_by_status:
+            rooms = self._rooms_by_status[view]
+        else:
+            raise ValueError(f"Filtro de lobby desconhecido: {view}")
+        start = max(page, 0) * page_size
+        page_ids = list(itertools.islice(rooms, start, start + page_size))
+        return [self._summaries[room_id] for room_id in page_ids if room_id in self._summaries], len(rooms)
+
+    def find_open_room(self):
+        """Retorna uma sala com assento livre (ou None) em tempo constante."""
+        room_id = next(iter(self._open_rooms), None)
+        return None if room_id is None else self.get_room(room_id)
+
+    def find_empty_room(self, size=3, k=3):
+        """
+        Retorna uma sala sem ninguém sentado com a configuração de tabuleiro pedida (ou None).
+        :param size: Lado do tabuleiro.
+        :param k: Peças em linha para vencer.
+        """
+        for room_id in list(self._empty_rooms):
+            summary = self._summaries.get(room_id) or {}
+            if (summary.get("size") or 3, summary.get("k") or 3) == (size, k):
+                return self.get_room(room_id)
+        return None
 
     def load_rooms(self):
-        """Carrega as salas do arquivo JSON."""
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)["rooms"]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        """Carrega as salas do armazenamento."""
+        return list(self.store.load_all().values())
 
     def save_rooms(self):
-        """Salva as salas no arquivo JSON."""
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump({"rooms": self.rooms}, file, indent=4, ensure_ascii=False)
+        """Grava todas as salas de uma vez."""
+        self.store.replace_all({room["room_id"]: room for room in self.rooms})
+        self.build_index()
+        self.touch_stamp()
+
+    def _update_room(self, room_id, change):
+        """
+        Altera uma sala existente sobre o estado mais recente do armazenamento, com compare-and-swap
+        (``Store.update``): quem tinha uma cópia antiga não desfaz jogadas de outro processo.
+        :param change: Função que altera a sala recebida; retorna False se não há nada a gravar.
+        :return: True se a sala foi gravada.
+        """
+        def stamped_change(room):
+            if change(room) is False:
+                return False
+            room["updated_at"] = int(time.time())
+
+        with self.room_lock(room_id):
+            written, state = self.store.update(room_id, stamped_change)
+            if state is not None:
+                self._refresh_room(state)
+        if written:
+            self.touch_stamp()
+        return written
+
+    def room_lock(self, room_id):
+        """Lock das alterações de uma sala neste processo, compartilhado pelas requisições e pela limpeza."""
+        with self._lock:
+            return self._room_locks.setdefault(room_id, threading.Lock())
+
+    def apply_move(self, room_id, index, player, expected_version=None):
+        """
+        Faz uma jogada na sala com compare-and-swap sobre a versão da sala.
+        Se outro processo alterou a sala, nada é gravado e o estado atual é devolvido.
+        O jogo encerrado pela jogada vai para o arquivo morto (só o processo que a fez o grava).
+        :param room_id: ID da sala.
+        :param index: Casa escolhida (0 a size² - 1).
+        :param player: Nome do jogador.
+        :param expected_version: Versão da sala vista pelo jogador (padrão: a da cópia local).
+        :return: MoveResult (ok, conflict, state, error).
+        """
+        if expected_version is None:
+            room = self.get_room(room_id)
+            expected_version = record_version(room) if room else 0
+        with self.room_lock(room_id):
+            result = apply_versioned_move(self.store, room_id, index, player, expected_version)
+            if result.state is not None:
+                self._refresh_room(result.state)
+        if result.ok:
+            self._seen[(room_id, player)] = time.time()
+            if result.state["winner"]:
+                self.archive.append(str(uuid.uuid4()), result.state, room_id=room_id)
+            self.touch_stamp()
+        return result
+
+    def touch(self, room_id, username):
+        """Registra atividade do usuário na sala (cada exibição conta), adiando a liberação do lugar dele."""
+        self._seen[(room_id, username)] = time.time()
+
+    def sweep(self, room_ttl=ROOM_TTL, seat_ttl=SEAT_TTL, now=None):
+        """
+        Limpeza periódica das salas.
+        Libera os lugares de jogadores e visualizadores sem atividade há mais de ``seat_ttl`` segundos
+        (a última gravação da sala, feita por qualquer processo, também conta como atividade) e tira
+        da memória as salas sem acesso há mais de ``room_ttl`` segundos; elas continuam no armazenamento.
+        A cópia local só escolhe as salas a conferir: a decisão é tomada sobre o estado mais recente
+        do armazenamento e gravada com compare-and-swap, então uma jogada feita em outro processo
+        conta como atividade e nunca é desfeita.
+        :return: Dicionário com os lugares liberados e as salas descartadas da memória.
+        """
+        now = time.time() if now is None else now
+
+        def idle(room):
+            """Pessoas na sala sem atividade há mais de ``seat_ttl`` segundos."""
+            active_at = max(room.get("updated_at") or 0, self._loaded_at)
+            people = [
+                player for player in room["players"] if player != WAITING_PLAYER and player not in BOT_DIFFICULTY
+            ] + list(room["viewers"])
+            return [
+                username for username in people
+                if now - max(self._seen.get((room["room_id"], username), 0), active_at) > seat_ttl
+            ]
+
+        released = 0
+        # Salas com alguém sentado (pelos resumos) e as que estão em memória (podem ter visualizadores)
+        occupied = [
+            room_id for room_id, summary in list(self._summaries.items())
+            if any(player != WAITING_PLAYER and player not in BOT_DIFFICULTY for player in summary["players"] or [])
+        ]
+        with self._lock:
+            resident = list(self._resident)
+        for room_id in dict.fromkeys(occupied + resident):
+            room = self._resident.get(room_id) or self.store.get(room_id)
+            if room is None or not idle(room):
+                continue
+            leaving = []
+
+            def release(latest):
+                leaving[:] = idle(latest)
+                for username in leaving:
+                    self._vacate(latest, username)
+                return bool(leaving)
+
+            if self._update_room(room_id, release):
+                for username in leaving:
+                    self.access_log.exit(room_id, username)
+                    self._seen.pop((room_id, username), None)
+                released += len(leaving)
+        evicted = 0
+        with self._lock:
+            for room_id in list(self._resident):
+                if now - self._last_active.get(room_id, self._loaded_at) > room_ttl:
+                    del self._resident[room_id]
+                    self._last_active.pop(room_id, None)
+                    self.store.evict(room_id)
+                    evicted += 1
+        return {"released_seats": released, "evicted_rooms": evicted}
+
+    def new_match(self, room_id):
+        """
+        Limpa o tabuleiro e o histórico da sala para um novo jogo com os mesmos jogadores.
+        :return: True se a sala existe.
+        """
+        if not self.get_room(room_id):
+            return False
+        self._update_room(
+            room_id, lambda room: room.update(board=new_board(room["size"]), current_player="X", winner=None, moves=b"")
+        )
+        return True
+
+    def iter_archived_games(self, room_id=None, player=None, winner=None):
+        """
+        Percorre os jogos encerrados nas salas (gerador), sem carregar o arquivo morto.
+        :param room_id: Filtra por sala (opcional).
+        """
+        for game in self.archive.iter_games(player, winner):
+            if room_id is None or game.get("room_id") == room_id:
+                yield game
+
+    def create_room(self, name, size=3, k=3):
+        """
+        Cria uma sala vazia com a configuração de tabuleiro escolhida.
+        :param name: Nome exibido no lobby.
+        :param size: Lado do tabuleiro (3 no Jogo da Velha, 15 no gomoku).
+        :param k: Peças em linha para vencer.
+        :return: A sala criada.
+        """
+        if not 3 <= k <= size:
+            raise ValueError("O número de peças em linha deve estar entre 3 e o lado do tabuleiro.")
+        if size > MAX_SIZE:
+            raise ValueError(f"O lado do tabuleiro deve ser no máximo {MAX_SIZE}.")
+        room_id = max(self._summaries, default=0) + 1
+        while True:
+            room = RoomRecord(
+                room_id=room_id,
+                name=name,
+                players=[WAITING_PLAYER, WAITING_PLAYER],
+                board=new_board(size),
+                size=size,
+                k=k,
+                updated_at=int(time.time()),
+            )
+            # Só grava se o ID estiver livre: outro processo pode ter criado uma sala com ele
+            if self.store.insert(room_id, room):
+                break
+            room_id += 1
+        self._remember(room)
+        self._update_seats(room)
+        self.touch_stamp()
+        return room
+
+    def add_bot(self, room_id, difficulty="perfect"):
+        """
+        Coloca um robô no assento livre da sala (só no tabuleiro 3×3, o da tabela resolvida).
+        :param difficulty: "random", "mistakes" ou "perfect".
+        :return: True se havia assento livre.
+        """
+        def seat_bot(room):
+            if WAITING_PLAYER not in room["players"] or (room["size"], room["k"]) != (3, 3):
+                return False
+            room["players"][room["players"].index(WAITING_PLAYER)] = BOT_PLAYERS[difficulty]
+
+        return bool(self.get_room(room_id)) and self._update_room(room_id, seat_bot)
+
+    def play_bot_move(self, room_id, rng=random):
+        """
+        Faz a jogada do robô se for a vez dele, pelo mesmo compare-and-swap das jogadas humanas.
+        :param rng: Gerador de números aleatórios do robô.
+        :return: MoveResult ou None se não for a vez de um robô.
+        """
+        room = self.get_room(room_id)
+        if not room or room["winner"] or WAITING_PLAYER in room["players"]:
+            return None
+        player = room["players"][0 if room["current_player"] == "X" else 1]
+        difficulty = BOT_DIFFICULTY.get(player)
+        if difficulty is None:
+            return None
+        index = ai.choose_move(room["board"], difficulty, rng)
+        return self.apply_move(room_id, index, player, record_version(room))
+
+    def _refresh_room(self, state):
+        """Atualiza a cópia local da sala com o estado vindo do armazenamento."""
+        room = self._resident.get(state["room_id"])
+        if room is None:
+            room = state.copy()
+            self._remember(room)
+        elif room is not state:
+            room.clear()
+            room.update(state)
+        self._update_seats(room)
+
+    def export_rooms(self):
+        """Exporta o estado atual para o arquivo JSON tradicional."""
+        JsonStore(self.file_path, sync=self.sync, **LAYOUTS["rooms"]).replace_all(
+            {room["room_id"]: room for room in self.rooms}
+        )
 
     def log_access(self, room_id, username, status):
         """Registra o acesso à sala."""
-        room = next((r for r in self.rooms if r["room_id"] == room_id), None)
-        if room:
-            access_log = {
-                "username": username,
-                "status": status,
-                "access_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "exit_time": None
-            }
-            room["access_log"].append(access_log)
-            self.save_rooms()
+        if self.get_room(room_id):
+            self.access_log.enter(room_id, username, status)
 
     def update_exit_time(self, room_id, username):
         """Atualiza o horário de saída de um usuário."""
-        room = next((r for r in self.rooms if r["room_id"] == room_id), None)
-        if room:
-            for log in room["access_log"]:
-                if log["username"] == username and log["exit_time"] is None:
-                    log["exit_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    self.save_rooms()
-                    break
+        self.access_log.exit(room_id, username)
+
+    def get_access_history(self, room_id=None, username=None):
+        """Percorre o histórico de sessões (gerador) sem carregar todos os segmentos."""
+        return self.access_log.iter_sessions(room_id, username)
 
     def join_room(self, room_id, username):
         """Adiciona um jogador ou visualizador à sala."""
-        room = next((r for r in self.rooms if r["room_id"] == room_id), None)
-        if room:
-            if username not in room["players"] and username not in room["viewers"]:
-                if "Aguardando jogador..." in room["players"]:
-                    room["players"][room["players"].index("Aguardando jogador...")] = username
-                    self.log_access(room_id, username, "Jogador")
-                else:
-                    room["viewers"].append(username)
-                    self.log_access(room_id, username, "Visualizador")
-                self.save_rooms()
-                return True
-        return False
+        status = []
+
+        def sit(room):
+            status.clear()
+            if username in room["players"] or username in room["viewers"]:
+                return False
+            if WAITING_PLAYER in room["players"]:
+                room["players"][room["players"].index(WAITING_PLAYER)] = username
+                status.append("Jogador")
+            else:
+                room["viewers"].append(username)
+                status.append("Visualizador")
+
+        if not self.get_room(room_id) or not self._update_room(room_id, sit):
+            return False
+        self.access_log.enter(room_id, username, status[0])
+        self._seen[(room_id, username)] = time.time()
+        return True
+
+    def _vacate(self, room, username):
+        """Tira o usuário do assento ou da lista de visualizadores; retorna False se ele não estava na sala."""
+        if username in room["players"]:
+            room["players"][room["players"].index(username)] = WAITING_PLAYER
+            # Sem jogadores humanos, os robôs também liberam a sala
+            if all(player == WAITING_PLAYER or player in BOT_DIFFICULTY for player in room["players"]):
+                room["players"] = [WAITING_PLAYER] * len(room["players"])
+        elif username in room["viewers"]:
+            room["viewers"].remove(username)
+        else:
+            return False
 
     def leave_room(self, room_id, username):
         """Remove um jogador ou visualizador da sala."""
-        room = next((r for r in self.rooms if r["room_id"] == room_id), None)
-        if room:
-            if username in room["players"]:
-                room["players"][room["players"].index(username)] = "Aguardando jogador..."
-            elif username in room["viewers"]:
-                room["viewers"].remove(username)
-            self.update_exit_time(room_id, username)
-            self.save_rooms()
+        if self.get_room(room_id):
+            self._update_room(room_id, lambda room: self._vacate(room, username))
+            self.access_log.exit(room_id, username)
+            self._seen.pop((room_id, username), None)
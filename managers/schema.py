@@ -0,0 +1,220 @@
+"""
+Registros de salas e partidas e o formato compacto (schema v2) em disco.
+
+Em memória, salas e partidas são objetos com ``__slots__`` (sem um dicionário
+por instância) que aceitam o mesmo acesso de um dicionário
+(``room["board"]``, ``room.get("winner")``, ``"access_log" in room``), de modo
+que o restante do código não precisa mudar.
+
+Em disco, o schema v2 usa chaves curtas, o tabuleiro empacotado numa string
+de 9 caracteres (``"XO X  O  "``) e omite campos com o valor padrão::
+
+    {"id": 1, "n": "Sala 1", "p": ["VNS", "MMPG"], "b": "XXX OOO X", "c": "O", "w": "X", "v": 3}
+
+O histórico de jogadas guarda um byte por jogada (o índice da casa) e vai
+para o disco em base64 (``"m": "BAAI"``).
+
+Tabuleiros maiores levam o lado e as peças em linha (``"sz"`` e ``"k"``); os
+esparsos gravam só as casas ocupadas: ``"b": {"X": [112, 113], "O": [97]}``.
+
+A leitura aceita também o formato antigo (chaves longas e tabuleiro em lista).
+"""
+import base64
+from collections.abc import MutableMapping
+
+from game.board import SparseBoard
+
+SCHEMA_VERSION = 2
+
+
+class Record(MutableMapping):
+    """
+    Registro com campos fixos em ``__slots__`` e acesso de dicionário.
+    Chaves fora de ``FIELDS`` (ex: o ``access_log`` do formato antigo) ficam em ``extra``.
+    """
+
+    __slots__ = ("extra",)
+
+    # Campo -> valor padrão (listas são copiadas a cada registro)
+    FIELDS = {}
+
+    def __init__(self, data=(), **kwargs):
+        self.extra = None
+        for field, default in self.FIELDS.items():
+            object.__setattr__(self, field, list(default) if isinstance(default, list) else default)
+        self.update(data, **kwargs)
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            # Campos fixos não somem: voltam ao valor padrão
+            default = self.FIELDS[key]
+            setattr(self, key, list(default) if isinstance(default, list) else default)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS or bool(self.extra) and key in self.extra
+
+    def __iter__(self):
+        yield from self.FIELDS
+        if self.extra:
+            yield from list(self.extra)
+
+    def __len__(self):
+        return len(self.FIELDS) + len(self.extra or ())
+
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def clear(self):
+        self.extra = None
+        for field, default in self.FIELDS.items():
+            setattr(self, field, list(default) if isinstance(default, list) else default)
+
+    def copy(self):
+        """Cópia independente (listas e tabuleiros copiados), usada no lugar de ``copy.deepcopy``."""
+        clone = type(self).__new__(type(self))
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            object.__setattr__(clone, field, value.copy() if isinstance(value, (list, SparseBoard)) else value)
+        clone.extra = {key: value for key, value in self.extra.items()} if self.extra else None
+        return clone
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __eq__(self, other):
+        if isinstance(other, Record) or isinstance(other, dict):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class RoomRecord(Record):
+    """Sala de jogo."""
+
+    __slots__ = ("room_id", "name", "players", "viewers", "board", "current_player", "winner", "version",
+                 "size", "k", "moves", "updated_at")
+    FIELDS = {
+        "room_id": None,
+        "name": "",
+        "players": [],
+        "viewers": [],
+        "board": [" "] * 9,
+        "current_player": "X",
+        "winner": None,
+        "version": 0,
+        "size": 3,  # Lado do tabuleiro
+        "k": 3,  # Peças em linha para vencer
+        "moves": b"",  # Casas jogadas na partida atual, um byte por jogada
+        "updated_at": 0,  # Última gravação (segundos desde a época), usada na limpeza por inatividade
+    }
+
+
+class GameRecord(Record):
+    """Partida."""
+
+    __slots__ = ("board", "current_player", "players", "winner", "version", "size", "k", "moves", "updated_at")
+    FIELDS = {
+        "board": [" "] * 9,
+        "current_player": "X",
+        "players": [],
+        "winner": None,
+        "version": 0,
+        "size": 3,
+        "k": 3,
+        "moves": b"",
+        "updated_at": 0,
+    }
+
+
+class RecordCodec:
+    """Converte registros para o schema v2 e lê tanto o v2 quanto o formato antigo."""
+
+    def __init__(self, record_class, short_keys):
+        """
+        :param record_class: Classe dos registros (ex: RoomRecord).
+        :param short_keys: Campo -> chave curta usada em disco.
+        """
+        self.record_class = record_class
+        self.short_keys = short_keys
+        self.long_keys = {short: field for field, short in short_keys.items()}
+        self.version_key = short_keys["version"]
+
+    def encode(self, record):
+        """Retorna o dicionário compacto (v2) de um registro; campos com o valor padrão são omitidos."""
+        data = {}
+        defaults = self.record_class.FIELDS
+        for field, short in self.short_keys.items():
+            value = record.get(field)
+            if field == "board":
+                data[short] = value.to_json() if isinstance(value, SparseBoard) else "".join(value)
+            elif field == "moves":
+                if value:
+                    data[short] = base64.b64encode(value).decode("ascii")
+            elif value != defaults[field]:
+                data[short] = value
+        extra = record.extra if isinstance(record, Record) else {
+            key: value for key, value in record.items() if key not in defaults
+        }
+        if extra:
+            data.update(extra)
+        return data
+
+    def decode(self, data):
+        """Cria o registro a partir do formato v2 ou do formato antigo (detectado pela chave "board")."""
+        record = self.record_class()
+        if "board" in data:
+            record.update(data)
+            return record
+        board = None
+        for key, value in data.items():
+            field = self.long_keys.get(key)
+            if field == "board":
+                board = value
+            elif field == "moves":
+                record.moves = base64.b64decode(value)
+            elif field is not None:
+                record[field] = value
+            else:
+                record[key] = value
+        if isinstance(board, dict):
+            record.board = SparseBoard.from_json(record.size, board)
+        elif board is not None:
+            record.board = list(board)
+        return record
+
+
+ROOM_CODEC = RecordCodec(RoomRecord, {
+    "room_id": "id", "name": "n", "players": "p", "viewers": "vw",
+    "board": "b", "current_player": "c", "winner": "w", "version": "v", "size": "sz", "k": "k", "moves": "m",
+    "updated_at": "t",
+})
+
+GAME_CODEC = RecordCodec(GameRecord, {
+    "board": "b", "current_player": "c", "players": "p", "winner": "w", "version": "v", "size": "sz", "k": "k",
+    "moves": "m", "updated_at": "t",
+})
@@ -0,0 +1,1194 @@
+"""
+Camada de armazenamento comum aos gerenciadores.
+
+Cada gerenciador enxerga seus dados como uma coleção chave -> registro
+(partidas por ID, salas por room_id, usuários por nome, ranking por
+jogador) e persiste alterações por chave. As implementações decidem o
+custo de cada operação:
+
+- ``JsonStore``: o arquivo JSON tradicional, reescrito inteiro a cada gravação;
+- ``JournalStore``: diário append-only com snapshot compactado (um único processo);
+- ``SqliteStore``: uma linha por registro num banco SQLite em modo WAL,
+  compartilhável entre vários processos;
+- ``ShardedStore``: um arquivo JSON pequeno por registro e um manifesto leve,
+  com os registros lidos sob demanda;
+- ``BucketStore``: registros distribuídos por hash da chave num número fixo
+  de arquivos ("baldes"), para coleções grandes consultadas só por chave
+  (usuários).
+
+Os arquivos são sempre substituídos de forma atômica (``managers.atomic``) e
+um arquivo ilegível gera ``CorruptFileError`` em vez de virar uma coleção
+vazia. Dentro de ``batch()`` as gravações das coleções JSON e fragmentadas
+são adiadas e cada coleção grava uma única vez, ao final do bloco.
+"""
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from urllib.parse import quote
+
+try:
+    import fcntl  # Lock de arquivo entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+from game.board import stones
+from managers import metrics
+from managers.atomic import write_atomic
+from managers.journal import Journal
+from managers.registry import file_stamp
+from managers.schema import GAME_CODEC, ROOM_CODEC, SCHEMA_VERSION
+
+# Banco SQLite padrão, compartilhado por todas as coleções
+DEFAULT_DB = 'pages/js/state.db'
+
+# Formato de cada coleção no arquivo JSON: chave raiz, campo de ID (para listas) e,
+# para salas e partidas, o codec do schema v2 compacto
+LAYOUTS = {
+    "games": {"root_key": "games", "codec": GAME_CODEC},
+    "rooms": {"root_key": "rooms", "list_key": "room_id", "codec": ROOM_CODEC},
+    "users": {"root_key": "users"},
+    "ranking": {"root_key": None},
+}
+
+# Tentativas de Store.update antes de desistir (cada conflito relê o registro e tenta de novo)
+UPDATE_ATTEMPTS = 8
+
+# Métodos das coleções medidos pelas métricas (histograma store_seconds, rótulo operation)
+INSTRUMENTED = (
+    "load_all", "reload", "read", "read_shard", "read_bucket", "get", "get_many", "get_latest",
+    "put", "put_many", "delete", "replace_all", "compare_and_swap", "insert", "write",
+)
+
+# Campos de cada registro copiados para o manifesto do modo "sharded" (resumos do lobby)
+SUMMARY_FIELDS = {
+    "games": ("players", "winner"),
+    "rooms": ("room_id", "name", "players", "winner", "size", "k", "viewer_count", "status"),
+}
+
+
+def record_version(record):
+    """Versão de um registro (salas e partidas antigas, sem o campo, contam como 0)."""
+    return record.get("version", 0)
+
+
+def room_status(room):
+    """Situação da sala no lobby: "finished" (jogo encerrado), "in_progress" (com jogadas) ou "new"."""
+    if room.get("winner"):
+        return "finished"
+    if room.get("moves") or stones(room.get("board") or ()):
+        return "in_progress"
+    return "new"
+
+
+# Campos dos resumos calculados a partir do registro: nome -> função
+DERIVED_FIELDS = {
+    "viewer_count": lambda record: len(record.get("viewers") or ()),
+    "status": room_status,
+}
+
+
+def summarize(record, fields):
+    """Resumo de um registro com apenas os campos ``fields`` (ausentes viram None; ver DERIVED_FIELDS)."""
+    return {
+        field: DERIVED_FIELDS[field](record) if field in DERIVED_FIELDS else record.get(field)
+        for field in fields
+    }
+
+
+class CorruptFileError(Exception):
+    """Arquivo de dados com conteúdo inválido; nada é regravado por cima dele."""
+
+
+def read_json(path):
+    """
+    Lê um arquivo JSON da camada de armazenamento.
+    :return: Conteúdo do arquivo ou None se ele não existir ou estiver vazio (criado e nunca gravado).
+    :raises CorruptFileError: Se o conteúdo não for JSON válido.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            text = file.read()
+    except FileNotFoundError:
+        return None
+    if not text.strip():
+        return None
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise CorruptFileError(f"Arquivo corrompido: {path} ({e}). Restaure-o a partir de uma cópia "
+                               f"(ex: o histórico do GitHub) antes de continuar.") from e
+
+
+def write_json(path, data, **options):
+    """Grava ``data`` em ``path`` de forma atômica; ``options`` vão para ``json.dump``."""
+    write_atomic(path, lambda file: json.dump(data, file, ensure_ascii=False, **options))
+
+
+# Coleções com gravações adiadas pelo batch() ativo em cada thread
+_batch = threading.local()
+
+
+@contextlib.contextmanager
+def batch():
+    """
+    Agrupa as gravações feitas no bloco (ex: um rerun do Streamlit ou uma requisição do servidor):
+    as coleções JSON e fragmentadas gravam uma única vez, ao final. Leituras do disco feitas no meio
+    do bloco (``get_latest``, ``compare_and_swap``) gravam antes o que estiver pendente.
+    Blocos aninhados são absorvidos pelo mais externo.
+    """
+    if getattr(_batch, "stores", None) is not None:
+        yield
+        return
+    _batch.stores = {}  # dict usado como conjunto ordenado
+    try:
+        yield
+    finally:
+        stores, _batch.stores = _batch.stores, None
+        for store in stores:
+            store.flush()
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Lock exclusivo entre processos usando um arquivo auxiliar."""
+    with open(path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class Store:
+    """Interface das coleções chave -> registro."""
+
+    # Arquivo a ser enviado ao GitHub após cada gravação (None se não se aplica)
+    sync_path = None
+    # Registros lidos sob demanda: load_all não traz tudo para a memória
+    lazy = False
+    # Nome da coleção nos rótulos das métricas (ex: "rooms")
+    collection = ""
+    # Codec do schema v2 (salas e partidas); None grava os registros como estão
+    codec = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Cada implementação tem suas leituras e gravações medidas (custo quase nulo se desligado)
+        for name in INSTRUMENTED:
+            if name in cls.__dict__:
+                setattr(cls, name, metrics.instrument_method("store_seconds", name, cls.__dict__[name]))
+
+    def load_all(self):
+        """Retorna todos os registros num dicionário chave -> registro."""
+        raise NotImplementedError
+
+    def reload(self):
+        """Descarta caches e relê todos os registros."""
+        return self.load_all()
+
+    def get(self, key):
+        """Retorna um registro (ou None)."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Retorna os registros existentes entre ``keys`` num dicionário chave -> registro."""
+        records = {}
+        for key in keys:
+            record = self.get(key)
+            if record is not None:
+                records[key] = record
+        return records
+
+    def put(self, key, value):
+        """Grava um registro."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove um registro."""
+        raise NotImplementedError
+
+    def put_many(self, items):
+        """Grava vários registros de uma vez."""
+        for key, value in items:
+            self.put(key, value)
+
+    def replace_all(self, data):
+        """Substitui a coleção inteira pelo dicionário ``data``."""
+        raise NotImplementedError
+
+    def get_latest(self, key):
+        """Retorna o registro como está no armazenamento, ignorando caches."""
+        return self.get(key)
+
+    def evict(self, key):
+        """
+        Descarta a cópia em memória de um registro; a próxima leitura volta ao disco.
+        No JSON e no diário a coleção inteira fica em memória e nada muda.
+        """
+
+    def summaries(self, fields):
+        """
+        Resume todos os registros (ex: nome e jogadores das salas, para o lobby).
+        :param fields: Campos copiados de cada registro.
+        :return: Dicionário chave -> resumo.
+        """
+        return {key: summarize(record, fields) for key, record in self.load_all().items()}
+
+    def compare_and_swap(self, key, expected_version, value):
+        """
+        Grava ``value`` somente se a versão atual do registro for ``expected_version``.
+        Em caso de sucesso, ``value["version"]`` passa a ser ``expected_version + 1``.
+        :return: Tupla (gravou, registro atual).
+        """
+        with self.key_lock(key):
+            current = self.get_latest(key)
+            if current is None or record_version(current) != expected_version:
+                return False, current
+            value["version"] = expected_version + 1
+            self.put(key, value)
+            return True, value
+
+    def insert(self, key, value):
+        """
+        Grava um registro novo somente se a chave ainda não existir; ``value["version"]`` passa a 1.
+        :return: True se gravou (False se outra instância ou processo já criou a chave).
+        """
+        with self.key_lock(key):
+            if self.get_latest(key) is not None:
+                return False
+            value["version"] = 1
+            self.put(key, value)
+            return True
+
+    def update(self, key, change, attempts=UPDATE_ATTEMPTS, create=None):
+        """
+        Altera um registro versionado sem perder gravações de outras instâncias: relê o registro
+        (``get_latest``), aplica ``change`` e grava com ``compare_and_swap``. Se outro processo
+        gravou no meio, a alteração é refeita sobre o registro novo.
+        :param change: Função que altera o registro recebido; retorna False se não há nada a gravar.
+        :param attempts: Número máximo de tentativas.
+        :param create: Função que cria o registro quando a chave não existe (gravado com ``insert``);
+            None para não criar.
+        :return: Tupla (gravou, registro atual); o registro é None se a chave não existe.
+        """
+        current = self.get_latest(key)
+        for _ in range(attempts):
+            if current is None:
+                if create is None:
+                    return False, None
+                record = create()
+                if change(record) is False:
+                    return False, None
+                if self.insert(key, record):
+                    return True, record
+                current = self.get_latest(key)  # Criado por outro processo no meio: altera o dele
+                continue
+            expected_version = record_version(current)
+            if change(current) is False:
+                return False, current
+            swapped, current = self.compare_and_swap(key, expected_version, current)
+            if swapped:
+                return True, current
+        return False, current
+
+    def encode(self, record):
+        """Registro no formato gravado em disco."""
+        return self.codec.encode(record) if self.codec else record
+
+    def decode(self, data):
+        """Registro em memória a partir do formato em disco (v2 ou antigo)."""
+        return self.codec.decode(data) if self.codec else data
+
+    def key_lock(self, key):
+        """Lock (dentro do processo) exclusivo de um registro."""
+        locks = self.__dict__.setdefault("_key_locks", {})
+        return locks.setdefault(key, threading.Lock())
+
+    def version(self):
+        """Valor comparável que muda quando outra instância ou processo altera a coleção."""
+        raise NotImplementedError
+
+    def defer(self):
+        """Indica se há um ``batch()`` ativo nesta thread; nesse caso a coleção grava ao final dele."""
+        stores = getattr(_batch, "stores", None)
+        if stores is None:
+            return False
+        stores[self] = None
+        return True
+
+    def flush(self):
+        """Grava o que ficou pendente por ``batch()`` (nada a fazer nas coleções que gravam na hora)."""
+
+    def close(self):
+        """Libera arquivos e conexões."""
+
+
+class JsonStore(Store):
+    """Coleção guardada no arquivo JSON tradicional (reescrito inteiro a cada gravação)."""
+
+    def __init__(self, file_path, root_key=None, list_key=None, sync=None, codec=None):
+        """
+        Inicializa a coleção em JSON.
+        :param file_path: Caminho do arquivo JSON.
+        :param root_key: Chave raiz do arquivo (ex: "games"); None para um dicionário na raiz.
+        :param list_key: Campo de ID quando a coleção é salva como lista (ex: "room_id").
+        :param sync: GitHubSync opcional, avisado a cada gravação.
+        :param codec: Codec do schema v2; com ele o arquivo é gravado compacto e com ``schema_version``.
+        """
+        self.file_path = file_path
+        self.sync_path = file_path
+        self.collection = os.path.splitext(os.path.basename(file_path))[0]
+        self.root_key = root_key
+        self.list_key = list_key
+        self.sync = sync
+        self.codec = codec
+        self.data = None
+        # Chaves alteradas em memória e ainda não gravadas: chave -> registro (None se removida)
+        self._changes = {}
+        self._replaced = False  # replace_all pendente: o arquivo é reescrito inteiro
+        self._lock = threading.RLock()  # Protege as alterações pendentes entre threads
+        self._written = None  # Assinatura do arquivo como esta instância o leu ou gravou por último
+
+    def load_all(self):
+        """Lê o arquivo (uma vez) e retorna o dicionário mantido em memória."""
+        if self.data is None:
+            stamp = file_stamp(self.file_path)
+            self.data = self.read()
+            self._written = stamp
+        return self.data
+
+    def read(self):
+        """Lê o arquivo JSON do disco (CorruptFileError se ele estiver ilegível)."""
+        data = read_json(self.file_path)
+        if data is None:
+            return {}
+        if self.root_key is not None:
+            data = data.get(self.root_key, {})
+        if self.codec is None:
+            if self.list_key is not None:
+                return {item[self.list_key]: item for item in data}
+            return data
+        if self.list_key is not None:
+            records = (self.codec.decode(item) for item in data)
+            return {record[self.list_key]: record for record in records}
+        return {key: self.codec.decode(item) for key, item in data.items()}
+
+    def reload(self):
+        """Descarta a cópia em memória e relê o arquivo."""
+        self.data = None
+        return self.load_all()
+
+    def get(self, key):
+        return self.load_all().get(key)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def delete(self, key):
+        # Grava mesmo se a chave já saiu do dicionário: quem chama costuma removê-la antes
+        with self._lock:
+            self.load_all().pop(key, None)
+            self._changes[key] = None
+        self.save()
+
+    def put_many(self, items):
+        items = dict(items)
+        with self._lock:
+            self.load_all().update(items)
+            self._changes.update(items)
+        self.save()
+
+    def replace_all(self, data):
+        with self._lock:
+            self.data = data
+            self._changes = {}
+            self._replaced = True
+        self.save()
+
+    def get_latest(self, key):
+        self.flush()
+        return self.read().get(key)
+
+    def compare_and_swap(self, key, expected_version, value):
+        # O arquivo é um só: o lock entre processos cobre o arquivo inteiro, mas só
+        # durante a releitura e a gravação; o registro é comparado com o que está no disco.
+        self.flush()
+        with self.key_lock(key), file_lock(f"{self.file_path}.lock"):
+            foreign = file_stamp(self.file_path) != self._written
+            on_disk = self.read()
+            current = on_disk.get(key)
+            if current is None or record_version(current) != expected_version:
+                return False, current
+            value["version"] = expected_version + 1
+            on_disk[key] = value
+            self.load_all()[key] = value
+            self.write(on_disk, foreign)
+            return True, value
+
+    def insert(self, key, value):
+        self.flush()
+        with self.key_lock(key), file_lock(f"{self.file_path}.lock"):
+            foreign = file_stamp(self.file_path) != self._written
+            on_disk = self.read()
+            if key in on_disk:
+                return False
+            value["version"] = 1
+            on_disk[key] = value
+            self.load_all()[key] = value
+            self.write(on_disk, foreign)
+            return True
+
+    def save(self):
+        """Grava as alterações feitas em memória (ao final do ``batch()`` ativo, se houver)."""
+        if not self.defer():
+            self.flush()
+
+    def flush(self):
+        """
+        Grava as alterações pendentes sob o lock do arquivo, mescladas com o que está no disco:
+        só as chaves alteradas por esta instância são regravadas, e as gravações de outras
+        instâncias e processos (inclusive jogadas por compare-and-swap) são preservadas.
+        """
+        with self._lock:
+            if not self._changes and not self._replaced:
+                return
+            with file_lock(f"{self.file_path}.lock"):
+                changes, self._changes = self._changes, {}
+                if self._replaced:
+                    self._replaced = False
+                    self.write(self.load_all())
+                    return
+                foreign = file_stamp(self.file_path) != self._written
+                on_disk = self.read()
+                for key, value in changes.items():
+                    if value is None:
+                        on_disk.pop(key, None)
+                    else:
+                        on_disk[key] = value
+                self.write(on_disk, foreign)
+
+    def write(self, data, foreign=False):
+        """
+        Reescreve o arquivo JSON com o dicionário ``data``.
+        :param foreign: ``data`` traz gravações de outras instâncias que a cópia em memória não tem;
+            nesse caso a versão muda e os gerenciadores relêem a coleção.
+        """
+        data = dict(data)  # Aceita também a coleção preguiçosa do modo "sharded"
+        if self.codec is not None:
+            data = {key: self.codec.encode(record) for key, record in data.items()}
+        if self.list_key is not None:
+            data = list(data.values())
+        if self.root_key is not None:
+            data = {self.root_key: data}
+        if self.codec is not None:
+            # Schema v2: sem indentação, com a versão na raiz
+            write_json(self.file_path, dict(schema_version=SCHEMA_VERSION, **data), separators=(',', ':'))
+        else:
+            write_json(self.file_path, data, indent=4)
+        self._written = None if foreign else file_stamp(self.file_path)
+        if self.sync:
+            self.sync.mark_dirty(self.file_path)
+
+    def version(self):
+        # O arquivo como esta instância o leu ou gravou tem sempre a mesma versão: só gravações de
+        # outras instâncias ou processos contam (uma gravação adiada não dispara releitura)
+        stamp = file_stamp(self.file_path)
+        return "own" if stamp == self._written else stamp
+
+
+class JournalStore(Store):
+    """
+    Coleção em diário append-only; na primeira execução importa o arquivo JSON.
+    Só para um processo: o compare-and-swap usa o estado em memória e o diário aceita uma
+    única instância aberta por vez (``journal.JournalLockedError`` na segunda).
+    """
+
+    def __init__(self, file_path, root_key=None, list_key=None, compact_threshold=256 * 1024, codec=None):
+        """
+        Inicializa a coleção em diário.
+        :param file_path: Caminho do arquivo JSON (base dos arquivos do diário).
+        :param compact_threshold: Tamanho do diário (em bytes) que dispara a compactação.
+        :param codec: Codec do schema v2 dos registros.
+        """
+        self.journal = Journal(file_path, compact_threshold)
+        self.collection = os.path.splitext(os.path.basename(file_path))[0]
+        self.codec = codec
+        self.seed = JsonStore(file_path, root_key, list_key, codec=codec)
+        self.data = None
+
+    def load_all(self):
+        if self.data is None:
+            if self.journal.exists():
+                self.data = {key: self.decode(value) for key, value in self.journal.load().items()}
+            else:
+                # Primeira execução no modo diário: o JSON atual vira o snapshot inicial
+                self.data = self.seed.read()
+                self.journal.write_snapshot({key: self.encode(value) for key, value in self.data.items()})
+        return self.data
+
+    def reload(self):
+        self.data = None
+        return self.load_all()
+
+    def get(self, key):
+        return self.load_all().get(key)
+
+    def put(self, key, value):
+        self.load_all()[key] = value
+        self.journal.set(key, self.encode(value))
+
+    def delete(self, key):
+        self.load_all().pop(key, None)
+        self.journal.delete(key)
+
+    def replace_all(self, data):
+        self.data = data
+        self.journal.write_snapshot({key: self.encode(value) for key, value in data.items()})
+
+    def version(self):
+        return file_stamp(self.journal.snapshot_path, self.journal.journal_path)
+
+    def close(self):
+        self.journal.close()
+
+
+class SqliteStore(Store):
+    """
+    Coleção numa tabela SQLite (uma linha por registro, chave primária indexada).
+
+    Usa o modo WAL para que leitores não bloqueiem o escritor e cada operação
+    roda na sua própria transação, o que permite a vários processos do
+    servidor compartilharem o mesmo banco. A tabela ``store_versions`` guarda
+    um contador por coleção, incrementado a cada gravação, usado para saber
+    se outra instância alterou os dados.
+    """
+
+    def __init__(self, db_path, table, timeout=5.0, codec=None):
+        """
+        Inicializa a coleção em SQLite.
+        :param db_path: Caminho do arquivo do banco.
+        :param table: Nome da tabela (ex: "games").
+        :param timeout: Espera máxima (em segundos) por um lock de escrita.
+        :param codec: Codec do schema v2 dos registros.
+        """
+        self.db_path = db_path
+        self.table = table
+        self.collection = table
+        self.codec = codec
+        self.timeout = timeout
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" (key PRIMARY KEY, value TEXT NOT NULL)')
+            conn.execute("CREATE TABLE IF NOT EXISTS store_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO store_versions VALUES (?, 0)", (table,))
+
+    def connection(self):
+        """Retorna a conexão da thread atual (uma por thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load_all(self):
+        rows = self.connection().execute(f'SELECT key, value FROM "{self.table}" ORDER BY rowid')
+        return {key: self.decode(json.loads(value)) for key, value in rows}
+
+    def get(self, key):
+        row = self.connection().execute(f'SELECT value FROM "{self.table}" WHERE key = ?', (key,)).fetchone()
+        return self.decode(json.loads(row[0])) if row else None
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        with self.connection() as conn:
+            conn.executemany(
+                f'INSERT INTO "{self.table}" (key, value) VALUES (?, ?) '
+                f'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+                [(key, self._dumps(value)) for key, value in items],
+            )
+            self._bump(conn)
+
+    def delete(self, key):
+        with self.connection() as conn:
+            conn.execute(f'DELETE FROM "{self.table}" WHERE key = ?', (key,))
+            self._bump(conn)
+
+    def replace_all(self, data):
+        with self.connection() as conn:
+            conn.execute(f'DELETE FROM "{self.table}"')
+            conn.executemany(
+                f'INSERT INTO "{self.table}" (key, value) VALUES (?, ?)',
+                [(key, self._dumps(value)) for key, value in data.items()],
+            )
+            self._bump(conn)
+
+    def compare_and_swap(self, key, expected_version, value):
+        # O UPDATE condicional é atômico no SQLite: não há lock na aplicação
+        value["version"] = expected_version + 1
+        with self.connection() as conn:
+            updated = conn.execute(
+                f'UPDATE "{self.table}" SET value = ? '
+                # A versão fica em "v" no schema v2 e em "version" nos registros antigos
+                f"WHERE key = ? AND COALESCE(json_extract(value, '$.v'), json_extract(value, '$.version'), 0) = ?",
+                (self._dumps(value), key, expected_version),
+            ).rowcount
+            if updated:
+                self._bump(conn)
+        if updated:
+            return True, value
+        value["version"] = expected_version
+        return False, self.get(key)
+
+    def insert(self, key, value):
+        value["version"] = 1
+        with self.connection() as conn:
+            inserted = conn.execute(
+                f'INSERT OR IGNORE INTO "{self.table}" (key, value) VALUES (?, ?)', (key, self._dumps(value))
+            ).rowcount
+            if inserted:
+                self._bump(conn)
+        return bool(inserted)
+
+    def is_empty(self):
+        """Indica se a tabela não tem nenhum registro."""
+        return self.connection().execute(f'SELECT 1 FROM "{self.table}" LIMIT 1').fetchone() is None
+
+    def version(self):
+        row = self.connection().execute(
+            "SELECT version FROM store_versions WHERE name = ?", (self.table,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _dumps(self, value):
+        return json.dumps(self.encode(value), separators=(',', ':'), ensure_ascii=False)
+
+    def _bump(self, conn):
+        conn.execute("UPDATE store_versions SET version = version + 1 WHERE name = ?", (self.table,))
+
+
+class ShardedRecords(MutableMapping):
+    """
+    Dicionário chave -> registro de um ``ShardedStore``, lido sob demanda.
+
+    As chaves vêm do manifesto; o arquivo de um registro só é lido na primeira
+    vez em que ele é acessado. Alterações feitas aqui ficam só em memória, como
+    no dicionário de ``JsonStore.load_all``: quem altera chama ``put``/``delete``.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.cache = {}
+
+    def __getitem__(self, key):
+        if key not in self.cache:
+            if key not in self.store.entries:
+                raise KeyError(key)
+            record = self.store.read_shard(key)
+            if record is None:
+                raise KeyError(key)
+            self.cache[key] = record
+        return self.cache[key]
+
+    def __setitem__(self, key, value):
+        self.cache[key] = value
+        self.store.entries.setdefault(key, None)  # Resumo definido no próximo put
+
+    def __delitem__(self, key):
+        if key not in self.store.entries:
+            raise KeyError(key)
+        del self.store.entries[key]
+        self.cache.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.store.entries
+
+    def __iter__(self):
+        return iter(list(self.store.entries))
+
+    def __len__(self):
+        return len(self.store.entries)
+
+
+class ShardedStore(Store):
+    """
+    Coleção com um arquivo JSON por registro (``pages/js/rooms/3.json``) e um
+    manifesto (``pages/js/rooms.manifest.json``) com a lista de chaves e um
+    resumo de cada registro.
+
+    Uma jogada reescreve só o arquivo da sua sala ou partida; o manifesto só é
+    regravado quando a chave é criada ou removida ou quando o resumo muda
+    (jogadores, vencedor). O lobby lê apenas o manifesto e cada registro é
+    lido na primeira vez em que é acessado.
+    """
+
+    lazy = True
+
+    def __init__(self, file_path, summary_fields=(), sync=None, codec=None):
+        """
+        Inicializa a coleção fragmentada.
+        :param file_path: Caminho do arquivo JSON da coleção (ex: pages/js/rooms.json);
+            os registros ficam no diretório de mesmo nome, sem a extensão.
+        :param summary_fields: Campos de cada registro copiados para o manifesto.
+        :param sync: GitHubSync opcional, avisado a cada gravação.
+        :param codec: Codec do schema v2 dos registros.
+        """
+        base = os.path.splitext(file_path)[0]
+        self.directory = base
+        self.collection = os.path.basename(base)
+        self.manifest_path = f"{base}.manifest.json"
+        self.sync_path = self.manifest_path
+        self.summary_fields = tuple(summary_fields)
+        self.sync = sync
+        self.codec = codec
+        self.entries = self.read_manifest()
+        self.records = ShardedRecords(self)
+        self._stamps = {}  # chave -> assinatura do arquivo quando foi lido ou gravado
+        self._pending = {}  # chave -> registro aguardando o fim do batch()
+        self._manifest_written = None  # Assinatura do manifesto após a última gravação desta instância
+
+    def exists(self):
+        """Indica se o manifesto já foi criado."""
+        return os.path.exists(self.manifest_path)
+
+    def shard_path(self, key):
+        """Caminho do arquivo de um registro."""
+        return os.path.join(self.directory, quote(str(key), safe='') + ".json")
+
+    def read_manifest(self):
+        """Lê o manifesto do disco: dicionário chave -> resumo, na ordem de criação."""
+        manifest = read_json(self.manifest_path)
+        if manifest is None:
+            return {}
+        return {key: summary for key, summary in manifest["entries"]}
+
+    def read_shard(self, key):
+        """Lê o arquivo de um registro (None se não existir)."""
+        path = self.shard_path(key)
+        record = read_json(path)
+        if record is None:
+            return None
+        self._stamps[key] = file_stamp(path)
+        return self.decode(record)
+
+    def load_all(self):
+        """Retorna a coleção preguiçosa: os registros são lidos quando acessados."""
+        return self.records
+
+    def reload(self):
+        self.flush()
+        self.entries = self.read_manifest()
+        self.records = ShardedRecords(self)
+        self._stamps = {}
+        return self.records
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def get_latest(self, key):
+        self.flush()
+        if key not in self.entries and key not in self.read_manifest():
+            return None
+        return self.read_shard(key)
+
+    def summaries(self, fields):
+        # Os resumos do manifesto já estão prontos: só seleciona os campos
+        return {key: {field: (summary or {}).get(field) for field in fields} for key, summary in self.entries.items()}
+
+    def refresh_summaries(self):
+        """
+        Recalcula os resumos do manifesto sem todos os campos (gravados por versões anteriores).
+        Só lê os arquivos desses registros; nas execuções seguintes não há nada a fazer.
+        :return: Número de resumos atualizados.
+        """
+        changes = {}
+        for key, summary in list(self.entries.items()):
+            if summary is not None and all(field in summary for field in self.summary_fields):
+                continue
+            record = self.read_shard(key)
+            if record is not None:
+                changes[key] = summarize(record, self.summary_fields)
+        if changes:
+            self.entries.update(changes)
+            self._update_manifest(changes)
+        return len(changes)
+
+    def put(self, key, value):
+        if self.defer():
+            # O registro já vale em memória; o arquivo e o manifesto são gravados no fim do batch()
+            self.records.cache[key] = value
+            self.entries.setdefault(key, None)
+            self._pending[key] = value
+            return
+        self._write_shards({key: value})
+
+    def put_many(self, items):
+        items = dict(items)
+        if self.defer():
+            for key, value in items.items():
+                self.put(key, value)
+            return
+        self._write_shards(items)
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            self._write_shards(pending)
+
+    def _write_shards(self, records):
+        """Grava os arquivos dos registros e, numa só atualização, os resumos que mudaram."""
+        os.makedirs(self.directory, exist_ok=True)
+        changes = {}
+        for key, value in records.items():
+            path = self.shard_path(key)
+            write_json(path, self.encode(value), separators=(',', ':'))
+            self._stamps[key] = file_stamp(path)
+            self.records.cache[key] = value
+            self._mark_dirty(path)
+            summary = summarize(value, self.summary_fields)
+            if self.entries.get(key) != summary:
+                self.entries[key] = summary
+                changes[key] = summary
+        if changes:
+            self._update_manifest(changes)
+
+    def evict(self, key):
+        self.records.cache.pop(key, None)
+        self._stamps.pop(key, None)
+
+    def delete(self, key):
+        self._pending.pop(key, None)
+        self.entries.pop(key, None)
+        self.records.cache.pop(key, None)
+        self._stamps.pop(key, None)
+        path = self.shard_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+            self._mark_dirty(path)
+        self._update_manifest({key: None})
+
+    def record_lock(self, key):
+        """Lock entre processos de um registro: jogadas em salas diferentes não se esperam."""
+        os.makedirs(os.path.join(self.directory, ".locks"), exist_ok=True)
+        return file_lock(os.path.join(self.directory, ".locks", os.path.basename(self.shard_path(key))))
+
+    def compare_and_swap(self, key, expected_version, value):
+        with self.key_lock(key), self.record_lock(key):
+            current = self.get_latest(key)
+            if current is None or record_version(current) != expected_version:
+                return False, current
+            value["version"] = expected_version + 1
+            self._write_shards({key: value})  # Nunca adiada: o lock só protege a gravação feita aqui dentro
+            return True, value
+
+    def insert(self, key, value):
+        self.flush()
+        with self.key_lock(key), self.record_lock(key):
+            # O arquivo do registro decide, mesmo que o manifesto ainda não liste a chave
+            if self.read_shard(key) is not None:
+                return False
+            value["version"] = 1
+            self._write_shards({key: value})
+            return True
+
+    def replace_all(self, data):
+        data = dict(data)
+        self._pending = {}
+        for key in set(self.read_manifest()) - set(data):
+            path = self.shard_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+                self._mark_dirty(path)
+        self.entries = {}
+        self.records = ShardedRecords(self)
+        self._stamps = {}
+        os.makedirs(self.directory, exist_ok=True)
+        for key, value in data.items():
+            path = self.shard_path(key)
+            write_json(path, self.encode(value), separators=(',', ':'))
+            self._stamps[key] = file_stamp(path)
+            self._mark_dirty(path)
+            self.entries[key] = summarize(value, self.summary_fields)
+            self.records.cache[key] = value
+        with file_lock(f"{self.manifest_path}.lock"):
+            self._write_manifest(self.entries)
+
+    def version(self):
+        # O manifesto só muda com criação, remoção ou novo resumo; jogadas alteram só o
+        # arquivo da sala, por isso também entram os registros já lidos que mudaram no disco.
+        changed = tuple(
+            key for key, stamp in list(self._stamps.items()) if file_stamp(self.shard_path(key)) != stamp
+        )
+        # O manifesto como esta instância o gravou não conta como alteração (ver JsonStore.version)
+        manifest = file_stamp(self.manifest_path)
+        return "own" if manifest == self._manifest_written else manifest, changed
+
+    def _update_manifest(self, changes):
+        # Relê o manifesto sob lock para não perder entradas gravadas por outros processos
+        with file_lock(f"{self.manifest_path}.lock"):
+            entries = self.read_manifest()
+            for key, summary in changes.items():
+                if summary is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = summary
+            self._write_manifest(entries)
+        for key, summary in entries.items():
+            self.entries.setdefault(key, summary)
+
+    def _write_manifest(self, entries):
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        write_json(self.manifest_path, {"schema_version": SCHEMA_VERSION,
+                                        "entries": [[key, summary] for key, summary in entries.items()]},
+                   separators=(',', ':'))
+        self._manifest_written = file_stamp(self.manifest_path)
+        self._mark_dirty(self.manifest_path)
+
+    def _mark_dirty(self, path):
+        if self.sync:
+            self.sync.mark_dirty(path)
+
+
+class BucketStore(Store):
+    """
+    Coleção dividida por hash da chave em ``buckets`` arquivos JSON
+    (``pages/js/users.buckets/3f0.json``), sem manifesto.
+
+    Buscar, gravar ou remover um registro lê e reescreve só o balde da
+    chave, que tem cerca de 1/``buckets`` da coleção; um lote de gravações
+    reescreve cada balde afetado uma vez. Os baldes lidos ficam num LRU de
+    até ``cache_buckets`` baldes e cada leitura confere a assinatura do
+    arquivo, de modo que gravações de outros processos aparecem na hora.
+    Não há lista de chaves: ``load_all`` lê todos os baldes.
+    """
+
+    def __init__(self, file_path, buckets=4096, cache_buckets=256, sync=None, codec=None):
+        """
+        Inicializa a coleção em baldes.
+        :param file_path: Caminho do arquivo JSON da coleção (ex: pages/js/users.json);
+            os baldes ficam no diretório ``<nome>.buckets`` ao lado dele.
+        :param buckets: Número de baldes (fixo depois de criados).
+        :param cache_buckets: Baldes mantidos em memória.
+        :param sync: GitHubSync opcional, avisado a cada gravação.
+        :param codec: Codec do schema v2 dos registros.
+        """
+        base = os.path.splitext(file_path)[0]
+        self.directory = f"{base}.buckets"
+        self.collection = os.path.basename(base)
+        self.buckets = buckets
+        self.cache_buckets = cache_buckets
+        self.sync = sync
+        self.codec = codec
+        self._cache = OrderedDict()  # balde -> (assinatura do arquivo, registros)
+        self._lock = threading.RLock()
+
+    def exists(self):
+        """Indica se os baldes já foram criados."""
+        return os.path.isdir(self.directory)
+
+    def bucket_of(self, key):
+        """Balde de uma chave (hash estável entre processos)."""
+        return zlib.crc32(str(key).encode("utf-8")) % self.buckets
+
+    def bucket_path(self, bucket):
+        return os.path.join(self.directory, f"{bucket:03x}.json")
+
+    def bucket_lock(self, bucket):
+        """Lock entre processos da regravação de um balde."""
+        return file_lock(os.path.join(self.directory, ".locks", f"{bucket:03x}.lock"))
+
+    def read_bucket(self, bucket):
+        """Registros de um balde (do LRU se o arquivo não mudou desde a leitura)."""
+        path = self.bucket_path(bucket)
+        stamp = file_stamp(path)
+        with self._lock:
+            cached = self._cache.get(bucket)
+            if cached is not None and cached[0] == stamp:
+                self._cache.move_to_end(bucket)
+                return cached[1]
+        records = {key: self.decode(record) for key, record in (read_json(path) or {}).items()}
+        self._remember(bucket, stamp, records)
+        return records
+
+    def load_all(self):
+        """Lê todos os baldes (evite em caminhos quentes)."""
+        records = {}
+        for bucket in range(self.buckets):
+            records.update(self.read_bucket(bucket))
+        return records
+
+    def reload(self):
+        with self._lock:
+            self._cache.clear()
+        return self.load_all()
+
+    def get(self, key):
+        return self.read_bucket(self.bucket_of(key)).get(key)
+
+    def get_many(self, keys):
+        # Cada balde é lido uma vez, qualquer que seja o número de chaves nele
+        grouped = {}
+        for key in keys:
+            grouped.setdefault(self.bucket_of(key), []).append(key)
+        records = {}
+        for bucket, bucket_keys in grouped.items():
+            bucket_records = self.read_bucket(bucket)
+            records.update((key, bucket_records[key]) for key in bucket_keys if key in bucket_records)
+        return records
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def put_many(self, items):
+        changes = {}
+        for key, value in items:
+            changes.setdefault(self.bucket_of(key), {})[key] = value
+        for bucket, records in changes.items():
+            self._update_bucket(bucket, records)
+
+    def delete(self, key):
+        self._update_bucket(self.bucket_of(key), {key: None})
+
+    def replace_all(self, data):
+        grouped = {}
+        for key, value in dict(data).items():
+            grouped.setdefault(self.bucket_of(key), {})[key] = value
+        os.makedirs(os.path.join(self.directory, ".locks"), exist_ok=True)
+        for bucket in range(self.buckets):
+            if bucket in grouped or os.path.exists(self.bucket_path(bucket)):
+                with self.bucket_lock(bucket):
+                    self._write_bucket(bucket, grouped.get(bucket, {}))
+
+    def version(self):
+        # Baldes em memória que mudaram no disco (as leituras já os revalidam; serve ao Stamped)
+        with self._lock:
+            cached = list(self._cache.items())
+        return tuple(bucket for bucket, (stamp, _) in cached if file_stamp(self.bucket_path(bucket)) != stamp)
+
+    def _update_bucket(self, bucket, changes):
+        # Relê o balde sob lock para não perder registros gravados por outros processos
+        os.makedirs(os.path.join(self.directory, ".locks"), exist_ok=True)
+        with self.bucket_lock(bucket):
+            records = dict(self.read_bucket(bucket))
+            for key, value in changes.items():
+                if value is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = value
+            self._write_bucket(bucket, records)
+
+    def _write_bucket(self, bucket, records):
+        path = self.bucket_path(bucket)
+        write_json(path, {key: self.encode(record) for key, record in records.items()}, separators=(',', ':'))
+        self._remember(bucket, file_stamp(path), records)
+        if self.sync:
+            self.sync.mark_dirty(path)
+
+    def _remember(self, bucket, stamp, records):
+        with self._lock:
+            self._cache[bucket] = (stamp, records)
+            self._cache.move_to_end(bucket)
+            while len(self._cache) > self.cache_buckets:
+                self._cache.popitem(last=False)
+
+
+def open_store(name, file_path, storage='json', db_path=DEFAULT_DB, sync=None, **kwargs):
+    """
+    Cria a coleção de um gerenciador no modo de armazenamento escolhido.
+    :param name: Nome da coleção ("games", "rooms", "users" ou "ranking").
+    :param file_path: Caminho do arquivo JSON da coleção.
+    :param storage: "json", "journal", "sqlite", "sharded" ou "buckets" (indicado só para usuários:
+        não guarda lista de chaves nem resumos).
+    :param db_path: Caminho do banco SQLite (modo "sqlite").
+    :param sync: GitHubSync opcional (modos "json", "sharded" e "buckets").
+    :return: Instância de Store.
+    """
+    layout = LAYOUTS[name]
+    if storage == 'json':
+        return JsonStore(file_path, sync=sync, **layout)
+    if storage == 'journal':
+        return JournalStore(file_path, **layout, **kwargs)
+    if storage == 'sqlite':
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        store = SqliteStore(db_path, name, codec=layout.get("codec"), **kwargs)
+        if store.is_empty() and not store.version():
+            # Primeira execução no modo SQLite: importa o arquivo JSON atual (uma tabela esvaziada
+            # depois, ex: com todas as partidas arquivadas, já tem versão e não é reimportada)
+            store.put_many(JsonStore(file_path, **layout).read().items())
+        return store
+    if storage == 'sharded':
+        store = ShardedStore(file_path, SUMMARY_FIELDS.get(name, ()), sync=sync, codec=layout.get("codec"))
+        if not store.exists():
+            # Primeira execução no modo fragmentado: divide o arquivo JSON atual
+            store.replace_all(JsonStore(file_path, **layout).read())
+        else:
+            store.refresh_summaries()
+        return store
+    if storage == 'buckets':
+        store = BucketStore(file_path, sync=sync, codec=layout.get("codec"), **kwargs)
+        if not store.exists():
+            # Primeira execução em baldes: distribui o arquivo JSON atual
+            store.replace_all(JsonStore(file_path, **layout).read())
+        return store
+    raise ValueError(f"Modo de armazenamento desconhecido: {storage}")
+
+
+def migrate_json_to_sqlite(name, file_path, db_path=DEFAULT_DB):
+    """
+    Importa um arquivo JSON existente (ex: pages/js/games.json) para o SQLite.
+    :return: Número de registros importados.
+    """
+    data = JsonStore(file_path, **LAYOUTS[name]).read()
+    store = SqliteStore(db_path, name, codec=LAYOUTS[name].get("codec"))
+    store.put_many(data.items())
+    store.close()
+    return len(data)
+
+
+def shard_json(name, file_path, sync=None):
+    """
+    Divide um arquivo JSON monolítico (ex: pages/js/rooms.json) em um arquivo por registro.
+    :return: Número de registros gravados.
+    """
+    data = JsonStore(file_path, **LAYOUTS[name]).read()
+    layout = LAYOUTS[name]
+    ShardedStore(file_path, SUMMARY_FIELDS.get(name, ()), sync=sync, codec=layout.get("codec")).replace_all(data)
+    return len(data)
+
+
+def unshard_json(name, file_path, sync=None):
+    """
+    Junta os arquivos por registro de volta no arquivo JSON monolítico.
+    :return: Número de registros gravados.
+    """
+    data = dict(ShardedStore(file_path, codec=LAYOUTS[name].get("codec")).load_all())
+    JsonStore(file_path, sync=sync, **LAYOUTS[name]).replace_all(data)
+    return len(data)
+
+
+def migrate_schema(name, file_path, storage='json', db_path=DEFAULT_DB):
+    """
+    Regrava uma coleção no schema v2 compacto (os registros antigos são lidos de forma transparente).
+    :return: Número de registros regravados.
+    """
+    store = open_store(name, file_path, storage, db_path)
+    data = dict(store.load_all())
+    store.replace_all(data)
+    store.close()
+    return len(data)
@@ -0,0 +1,90 @@
+"""
+Limpeza periódica dos gerenciadores numa thread de fundo.
+
+A cada ``interval`` segundos chama as tarefas registradas (ex:
+``RoomManager.sweep`` e ``GameManager.sweep``), fora do caminho das
+requisições: libera lugares de usuários inativos, tira salas frias da
+memória e guarda partidas abandonadas no arquivo morto.
+
+Uso:
+    sweeper.start([room_manager.sweep, game_manager.sweep], interval=60)
+"""
+import threading
+import time
+
+from managers.storage import batch
+
+_sweeper = None
+_lock = threading.Lock()
+
+
+class Sweeper:
+    """Executa tarefas de limpeza periodicamente numa thread daemon."""
+
+    def __init__(self, tasks, interval=60.0):
+        """
+        Inicializa a limpeza periódica.
+        :param tasks: Funções sem argumentos chamadas a cada rodada; o retorno entra nas estatísticas.
+        :param interval: Intervalo (em segundos) entre as rodadas.
+        """
+        self.tasks = list(tasks)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"runs": 0, "failures": 0, "last_run": None, "last_seconds": 0.0, "last_results": []}
+
+    def start(self):
+        """Inicia a thread de limpeza (uma vez)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Encerra a thread de limpeza."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """
+        Executa todas as tarefas uma vez; a falha de uma não impede as demais.
+        :return: Lista com o retorno de cada tarefa (None nas que falharam).
+        """
+        start = time.perf_counter()
+        results = []
+        for task in self.tasks:
+            try:
+                with batch():  # Ex: vários lugares liberados na mesma sala geram uma gravação
+                    results.append(task())
+            except Exception as e:
+                self.stats["failures"] += 1
+                results.append(None)
+                print(f"Erro na limpeza periódica ({getattr(task, '__qualname__', task)}): {e}")
+        self.stats["runs"] += 1
+        self.stats["last_run"] = time.time()
+        self.stats["last_seconds"] = time.perf_counter() - start
+        self.stats["last_results"] = results
+        return results
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+
+def start(tasks, interval=60.0):
+    """
+    Inicia a limpeza periódica do processo (só a primeira chamada cria a thread).
+    :return: Sweeper em execução.
+    """
+    global _sweeper
+    with _lock:
+        if _sweeper is None:
+            _sweeper = Sweeper(tasks, interval).start()
+        return _sweeper
+
+
+def current():
+    """Sweeper do processo (ou None se a limpeza não foi iniciada)."""
+    return _sweeper
@@ -1,24 +1,48 @@
-import json
+import base64
 import hashlib  # Para hash da senha
+import hmac
+import os
+import time
+from managers.registry import Stamped
+from managers.storage import DEFAULT_DB, open_store
 
-class UserManager:
-    def __init__(self, file_path='pages/js/users.json'):
+# Validade (em segundos) do token de sessão
+SESSION_TTL = 12 * 60 * 60
+
+class UserManager(Stamped):
+    def __init__(self, file_path='pages/js/users.json', sync=None, storage='json', db_path=DEFAULT_DB, store=None,
+                 secret=None):
+        """
+        Inicializa o gerenciador de usuários.
+        :param storage: Modo de armazenamento; "buckets" busca cada usuário sem ler os demais.
+        :param secret: Chave dos tokens de sessão (padrão: aleatória, válida só neste processo).
+        """
         self.file_path = file_path
-        self.users = self.load_users()
+        self.sync = sync  # GitHubSync opcional
+        self.store = store or open_store("users", file_path, storage, db_path, sync=sync)
+        if isinstance(secret, str):
+            secret = secret.encode()
+        self.secret = secret or os.urandom(32)
+        self.touch_stamp()
+
+    @property
+    def users(self):
+        """Todos os usuários (no SQLite e nos baldes, lidos sob demanda; evite em caminhos quentes)."""
+        return self.store.load_all()
+
+    def reload(self):
+        """Relê os usuários do armazenamento."""
+        self.store.reload()
+        self.touch_stamp()
 
     def load_users(self):
-        """Carrega os usuários do arquivo JSON."""
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as file:
-                data = json.load(file)
-                return data.get("users", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
+        """Carrega os usuários do armazenamento."""
+        return self.store.load_all()
 
     def save_users(self):
-        """Salva os usuários no arquivo JSON."""
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump({"users": self.users}, file, indent=4, ensure_ascii=False)
+        """Grava todos os usuários de uma vez."""
+        self.store.replace_all(self.users)
+        self.touch_stamp()
 
     def hash_password(self, password):
         """Gera um hash SHA256 para a senha."""
@@ -26,21 +50,70 @@ class UserManager:
 
     def register_user(self, username, name, password, email):
         """Registra um novo usuário."""
-        if username in self.users:
+        if self.store.get(username) is not None:
             return "Usuário já cadastrado."
-        
+
         hashed_password = self.hash_password(password)
-        self.users[username] = {
+        self.store.put(username, {
             "name": name,
             "password": hashed_password,
             "email": email
-        }
-        self.save_users()
+        })
+        self.touch_stamp()
         return "Cadastro realizado com sucesso!"
 
+    def register_users(self, users):
+        """
+        Registra vários usuários numa única gravação (nos baldes, uma por balde afetado).
+        :param users: Iterável de tuplas (username, name, password, email).
+        :return: Lista dos usuários cadastrados (os já existentes e os repetidos no lote ficam de fora).
+        """
+        batch = {}
+        for username, name, password, email in users:
+            batch.setdefault(username, (name, password, email))
+        existing = self.store.get_many(batch)
+        records = {
+            username: {"name": name, "password": self.hash_password(password), "email": email}
+            for username, (name, password, email) in batch.items() if username not in existing
+        }
+        if records:
+            self.store.put_many(records.items())
+            self.touch_stamp()
+        return list(records)
+
     def authenticate_user(self, username, password):
         """Valida o login do usuário."""
-        user = self.users.get(username)
+        user = self.store.get(username)
         if user and user["password"] == self.hash_password(password):
             return True
         return False
+
+    def issue_token(self, username, ttl=SESSION_TTL, now=None):
+        """
+        Gera um token de sessão assinado (HMAC-SHA256) para um usuário já autenticado.
+        :param ttl: Validade em segundos.
+        :return: Token no formato ``usuário.expiração.assinatura``.
+        """
+        expires = int((time.time() if now is None else now) + ttl)
+        payload = f"{base64.urlsafe_b64encode(username.encode()).decode()}.{expires}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify_token(self, token, now=None):
+        """
+        Confere um token de sessão sem consultar o armazenamento.
+        :return: Nome do usuário ou None se o token for inválido ou estiver vencido.
+        """
+        payload, _, signature = (token or "").rpartition(".")
+        # Compara bytes: compare_digest recusa (TypeError) str com caracteres fora do ASCII
+        if not payload or not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            return None
+        encoded, _, expires = payload.partition(".")
+        try:
+            if int(expires) < (time.time() if now is None else now):
+                return None
+            return base64.urlsafe_b64decode(encoded.encode()).decode()
+        except ValueError:  # Payload assinado mas malformado (inclui base64 e UTF-8 inválidos)
+            return None
+
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,362 @@
+"""
+Servidor HTTP + WebSocket do Jogo da Velha, sem navegador e sem Streamlit.
+
+Usa os mesmos gerenciadores do ``app.py`` (e os mesmos arquivos), então robôs,
+testes de carga e outros clientes jogam nas mesmas salas da interface. As
+chamadas aos gerenciadores (que leem e gravam arquivos) rodam numa única
+thread à parte, uma de cada vez: o laço do asyncio fica livre para atender
+muitas conexões num só processo. Antes de cada chamada, os gerenciadores
+alterados por outro processo (ex: a interface do Streamlit) são relidos, como
+em ``shared_manager``. Cada jogada gravada é enviada na hora a
+todos os inscritos no WebSocket da sala; jogadas feitas em outro processo
+(ex: pela interface do Streamlit) chegam na consulta seguinte às salas com
+inscritos, a cada ``WATCH_INTERVAL`` segundos.
+
+Rotas (JSON; as marcadas com * exigem ``Authorization: Bearer <token>``):
+    POST /login                    {"username", "password"} -> {"token", "username"}
+    GET  /rooms                    ?page=0&page_size=20 (1 a 100)&view=all|open|new|in_progress|finished
+    POST /rooms *                  {"name", "size", "k"} -> sala criada
+    GET  /rooms/{room_id}          Estado da sala
+    POST /rooms/{room_id}/join *   Ocupa um assento livre ou entra como visualizador
+    POST /rooms/{room_id}/leave *  Sai da sala
+    POST /rooms/{room_id}/moves *  {"index", "version"} -> estado após a jogada (409 em conflito)
+    GET  /rooms/{room_id}/ws       WebSocket: estado atual e cada jogada gravada na sala
+    GET  /ranking                  ?top=10 (1 a 100)
+
+Uso (a partir da raiz do repositório):
+    python server.py
+    python server.py --port 8080 --storage sqlite
+    SESSION_SECRET=... python server.py   # Mesma chave do app.py: os tokens valem nos dois
+
+Teste local sem abrir porta: ``aiohttp.test_utils.TestClient(TestServer(create_app(...)))``.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import WSMsgType, web
+
+from managers.ranking_manager import RankingManager
+from managers.room_manager import LOBBY_PAGE_SIZE, RoomManager
+from managers.storage import DEFAULT_DB, batch, record_version
+from managers.user_manager import UserManager
+
+USERS_FILE = 'pages/js/users.json'
+ROOMS_FILE = 'pages/js/rooms.json'
+RANKING_FILE = 'pages/js/ranking.json'
+
+# Intervalo (em segundos) da consulta às salas com inscritos, para repassar jogadas feitas fora do servidor
+WATCH_INTERVAL = 1.0
+
+
+def room_state(room):
+    """Estado público da sala em JSON (sem histórico de jogadas nem log de acessos)."""
+    return {
+        "room_id": room["room_id"],
+        "name": room["name"],
+        "players": list(room["players"]),
+        "viewers": list(room["viewers"]),
+        "board": list(room["board"]),
+        "size": room["size"],
+        "k": room["k"],
+        "current_player": room["current_player"],
+        "winner": room["winner"],
+        "version": record_version(room),
+    }
+
+
+class GameServer:
+    """Rotas do servidor e inscrições dos WebSockets por sala."""
+
+    def __init__(self, user_manager, room_manager, ranking_manager, watch_interval=WATCH_INTERVAL):
+        """
+        Inicializa o servidor.
+        :param user_manager: UserManager usado no login.
+        :param room_manager: RoomManager das salas e jogadas.
+        :param ranking_manager: RankingManager que pontua as partidas encerradas.
+        :param watch_interval: Intervalo da consulta às salas com inscritos (None: não consulta).
+        """
+        self.user_manager = user_manager
+        self.room_manager = room_manager
+        self.ranking_manager = ranking_manager
+        self.watch_interval = watch_interval
+        # Uma thread só: os gerenciadores não são chamados em paralelo
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="managers")
+        self._subscribers = {}  # room_id -> WebSockets inscritos
+        self._versions = {}  # room_id -> versão enviada por último aos inscritos
+
+    async def call(self, function, *args):
+        """
+        Executa uma chamada aos gerenciadores fora do laço de eventos, com as gravações agrupadas.
+        Salas e ranking alterados por outro processo são relidos antes (ver ``refresh``).
+        """
+        def run():
+            self.refresh(self.room_manager, self.ranking_manager)
+            with batch():
+                return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    @staticmethod
+    def refresh(*managers):
+        """Relê os gerenciadores cujos dados outra instância ou processo alterou (como ``shared_manager``)."""
+        for manager in managers:
+            if manager.is_stale():
+                manager.reload()
+
+    def authenticate(self, username, password):
+        """Login com os usuários relidos se outro processo (ex: um cadastro pela interface) os alterou."""
+        self.refresh(self.user_manager)
+        return self.user_manager.authenticate_user(username, password)
+
+    def username(self, request):
+        """Usuário do token assinado no cabeçalho Authorization (HTTP 401 se faltar ou for inválido)."""
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        username = self.user_manager.verify_token(token) if scheme.lower() == "bearer" else None
+        if username is None:
+            raise web.HTTPUnauthorized(text='{"error": "Faça login para continuar."}',
+                                       content_type="application/json")
+        return username
+
+    @staticmethod
+    async def body(request):
+        """Corpo JSON da requisição (HTTP 400 se não for um objeto JSON)."""
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            raise web.HTTPBadRequest(text='{"error": "Corpo JSON inválido."}', content_type="application/json")
+        return body
+
+    async def room_or_404(self, request):
+        room_id = int(request.match_info["room_id"])
+        room = await self.call(self.room_manager.get_room, room_id)
+        if room is None:
+            raise web.HTTPNotFound(text='{"error": "Sala não encontrada."}', content_type="application/json")
+        return room_id, room
+
+    async def login(self, request):
+        body = await self.body(request)
+        username, password = body.get("username", ""), body.get("password", "")
+        if not await self.call(self.authenticate, username, password):
+            return web.json_response({"error": "Usuário ou senha inválidos."}, status=401)
+        token = self.user_manager.issue_token(username)
+        return web.json_response({"token": token, "username": username})
+
+    async def list_rooms(self, request):
+        try:
+            page = max(int(request.query.get("page", 0)), 0)
+            page_size = min(max(int(request.query.get("page_size", LOBBY_PAGE_SIZE)), 1), 100)
+        except ValueError:
+            return web.json_response({"error": "Os parâmetros page e page_size devem ser números inteiros."},
+                                     status=400)
+        try:
+            rooms, total = await self.call(self.room_manager.lobby_page, page, page_size,
+                                           request.query.get("view", "all"))
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response({"rooms": rooms, "total": total, "page": page, "page_size": page_size})
+
+    async def create_room(self, request):
+        self.username(request)
+        body = await self.body(request)
+        if not body.get("name"):
+            return web.json_response({"error": "Informe o nome da sala."}, status=400)
+        try:
+            size, k = int(body.get("size", 3)), int(body.get("k", 3))
+        except (TypeError, ValueError):
+            return web.json_response({"error": "size e k devem ser números inteiros."}, status=400)
+        try:
+            room = await self.call(self.room_manager.create_room, body["name"], size, k)
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        return web.json_response(room_state(room), status=201)
+
+    async def get_room(self, request):
+        _, room = await self.room_or_404(request)
+        return web.json_response(room_state(room))
+
+    async def join_room(self, request):
+        username = self.username(request)
+        room_id, _ = await self.room_or_404(request)
+        await self.call(self.room_manager.join_room, room_id, username)
+        return await self.changed(room_id)
+
+    async def leave_room(self, request):
+        username = self.username(request)
+        room_id, _ = await self.room_or_404(request)
+        await self.call(self.room_manager.leave_room, room_id, username)
+        return await self.changed(room_id)
+
+    async def move(self, request):
+        username = self.username(request)
+        room_id, room = await self.room_or_404(request)
+        body = await self.body(request)
+        try:
+            index = int(body["index"])
+            version = int(body.get("version", record_version(room)))
+        except (KeyError, TypeError, ValueError):
+            return web.json_response({"error": "Informe a casa da jogada (index)."}, status=400)
+        result = await self.call(self.play, room_id, index, username, version)
+        if not result.ok:
+            status = 409 if result.conflict else 400
+            state = room_state(result.state) if result.state is not None else None
+            return web.json_response({"error": result.error, "state": state}, status=status)
+        return await self.changed(room_id)
+
+    def play(self, room_id, index, username, version):
+        """
+        Jogada do usuário e, se for a vez dele, a resposta do robô.
+        Partidas encerradas pontuam no ranking, menos as contra o robô (ver ranking_manager.game_results).
+        """
+        result = self.room_manager.apply_move(room_id, index, username, version)
+        if result.ok and result.state["winner"]:
+            self.ranking_manager.record_result(result.state)
+        elif result.ok:
+            self.room_manager.play_bot_move(room_id)
+        return result
+
+    async def changed(self, room_id):
+        """Envia o estado atual da sala aos inscritos e o devolve como resposta."""
+        room = await self.call(self.room_manager.get_room, room_id)
+        state = room_state(room)
+        await self.broadcast(room_id, state)
+        return web.json_response(state)
+
+    async def broadcast(self, room_id, state):
+        self._versions[room_id] = state["version"]
+        sockets = list(self._subscribers.get(room_id, ()))
+        results = await asyncio.gather(*(ws.send_json(state) for ws in sockets), return_exceptions=True)
+        for ws, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self._unsubscribe(room_id, ws)
+
+    async def room_socket(self, request):
+        room_id, room = await self.room_or_404(request)
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self._subscribers.setdefault(room_id, set()).add(ws)
+        self._versions.setdefault(room_id, record_version(room))
+        try:
+            await ws.send_json(room_state(room))
+            async for message in ws:  # O cliente só escuta; mensagens recebidas são ignoradas
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            self._unsubscribe(room_id, ws)
+        return ws
+
+    def _unsubscribe(self, room_id, ws):
+        sockets = self._subscribers.get(room_id)
+        if sockets is not None:
+            sockets.discard(ws)
+            if not sockets:
+                del self._subscribers[room_id]
+                self._versions.pop(room_id, None)
+
+    async def watch_rooms(self, app):
+        """Contexto da aplicação: consulta periodicamente as salas com inscritos enquanto o servidor roda."""
+        task = asyncio.create_task(self._watch()) if self.watch_interval else None
+        yield
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            for room_id in list(self._subscribers):
+                try:
+                    latest = await self.call(self.room_manager.store.get_latest, room_id)
+                except Exception as e:
+                    print(f"Erro ao consultar a sala {room_id}: {e}")
+                    continue
+                if latest is not None and record_version(latest) != self._versions.get(room_id):
+                    await self.broadcast(room_id, room_state(latest))
+
+    async def ranking(self, request):
+        try:
+            top = min(max(int(request.query.get("top", 10)), 1), 100)
+        except ValueError:
+            return web.json_response({"error": "O parâmetro top deve ser um número inteiro."}, status=400)
+        rows = await self.call(self.ranking_manager.top, top)
+        return web.json_response([
+            dict(stats, position=position, username=username) for position, (username, stats) in enumerate(rows, 1)
+        ])
+
+    async def close(self, app):
+        """Fecha os WebSockets abertos e a thread dos gerenciadores ao encerrar o servidor."""
+        for sockets in list(self._subscribers.values()):
+            for ws in list(sockets):
+                await ws.close()
+        self._executor.shutdown(wait=True)
+
+
+# GameServer da aplicação aiohttp (ex: ``app[GAME_SERVER].room_manager`` nos testes)
+GAME_SERVER = web.AppKey("game_server", GameServer)
+
+
+def create_app(user_manager=None, room_manager=None, ranking_manager=None, storage='json', db_path=DEFAULT_DB,
+               watch_interval=WATCH_INTERVAL, secret=None, user_storage=None):
+    """
+    Monta a aplicação aiohttp.
+    :param user_manager: UserManager (padrão: pages/js/users.json no modo ``user_storage``).
+    :param room_manager: RoomManager (padrão: pages/js/rooms.json).
+    :param ranking_manager: RankingManager (padrão: pages/js/ranking.json).
+    :param storage: Modo de armazenamento dos gerenciadores criados aqui ("json", "sqlite" ou "sharded";
+        o "journal" é de um único processo e não é aceito).
+    :param db_path: Banco SQLite (modo "sqlite").
+    :param watch_interval: Intervalo da consulta às salas com inscritos (None: só jogadas feitas pelo servidor).
+    :param secret: Chave dos tokens de sessão do UserManager criado aqui (a mesma do app.py aceita os tokens dele).
+    :param user_storage: Modo de armazenamento dos usuários (padrão: ``storage``; "buckets" é opcional e
+        deve ser o mesmo USER_STORAGE do app.py).
+    :return: aiohttp.web.Application.
+    """
+    user_storage = user_storage or storage
+    if "journal" in (storage, user_storage):
+        raise ValueError("O modo \"journal\" é de um único processo; use \"json\", \"sqlite\" ou \"sharded\".")
+    server = GameServer(
+        user_manager or UserManager(USERS_FILE, storage=user_storage, db_path=db_path, secret=secret),
+        room_manager or RoomManager(ROOMS_FILE, storage=storage, db_path=db_path),
+        ranking_manager or RankingManager(RANKING_FILE, storage=storage, db_path=db_path),
+        watch_interval,
+    )
+    app = web.Application()
+    app[GAME_SERVER] = server
+    app.add_routes([
+        web.post("/login", server.login),
+        web.get("/rooms", server.list_rooms),
+        web.post("/rooms", server.create_room),
+        web.get("/rooms/{room_id:\\d+}", server.get_room),
+        web.post("/rooms/{room_id:\\d+}/join", server.join_room),
+        web.post("/rooms/{room_id:\\d+}/leave", server.leave_room),
+        web.post("/rooms/{room_id:\\d+}/moves", server.move),
+        web.get("/rooms/{room_id:\\d+}/ws", server.room_socket),
+        web.get("/ranking", server.ranking),
+    ])
+    app.cleanup_ctx.append(server.watch_rooms)
+    app.on_shutdown.append(server.close)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP + WebSocket do jogo.")
+    parser.add_argument("--host", default="0.0.0.0", help="Endereço de escuta.")
+    parser.add_argument("--port", type=int, default=8080, help="Porta de escuta.")
+    # Sem "journal": o diário é de um único processo e o servidor roda ao lado da interface
+    parser.add_argument("--storage", default="json", choices=["json", "sqlite", "sharded"],
+                        help="Modo de armazenamento (o mesmo do app.py).")
+    parser.add_argument("--user-storage", choices=["json", "sqlite", "sharded", "buckets"],
+                        help="Modo dos usuários (padrão: o de --storage; o mesmo USER_STORAGE do app.py).")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Banco SQLite.")
+    args = parser.parse_args()
+    app = create_app(storage=args.storage, db_path=args.db, secret=os.environ.get("SESSION_SECRET"),
+                     user_storage=args.user_storage)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
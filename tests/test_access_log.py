@@ -0,0 +1,28 @@
+from managers.access_log import AccessLog
+
+
+def test_exit_closes_session_opened_by_other_instance(tmp_path):
+    path = str(tmp_path / "access_log.json")
+    a, b = AccessLog(path), AccessLog(path)
+    a.enter(1, "alice", "Jogador")
+
+    assert b.exit(1, "alice")
+    assert not b.exit(1, "alice")
+    sessions = list(AccessLog(path).iter_sessions())
+    assert [(s["username"], s["exit_time"] is not None) for s in sessions] == [("alice", True)]
+
+
+def test_rotation_carries_sessions_of_every_instance(tmp_path):
+    path = str(tmp_path / "access_log.json")
+    a, b = AccessLog(path, max_bytes=200), AccessLog(path, max_bytes=200)
+    a.enter(1, "alice", "Jogador")
+    for n in range(10):  # b rotaciona o segmento várias vezes
+        b.enter(2, f"viewer{n}", "Visualizador")
+        b.exit(2, f"viewer{n}")
+    a.enter(1, "bob", "Jogador")
+
+    assert len(a.segments()) > 2
+    assert {s["username"] for s in AccessLog(path).open_sessions()} == {"alice", "bob"}
+    assert a.exit(1, "alice")
+    sessions = {s["username"]: s["exit_time"] for s in AccessLog(path).iter_sessions(room_id=1)}
+    assert sessions["alice"] is not None and sessions["bob"] is None
@@ -0,0 +1,35 @@
+import os
+
+from managers.archive import GameArchive
+
+
+def game(winner, moves=b"\x00\x04\x08"):
+    return {"players": ["ana", "bia"], "winner": winner, "size": 3, "k": 3, "moves": moves}
+
+
+def test_get_unknown_id_reads_no_segment(tmp_path, monkeypatch):
+    archive = GameArchive(str(tmp_path))
+    archive.append(1, game("X"))
+    archive.append(2, game("O"))
+    reader = GameArchive(str(tmp_path))
+    assert reader.get(2)["winner"] == "O"
+
+    opened = []
+    monkeypatch.setattr(GameArchive, "_iter_segment", staticmethod(lambda path: opened.append(path) or iter(())))
+    assert reader.get(99) is None
+    assert opened == []
+
+
+def test_missing_index_is_rebuilt_once_with_latest_record(tmp_path):
+    archive = GameArchive(str(tmp_path))
+    archive.append(1, game(None), idle=True)
+    archive.close()
+    archive.append(1, game("X"))  # Encerrada depois, em outro segmento
+    archive.close()
+    os.remove(archive.index_path)
+
+    reader = GameArchive(str(tmp_path))
+    assert reader.get(1)["winner"] == "X"
+    assert os.path.exists(archive.index_path)
+    assert GameArchive(str(tmp_path)).get(1)["winner"] == "X"
+    assert reader.get(99) is None
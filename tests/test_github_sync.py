@@ -0,0 +1,61 @@
+import pytest
+
+from managers.github_fake import FakeRepository
+from managers.github_sync import GitHubSync
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Diretório de trabalho temporário: o GitHubSync lê os caminhos relativos a ele."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def sync_files(sync, *paths):
+    for path in paths:
+        sync.mark_dirty(path)
+    assert sync.flush(timeout=10)
+    sync.stop()
+
+
+def test_deleting_unknown_path_does_not_break_the_commit(workdir):
+    repo = FakeRepository({"antigo.json": "{}"})
+    (workdir / "rooms.json").write_text('{"1": {}}', encoding='utf-8')
+    sync = GitHubSync(repo=repo, interval=0)
+
+    # nunca.json não existe nem no disco nem no repositório; antigo.json só no repositório
+    sync_files(sync, "rooms.json", "nunca.json", "antigo.json")
+
+    assert repo.files() == {"rooms.json": '{"1": {}}'}
+    assert (sync.stats["commits"], sync.stats["failures"]) == (1, 0)
+
+
+def test_only_unknown_deletions_skip_the_commit(workdir):
+    repo = FakeRepository()
+    sync = GitHubSync(repo=repo, interval=0)
+
+    sync_files(sync, "nunca.json")
+
+    assert len(repo.commits) == 1
+    assert (sync.stats["commits"], sync.stats["failures"]) == (0, 0)
+
+
+def test_failed_commit_is_retried(workdir):
+    repo = FakeRepository()
+    create_git_commit = repo.create_git_commit
+    calls = []
+
+    def flaky(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise ConnectionError("rede indisponível")
+        return create_git_commit(*args)
+
+    repo.create_git_commit = flaky
+    (workdir / "ranking.json").write_text('{"ana": {}}', encoding='utf-8')
+    sync = GitHubSync(repo=repo, interval=0)
+
+    sync_files(sync, "ranking.json")
+
+    assert repo.files() == {"ranking.json": '{"ana": {}}'}
+    assert (len(calls), sync.stats["commits"], sync.stats["failures"]) == (2, 1, 1)
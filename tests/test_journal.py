@@ -0,0 +1,44 @@
+import pytest
+
+from managers.journal import Journal, JournalLockedError
+
+
+def test_second_instance_cannot_open_an_owned_journal(tmp_path):
+    base = str(tmp_path / "rooms.json")
+    owner = Journal(base)
+    owner.set(1, {"players": ["alice"]})
+    with pytest.raises(JournalLockedError):
+        Journal(base)
+
+    owner.close()
+    assert Journal(base).load() == {1: {"players": ["alice"]}}
+
+
+def test_compaction_does_not_overwrite_newer_snapshot(tmp_path, monkeypatch):
+    journal = Journal(str(tmp_path / "rooms.json"), compact_threshold=10 ** 9)
+    journal.set(1, "antigo")
+    replay = Journal._replay
+
+    def slow_replay(path, state, seq):
+        if path == journal.old_path:
+            # write_snapshot chega enquanto a compactação lê o diário antigo
+            journal._snapshot_seq = journal.seq
+            journal._dump_snapshot({2: "novo"}, journal.seq)
+        return replay(path, state, seq)
+
+    monkeypatch.setattr(Journal, "_replay", staticmethod(slow_replay))
+    journal.compact(wait=True)
+    monkeypatch.undo()
+    journal.close()
+    assert Journal(str(tmp_path / "rooms.json")).load() == {2: "novo"}
+
+
+def test_write_snapshot_waits_for_compaction(tmp_path):
+    journal = Journal(str(tmp_path / "rooms.json"), compact_threshold=10 ** 9)
+    for key in range(100):
+        journal.set(key, "x" * 100)
+    journal.compact()
+    journal.write_snapshot({"migrado": True})
+    journal.set("depois", 1)
+    journal.close()
+    assert Journal(str(tmp_path / "rooms.json")).load() == {"migrado": True, "depois": 1}
@@ -0,0 +1,38 @@
+import pytest
+
+from managers.matchmaking import Matchmaker
+from managers.ranking_manager import RankingManager
+from managers.room_manager import RoomManager
+
+
+@pytest.fixture
+def matchmaker(tmp_path):
+    ranking = RankingManager(str(tmp_path / "ranking.json"))
+    for name, points in (("ana", 0), ("bia", 10), ("caio", 12), ("davi", 30)):
+        ranking.ranking[name] = {"points": points}
+    return Matchmaker(RoomManager(str(tmp_path / "rooms.json")), ranking)
+
+
+def test_pairs_closest_player_within_window(matchmaker):
+    for name in ("ana", "bia", "davi"):
+        assert matchmaker.enqueue(name, now=0) is None
+    room_id = matchmaker.enqueue("caio", now=1)  # bia (10) é a vizinha mais próxima de caio (12)
+
+    assert room_id is not None
+    assert matchmaker.poll("bia") == room_id
+    assert matchmaker.room_manager.get_room(room_id)["players"] == ["bia", "caio"]
+    assert len(matchmaker) == 2 and not matchmaker.is_waiting("caio")
+
+
+def test_window_widens_with_wait_and_cancel_leaves_queue(matchmaker):
+    assert matchmaker.enqueue("ana", now=0) is None
+    assert matchmaker.enqueue("bia", now=0) is None
+    assert matchmaker.cancel("bia") and not matchmaker.cancel("bia")
+    assert matchmaker.enqueue("davi", now=0) is None
+
+    assert matchmaker.match_waiting(now=10) == 0
+    assert matchmaker.match_waiting(now=60) == 1  # 3 + 0.5 * 60 >= 30 pontos de diferença
+    assert len(matchmaker) == 0
+    room_id = matchmaker.poll("ana")
+    assert room_id is not None and matchmaker.poll("davi") == room_id
+    assert matchmaker.poll("ana") is None
@@ -0,0 +1,18 @@
+import pytest
+
+from managers.ranking_manager import RankingManager
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite", "sharded"])
+def test_results_from_two_instances_add_up(tmp_path, storage):
+    def open_manager():
+        return RankingManager(str(tmp_path / "ranking.json"), storage=storage, db_path=str(tmp_path / "state.db"))
+
+    a, b = open_manager(), open_manager()
+    game = {"players": ["alice", "bob"], "winner": "X"}
+    a.record_result(game)
+    b.record_result(game)
+
+    ranking = open_manager().ranking
+    assert (ranking["alice"]["points"], ranking["alice"]["wins"]) == (6, 2)
+    assert ranking["bob"]["losses"] == 2
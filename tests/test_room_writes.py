@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from managers.room_manager import RoomManager
+from managers.storage import batch
+
+
+@pytest.fixture(params=["json", "sqlite", "sharded"])
+def open_manager(request, tmp_path):
+    """Abre um RoomManager sobre os mesmos arquivos, como outro processo do servidor."""
+    return lambda: RoomManager(str(tmp_path / "rooms.json"), storage=request.param,
+                               db_path=str(tmp_path / "state.db"))
+
+
+def test_stale_join_keeps_move_from_other_instance(open_manager):
+    a = open_manager()
+    a.create_room("Sala")
+    a.join_room(1, "alice")
+    a.join_room(1, "bob")
+    b = open_manager()
+    b.get_room(1)  # Cópia anterior à jogada
+
+    move = a.apply_move(1, 4, "alice")
+    assert move.ok
+    assert b.join_room(1, "viewer")
+
+    room = open_manager().get_room(1)
+    assert room["board"][4] == "X"
+    assert room["viewers"] == ["viewer"]
+    assert room["version"] == move.state["version"] + 1
+    assert b.get_room(1)["board"][4] == "X"
+
+
+def test_stale_batched_leave_keeps_move_from_other_instance(open_manager):
+    a = open_manager()
+    a.create_room("Sala")
+    a.join_room(1, "alice")
+    a.join_room(1, "bob")
+    a.join_room(1, "viewer")
+    b = open_manager()
+    b.get_room(1)
+
+    assert a.apply_move(1, 0, "alice").ok
+    with batch():
+        b.leave_room(1, "viewer")
+
+    room = open_manager().get_room(1)
+    assert room["board"][0] == "X"
+    assert room["viewers"] == []
+
+
+def test_rooms_created_by_two_instances_get_different_ids(open_manager):
+    a, b = open_manager(), open_manager()
+    first = a.create_room("Sala A")
+    second = b.create_room("Sala B")  # b ainda não conhece a sala de a
+
+    assert (first["room_id"], second["room_id"]) == (1, 2)
+    names = {room_id: open_manager().get_room(room_id)["name"] for room_id in (1, 2)}
+    assert names == {1: "Sala A", 2: "Sala B"}
+
+
+def test_read_only_manager_keeps_old_access_logs_in_place(tmp_path):
+    rooms_path = tmp_path / "rooms.json"
+    entry = {"username": "alice", "status": "Jogador", "access_time": "2024-01-01 10:00:00", "exit_time": None}
+    room = {"room_id": 1, "name": "Sala", "players": ["alice", "Aguardando jogador..."], "viewers": [],
+            "board": [" "] * 9, "current_player": "X", "winner": None, "access_log": [entry]}
+    rooms_path.write_text(json.dumps({"rooms": [room]}), encoding='utf-8')  # Formato antigo
+    before = rooms_path.read_bytes()
+
+    manager = RoomManager(str(rooms_path), migrate=False)
+    assert manager.get_room(1)["name"] == "Sala"
+    assert rooms_path.read_bytes() == before
+    assert not (tmp_path / "access_log.json").exists()
+
+    RoomManager(str(rooms_path))
+    assert "access_log" not in rooms_path.read_text(encoding='utf-8')
+    assert [s["username"] for s in RoomManager(str(rooms_path)).get_access_history()] == ["alice"]
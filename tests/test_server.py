@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from managers.ranking_manager import RankingManager
+from managers.room_manager import RoomManager
+from managers.user_manager import UserManager
+from server import create_app
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def app(request, tmp_path):
+    """Aplicação com gerenciadores em arquivos temporários e os usuários alice e bob cadastrados."""
+    kwargs = dict(storage=request.param, db_path=str(tmp_path / "state.db"))
+    users = UserManager(str(tmp_path / "users.json"), secret="segredo", **kwargs)
+    users.register_users([("alice", "Alice", "senha-a", ""), ("bob", "Bob", "senha-b", "")])
+    return create_app(users, RoomManager(str(tmp_path / "rooms.json"), **kwargs),
+                      RankingManager(str(tmp_path / "ranking.json"), **kwargs), watch_interval=None)
+
+
+def run(app, scenario):
+    """Executa ``scenario(client)`` contra a aplicação, sem abrir porta."""
+    async def main():
+        async with TestClient(TestServer(app)) as client:
+            await scenario(client)
+    asyncio.run(main())
+
+
+async def login(client, username, password):
+    response = await client.post("/login", json={"username": username, "password": password})
+    assert response.status == 200
+    return {"Authorization": f"Bearer {(await response.json())['token']}"}
+
+
+def test_login_and_token_checks(app):
+    async def scenario(client):
+        response = await client.post("/login", json={"username": "alice", "password": "errada"})
+        assert response.status == 401
+        assert (await client.post("/login", data="não é JSON")).status == 400
+
+        assert (await client.post("/rooms", json={"name": "Sala"})).status == 401
+        for token in ("", "a.b.c", "a.b.ÿ"):
+            headers = {"Authorization": f"Bearer {token}"}
+            assert (await client.post("/rooms", json={"name": "Sala"}, headers=headers)).status == 401
+        headers = await login(client, "alice", "senha-a")
+        assert (await client.post("/rooms", json={"name": "Sala"}, headers=headers)).status == 201
+    run(app, scenario)
+
+
+def test_create_and_list_rooms(app):
+    async def scenario(client):
+        headers = await login(client, "alice", "senha-a")
+        for body in ({"name": "Sala", "size": None}, {"name": "Sala", "k": [3]}, {"name": "Sala", "size": "x"},
+                     {"name": "Sala", "size": 99}, {"name": ""}):
+            assert (await client.post("/rooms", json=body, headers=headers)).status == 400
+        for n in range(3):
+            response = await client.post("/rooms", json={"name": f"Sala {n}", "size": 4, "k": 3}, headers=headers)
+            assert response.status == 201
+            assert (await response.json())["room_id"] == n + 1
+
+        page = await (await client.get("/rooms", params={"page_size": 2})).json()
+        assert (page["total"], page["page_size"], len(page["rooms"])) == (3, 2, 2)
+        page = await (await client.get("/rooms", params={"page_size": 0, "page": -1})).json()
+        assert (page["page"], page["page_size"], len(page["rooms"])) == (0, 1, 1)
+        assert (await (await client.get("/rooms", params={"page_size": 1000})).json())["page_size"] == 100
+        assert (await client.get("/rooms", params={"page_size": "x"})).status == 400
+        assert (await client.get("/rooms", params={"view": "nenhum"})).status == 400
+        assert (await client.get("/rooms/9")).status == 404
+    run(app, scenario)
+
+
+def test_moves_and_ranking(app):
+    async def scenario(client):
+        alice, bob = await login(client, "alice", "senha-a"), await login(client, "bob", "senha-b")
+        await client.post("/rooms", json={"name": "Sala"}, headers=alice)
+        await client.post("/rooms/1/join", headers=alice)
+        state = await (await client.post("/rooms/1/join", headers=bob)).json()
+        assert state["players"] == ["alice", "bob"]
+
+        assert (await client.post("/rooms/1/moves", json={}, headers=alice)).status == 400
+        assert (await client.post("/rooms/1/moves", json={"index": 4}, headers=bob)).status == 400
+        response = await client.post("/rooms/1/moves", json={"index": 4, "version": state["version"] - 1},
+                                     headers=alice)
+        assert response.status == 409
+        assert (await response.json())["state"]["board"][4] != "X"
+
+        for headers, index in ((alice, 0), (bob, 3), (alice, 1), (bob, 4), (alice, 2)):
+            response = await client.post("/rooms/1/moves", json={"index": index}, headers=headers)
+            assert response.status == 200
+        assert (await response.json())["winner"] == "X"
+        ranking = await (await client.get("/ranking")).json()
+        assert [(row["username"], row["points"]) for row in ranking] == [("alice", 3), ("bob", 0)]
+        assert len(await (await client.get("/ranking", params={"top": 0})).json()) == 1
+        assert (await client.get("/ranking", params={"top": "x"})).status == 400
+    run(app, scenario)
+
+
+def test_websocket_receives_each_move(app):
+    async def scenario(client):
+        alice, bob = await login(client, "alice", "senha-a"), await login(client, "bob", "senha-b")
+        await client.post("/rooms", json={"name": "Sala"}, headers=alice)
+        await client.post("/rooms/1/join", headers=alice)
+        await client.post("/rooms/1/join", headers=bob)
+
+        async with client.ws_connect("/rooms/1/ws") as ws:
+            first = await ws.receive_json(timeout=5)
+            assert first["players"] == ["alice", "bob"]
+            await client.post("/rooms/1/moves", json={"index": 4}, headers=alice)
+            state = await ws.receive_json(timeout=5)
+            assert state["board"][4] == "X"
+            assert state["version"] > first["version"]
+    run(app, scenario)
+
+
+@pytest.mark.parametrize("storage, user_storage", [("journal", None), ("json", "journal")])
+def test_journal_storage_is_rejected(storage, user_storage):
+    with pytest.raises(ValueError):
+        create_app(storage=storage, user_storage=user_storage)
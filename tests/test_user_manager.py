@@ -0,0 +1,19 @@
+import pytest
+
+from managers.user_manager import UserManager
+
+
+@pytest.fixture
+def users(tmp_path):
+    return UserManager(str(tmp_path / "users.json"), secret="segredo")
+
+
+def test_token_round_trip(users):
+    token = users.issue_token("joão", now=1000)
+    assert users.verify_token(token, now=1000) == "joão"
+    assert users.verify_token(token, now=1000 + 13 * 60 * 60) is None
+
+
+@pytest.mark.parametrize("token", ["", "abc", "a.b.c", "a.1.assinatura-é-inválida", "é.é.é", "a.b.ÿ"])
+def test_malformed_tokens_are_rejected(users, token):
+    assert users.verify_token(token) is None